@@ -2,8 +2,3 @@
 # -*- coding: utf-8 -*-
 
 __author__ = 'phil.zhang'
-
-import numpy as np
-import scipy as sp
-import matplotlib.pyplot as plt
-import pandas as pd
\ No newline at end of file
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+"""
+按列存储的bar缓冲区。
+
+每个合约一个 BarBuffer，open/high/low/close/volume/adj_close 各占一个
+预分配的 float64 数组，时间索引是 datetime64[ns] 数组。容量不够时按
+两倍扩容，append 的均摊代价是 O(1)。tail() 返回的是底层数组的视图，
+不拷贝数据；只有在调用 to_frame() 时才真正生成 DataFrame。
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class BarBuffer(object):
+    BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'adj_close')
+
+    def __init__(self, instrument=None, capacity=256):
+        """
+
+        :param instrument: instrument code
+        :param capacity: initial number of rows to preallocate
+        :return:
+        """
+        self.__instrument = instrument
+        self.__capacity = max(int(capacity), 1)
+        self.__size = 0
+        self.__index = np.empty(self.__capacity, dtype='datetime64[ns]')
+        self.__columns = OrderedDict(
+            (field, np.empty(self.__capacity, dtype=np.float64)) for field in self.BAR_FIELDS)
+
+    def __len__(self):
+        return self.__size
+
+    @property
+    def instrument(self):
+        return self.__instrument
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    @property
+    def columns(self):
+        return self.__columns.keys()
+
+    def __grow(self, min_capacity):
+        capacity = self.__capacity
+        while capacity < min_capacity:
+            capacity *= 2
+
+        index = np.empty(capacity, dtype=self.__index.dtype)
+        index[:self.__size] = self.__index[:self.__size]
+        self.__index = index
+
+        for name, values in self.__columns.items():
+            column = np.empty(capacity, dtype=values.dtype)
+            column[:self.__size] = values[:self.__size]
+            self.__columns[name] = column
+
+        self.__capacity = capacity
+
+    def append(self, bar):
+        """
+        追加一根 algotrade.bar.Bar
+        :param bar: Bar
+        :return:
+        """
+        self.append_values(bar.date_time, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.adj_close)
+
+    def append_values(self, date_time, open_, high, low, close, volume, adj_close=np.nan):
+        if self.__size == self.__capacity:
+            self.__grow(self.__size + 1)
+
+        pos = self.__size
+        self.__index[pos] = np.datetime64(date_time, 'ns')
+        columns = self.__columns
+        columns['open'][pos] = open_
+        columns['high'][pos] = high
+        columns['low'][pos] = low
+        columns['close'][pos] = close
+        columns['volume'][pos] = volume
+        columns['adj_close'][pos] = np.nan if adj_close is None else adj_close
+        # 指标列在新的一行上先置为 NaN
+        for name in self.__columns:
+            if name not in self.BAR_FIELDS:
+                columns[name][pos] = np.nan
+        self.__size += 1
+
+    def set_value(self, name, value, pos=-1):
+        """
+        写入一个指标值，默认写到最后一行。指标列第一次出现时才分配，
+        之前的行都是 NaN。
+        :param name: column name, e.g. 'ACD'
+        :param value: float
+        :param pos: row position, negative values count from the end
+        :return:
+        """
+        if name not in self.__columns:
+            column = np.empty(self.__capacity, dtype=np.float64)
+            column.fill(np.nan)
+            self.__columns[name] = column
+        if pos < 0:
+            pos += self.__size
+        if not 0 <= pos < self.__size:
+            raise IndexError('row %s out of range for %s' % (pos, self.__instrument))
+        self.__columns[name][pos] = value
+
+    def column(self, name):
+        """返回整列的视图"""
+        return self.__columns[name][:self.__size]
+
+    def index(self):
+        return self.__index[:self.__size]
+
+    def last_date_time(self):
+        if not self.__size:
+            return None
+        return self.__index[self.__size - 1]
+
+    def tail(self, n):
+        """
+        最后 n 行，返回 {列名: 数组视图}，不拷贝数据。
+        返回的视图在下一次扩容之前有效，调用方不要长期持有。
+        :param n: number of rows
+        :return: dict
+        """
+        start = max(self.__size - n, 0)
+        end = self.__size
+        return dict((name, values[start:end]) for name, values in self.__columns.items())
+
+    def tail_index(self, n):
+        start = max(self.__size - n, 0)
+        return self.__index[start:self.__size]
+
+    def tail_frame(self, n, columns=BAR_FIELDS):
+        """
+        最后 n 行的 DataFrame，代价是 O(n) 而不是 O(总行数)。
+        ls_talib 里的函数需要 DataFrame 作为输入。
+        """
+        start = max(self.__size - n, 0)
+        data = OrderedDict((name, self.__columns[name][start:self.__size]) for name in columns)
+        return pd.DataFrame(data, index=pd.DatetimeIndex(self.__index[start:self.__size]))
+
+    def to_frame(self):
+        """把整个缓冲区物化成 DataFrame"""
+        data = OrderedDict((name, values[:self.__size].copy()) for name, values in self.__columns.items())
+        frame = pd.DataFrame(data, index=pd.DatetimeIndex(self.__index[:self.__size].copy()))
+        frame['instrument'] = self.__instrument
+        return frame
@@ -5,3 +5,5 @@ __author__ = 'phil.zhang'
 
 from barfeed import BaseBarFeed
 from barfeed import CSVBarFeed
+from tick import DepthMarketData
+from tick import DepthMarketDataArray
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+"""
+把 CTP 深度行情合成 algotrade.bar.Bar。
+
+TimeBarAggregator：按 const.FREQUENCY 的时间周期合成，bar 的时间是周期的起点
+VolumeBarAggregator：累计成交量达到 volume 时合成一根
+TickBarAggregator：每 ticks 个 tick 合成一根
+
+每个合约只保存一根未完成的 bar，每个 tick 只做几次字符串切片和整数运算，
+bar 完成时才创建 datetime 和 Bar 对象，所以一个核可以合成几千个合约。
+
+交易时段：sessions 是 [('21:00:00', '23:30:00'), ('09:00:00', '10:15:00'), ...]，
+夜盘可以跨过午夜，如 ('21:00:00', '02:30:00')，
+时段外的 tick（集合竞价、收盘后的结算价推送等）直接丢弃，时段结束时刻的 tick
+计入之前的 bar 并立即发出。成交量 bar 和 tick 数 bar 不跨交易日（TradingDay），
+换日时未完成的 bar 立即发出。
+sessions 为 None 时不做时段过滤。
+
+tick 可以是 API 回调里的 dict，也可以是 algotrade.barfeed.tick.DepthMarketData。
+"""
+
+import datetime
+
+from algotrade.bar import Bar
+from algotrade.const import FREQUENCY
+
+
+def frequency_seconds(frequency):
+    """FREQUENCY.MINUTE -> 60"""
+    value = frequency.value
+    return value[0] if isinstance(value, tuple) else value
+
+
+def _seconds_of_day(update_time):
+    # 'HH:MM:SS' -> 秒，比 strptime 快得多
+    return int(update_time[0:2]) * 3600 + int(update_time[3:5]) * 60 + int(update_time[6:8])
+
+
+def _to_date(date_str):
+    return datetime.datetime(int(date_str[0:4]), int(date_str[4:6]), int(date_str[6:8]))
+
+
+class _PartialBar(object):
+    __slots__ = ('key', 'date_time', 'open', 'high', 'low', 'close', 'volume', 'ticks')
+
+    def __init__(self, key, date_time, price):
+        self.key = key
+        self.date_time = date_time
+        self.open = self.high = self.low = self.close = price
+        self.volume = 0
+        self.ticks = 0
+
+
+class BaseBarAggregator(object):
+    def __init__(self, on_bar, frequency=None, sessions=None):
+        """
+
+        :param on_bar: 回调函数，参数为合成好的 Bar
+        :param frequency: 写入 Bar 的 frequency
+        :param sessions: 交易时段，[(开始, 结束), ...]，'HH:MM:SS'
+        """
+        self.__on_bar = on_bar
+        self.__frequency = frequency
+        self.__sessions = sorted(sessions) if sessions else None
+        # instrument -> _PartialBar
+        self.__bars = {}
+        # instrument -> 上一个 tick 的累计成交量
+        self.__last_volumes = {}
+
+    @property
+    def frequency(self):
+        return self.__frequency
+
+    def __session_end(self, update_time):
+        """
+        :return: None 表示在时段外，True 表示恰好是时段结束时刻，否则 False
+        """
+        for start, end in self.__sessions:
+            if start < end:
+                in_session = start <= update_time < end
+            else:
+                # 跨过午夜的夜盘，如 ('21:00:00', '02:30:00')
+                in_session = update_time >= start or update_time < end
+            if in_session:
+                return False
+            elif update_time == end:
+                return True
+        return None
+
+    def update(self, tick):
+        """
+        处理一个 tick，可能发出一根 bar
+        :param tick: dict 或 DepthMarketData
+        :return:
+        """
+        price = tick['LastPrice']
+        # CTP 用 DBL_MAX 表示无效价格
+        if not 0 < price < 1e300:
+            return
+
+        instrument = tick['InstrumentID']
+        update_time = tick['UpdateTime']
+        at_session_end = False
+        if self.__sessions is not None:
+            at_session_end = self.__session_end(update_time)
+            if at_session_end is None:
+                return
+
+        # CTP 的 Volume 是当日累计成交量，换日后从 0 开始
+        cum_volume = tick['Volume']
+        last_volume = self.__last_volumes.get(instrument)
+        self.__last_volumes[instrument] = cum_volume
+        if last_volume is None:
+            volume = 0
+        elif cum_volume >= last_volume:
+            volume = cum_volume - last_volume
+        else:
+            volume = cum_volume
+
+        key = self._bar_key(tick, at_session_end)
+        bar = self.__bars.get(instrument)
+        if bar is not None and bar.key != key:
+            self.__emit(instrument, bar)
+            bar = None
+        if bar is None:
+            bar = self.__bars[instrument] = _PartialBar(key, self._bar_date_time(tick, key), price)
+        else:
+            if price > bar.high:
+                bar.high = price
+            elif price < bar.low:
+                bar.low = price
+            bar.close = price
+        bar.volume += volume
+        bar.ticks += 1
+
+        if at_session_end or self._is_complete(bar):
+            self.__emit(instrument, bar)
+
+    def flush(self, instrument=None):
+        """
+        发出未完成的 bar，比如收盘后由计时器调用
+        :param instrument: None 表示所有合约
+        :return:
+        """
+        instruments = [instrument] if instrument is not None else sorted(self.__bars.keys())
+        for instrument in instruments:
+            bar = self.__bars.get(instrument)
+            if bar is not None:
+                self.__emit(instrument, bar)
+
+    def __emit(self, instrument, bar):
+        del self.__bars[instrument]
+        date_time = bar.date_time
+        if not isinstance(date_time, datetime.datetime):
+            date_time = self._make_date_time(date_time)
+        self.__on_bar(Bar(date_time=date_time, open_=bar.open, high=bar.high, low=bar.low, close=bar.close,
+                          volume=bar.volume, frequency=self.__frequency, instrument=instrument))
+
+    def _bar_key(self, tick, at_session_end):
+        """key 变化时发出未完成的 bar，默认按交易日"""
+        return tick['TradingDay']
+
+    def _bar_date_time(self, tick, key):
+        """bar 的时间，可以返回一个延迟计算的值，由 _make_date_time 转成 datetime"""
+        return tick['ActionDay'], tick['UpdateTime']
+
+    def _make_date_time(self, value):
+        action_day, update_time = value
+        return _to_date(action_day) + datetime.timedelta(seconds=_seconds_of_day(update_time))
+
+    def _is_complete(self, bar):
+        return False
+
+
+class TimeBarAggregator(BaseBarAggregator):
+    def __init__(self, on_bar, frequency=FREQUENCY.MINUTE, sessions=None):
+        super(TimeBarAggregator, self).__init__(on_bar, frequency, sessions)
+        self.__period = frequency_seconds(frequency)
+        self.__intraday = self.__period < frequency_seconds(FREQUENCY.DAY)
+        # 日线以上的周期只在交易日变化时重新计算
+        self.__last_trading_day = None
+        self.__last_period_key = None
+
+    def _bar_key(self, tick, at_session_end):
+        if not self.__intraday:
+            trading_day = tick['TradingDay']
+            if trading_day != self.__last_trading_day:
+                self.__last_trading_day = trading_day
+                self.__last_period_key = self.__period_key(trading_day)
+            return self.__last_period_key
+        seconds = _seconds_of_day(tick['UpdateTime'])
+        if at_session_end:
+            # 时段结束时刻的 tick 属于前一根 bar
+            seconds -= 1
+        return tick['ActionDay'], seconds // self.__period
+
+    def __period_key(self, trading_day):
+        if self.__period == frequency_seconds(FREQUENCY.DAY):
+            return trading_day
+        elif self.__period == frequency_seconds(FREQUENCY.WEEK):
+            return _to_date(trading_day).isocalendar()[:2]
+        return trading_day[:6]
+
+    def _bar_date_time(self, tick, key):
+        if self.__intraday:
+            return key
+        return tick['TradingDay'], None
+
+    def _make_date_time(self, value):
+        day, bucket = value
+        if bucket is None:
+            return _to_date(day)
+        return _to_date(day) + datetime.timedelta(seconds=bucket * self.__period)
+
+
+class VolumeBarAggregator(BaseBarAggregator):
+    def __init__(self, on_bar, volume, sessions=None):
+        super(VolumeBarAggregator, self).__init__(on_bar, None, sessions)
+        self.__volume = volume
+
+    def _is_complete(self, bar):
+        return bar.volume >= self.__volume
+
+
+class TickBarAggregator(BaseBarAggregator):
+    def __init__(self, on_bar, ticks, sessions=None):
+        super(TickBarAggregator, self).__init__(on_bar, None, sessions)
+        self.__ticks = ticks
+
+    def _is_complete(self, bar):
+        return bar.ticks >= self.__ticks
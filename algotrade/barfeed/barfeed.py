@@ -36,6 +36,18 @@ class CSVBarFeed(BaseBarFeed):
         self.__instruments = instruments
         self.__dict_dataframe = dict.fromkeys(instruments)
 
+    @property
+    def instruments(self):
+        return self.__instruments
+
+    def get_dataframe(self, instrument):
+        """
+        某个合约的全部bar，load_data_from_csv 之后才有
+        :param instrument: instrument code
+        :return: DataFrame
+        """
+        return self.__dict_dataframe[instrument]
+
     def next_bar(self):
 
         generators = dict([(instrument, self.__dict_dataframe[instrument].iterrows()) for instrument in self.__instruments])
@@ -14,8 +14,10 @@ from algotrade.barfeed import BaseBarFeed
 from algotrade.vnctpmd import MdApi
 from algotrade.vnctptd import TdApi
 from algotrade.event_engine import Event
-from algotrade.const import EventType
+from algotrade.const import EventType, FREQUENCY
 from ctp_data_type import defineDict
+from tick import DepthMarketData
+from bar_aggregator import TimeBarAggregator
 
 
 # ----------------------------------------------------------------------
@@ -41,19 +43,30 @@ class RealTimeBarFeed(Meta_MdApi_BaseBarFeed):
     对用户暴露的主动函数包括:
     登陆 login
     订阅合约 subscribe
+
+    收到的 tick 由 bar 合成器合成 Bar，以 EVENT_BAR_ARRIVE 事件（主题为合约代码）推送
     """
 
     # ----------------------------------------------------------------------
 
-    def __init__(self, event_engine):
+    def __init__(self, event_engine, frequency=FREQUENCY.MINUTE, sessions=None, aggregator=None):
         """
         API对象的初始化函数
+        :param frequency: bar 周期
+        :param sessions: 交易时段，见 algotrade.barfeed.bar_aggregator
+        :param aggregator: 自定义的 bar 合成器，比如 VolumeBarAggregator(self.put_bar, 1000)，
+                           给定时忽略 frequency 和 sessions
         """
         super(RealTimeBarFeed, self).__init__()
 
         # 事件引擎，所有数据都推送到其中，再由事件引擎进行分发
         self.__event_engine = event_engine
 
+        # tick 合成 bar
+        if aggregator is None:
+            aggregator = TimeBarAggregator(self.put_bar, frequency, sessions)
+        self.__aggregator = aggregator
+
         # 请求编号，由api负责管理
         self.__req_id = 0
 
@@ -71,7 +84,16 @@ class RealTimeBarFeed(Meta_MdApi_BaseBarFeed):
         # ----------------------------------------------------------------------
 
     def next_bar(self):
-        pass
+        """实盘的 bar 由 on_rtn_depth_market_data 合成后通过事件推送，这里没有可以迭代的历史数据"""
+        return iter(())
+
+    def put_bar(self, bar):
+        """bar 合成器的回调"""
+        self.__event_engine.put(Event(type_=EventType.EVENT_BAR_ARRIVE, dict_=bar, topic=bar.instrument))
+
+    def flush_bars(self):
+        """收盘后发出还没有完成的 bar"""
+        self.__aggregator.flush()
 
     def on_front_connected(self):
         """服务器连接"""
@@ -167,18 +189,14 @@ class RealTimeBarFeed(Meta_MdApi_BaseBarFeed):
 
     def on_rtn_depth_market_data(self, data):
         """行情推送"""
-        # 行情推送收到后，同时触发常规行情事件，以及特定合约行情事件，用于满足不同类型的监听
-
-        # 常规行情事件
-        event1 = Event(type_=EventType.EVENT_MARKET_DATA)
-        event1.dict_['data'] = data
-        self.__event_engine.put(event1)
+        # 以合约代码为主题，只产生一个事件，事件引擎会同时分发给常规行情的监听和
+        # 特定合约行情的监听（register(EventType.EVENT_MARKET_DATA, handler, topic=合约代码)）
+        # 原始 dict 换成带 __slots__ 的 DepthMarketData，仍然可以用 data['LastPrice'] 访问
+        tick = DepthMarketData.from_dict(data)
+        event = Event(type_=EventType.EVENT_MARKET_DATA, dict_={'data': tick}, topic=tick.InstrumentID)
+        self.__event_engine.put(event)
 
-        # 特定合约行情事件
-        event2 = Event(
-            type_=(EventType.EVENT_MARKET_DATA_CONTRACT + data['InstrumentID']))
-        event2.dict_['data'] = data
-        self.__event_engine.put(event2)
+        self.__aggregator.update(tick)
 
     # ----------------------------------------------------------------------
     def on_rsp_sub_for_quote_rsp(self, data, error, n, last):
@@ -648,29 +666,16 @@ class RealTimeBroker(TdApi):
         newref = data['OrderRef']
         self.__order_ref = max(self.__order_ref, int(newref))
 
-        # 常规报单事件
-        event1 = Event(type_=EventType.EVENT_ORDER)
-        event1.dict_['data'] = data
-        self.__event_engine.put(event1)
-
-        # 特定合约行情事件
-        event2 = Event(type_=(EventType.EVENT_ORDER_REF + data['OrderRef']))
-        event2.dict_['data'] = data
-        self.__event_engine.put(event2)
+        # 报单事件，以报单编号为主题
+        event = Event(type_=EventType.EVENT_ORDER, dict_={'data': data}, topic=data['OrderRef'])
+        self.__event_engine.put(event)
 
     # ----------------------------------------------------------------------
     def onRtnTrade(self, data):
         """成交回报"""
-        # 常规成交事件
-        event1 = Event(type_=EventType.EVENT_TRADE)
-        event1.dict_['data'] = data
-        self.__event_engine.put(event1)
-
-        # 特定合约成交事件
-        event2 = Event(
-            type_=(EventType.EVENT_TRADE_CONTRACT + data['InstrumentID']))
-        event2.dict_['data'] = data
-        self.__event_engine.put(event2)
+        # 成交事件，以合约代码为主题
+        event = Event(type_=EventType.EVENT_TRADE, dict_={'data': data}, topic=data['InstrumentID'])
+        self.__event_engine.put(event)
 
     # ----------------------------------------------------------------------
     def onErrRtnOrderInsert(self, data, error):
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+"""
+放在共享内存里的bar，用于多进程回测。
+
+SharedBarStore 把所有合约的 open/high/low/close/volume/adj_close 放进一块
+multiprocessing.RawArray（行 x 6 列的 float64），时间索引放进另一块 int64
+的 RawArray。子进程通过 Pool 的 initializer 继承这两块内存，不需要 pickle
+DataFrame；SharedBarFeed 在子进程里按合约取出视图，get_dataframe 返回的
+DataFrame 也是建立在共享内存上的，不拷贝数据。
+"""
+
+import ctypes
+from collections import OrderedDict
+from multiprocessing.sharedctypes import RawArray
+
+import numpy as np
+import pandas as pd
+
+from algotrade.bar import Bar
+from algotrade.bar_buffer import BarBuffer
+from algotrade.barfeed.barfeed import BaseBarFeed
+from algotrade.const import FREQUENCY
+from algotrade.event_engine import EventEngine
+
+
+class SharedBarStore(object):
+    FIELDS = BarBuffer.BAR_FIELDS
+
+    def __init__(self, dataframes):
+        """
+
+        :param dataframes: OrderedDict, instrument -> DataFrame, 列名小写，按时间升序
+        :return:
+        """
+        total = sum(len(frame) for frame in dataframes.values())
+        n_fields = len(self.FIELDS)
+        self.__values = RawArray(ctypes.c_double, max(total, 1) * n_fields)
+        self.__index = RawArray(ctypes.c_int64, max(total, 1))
+        self.__offsets = OrderedDict()
+
+        values = np.frombuffer(self.__values, dtype=np.float64).reshape(-1, n_fields)
+        index = np.frombuffer(self.__index, dtype=np.int64)
+        start = 0
+        for instrument, frame in dataframes.items():
+            end = start + len(frame)
+            for i, field in enumerate(self.FIELDS):
+                if field in frame:
+                    values[start:end, i] = frame[field].values
+                else:
+                    values[start:end, i] = np.nan
+            index[start:end] = frame.index.values.astype('datetime64[ns]').view(np.int64)
+            self.__offsets[instrument] = (start, end)
+            start = end
+
+    @classmethod
+    def from_barfeed(cls, barfeed, instruments=None):
+        """
+        :param barfeed: 已经 load_data_from_csv 的 CSVBarFeed
+        :param instruments: 只放入这些合约，默认全部
+        """
+        instruments = barfeed.instruments if instruments is None else instruments
+        return cls(OrderedDict((instrument, barfeed.get_dataframe(instrument)) for instrument in instruments))
+
+    @property
+    def instruments(self):
+        return self.__offsets.keys()
+
+    def __len__(self):
+        return len(self.__offsets)
+
+    def values(self, instrument):
+        """行 x FIELDS 的 float64 视图"""
+        start, end = self.__offsets[instrument]
+        return np.frombuffer(self.__values, dtype=np.float64).reshape(-1, len(self.FIELDS))[start:end]
+
+    def index(self, instrument):
+        start, end = self.__offsets[instrument]
+        return np.frombuffer(self.__index, dtype=np.int64)[start:end].view('datetime64[ns]')
+
+    def dataframe(self, instrument):
+        return pd.DataFrame(self.values(instrument), index=pd.DatetimeIndex(self.index(instrument)),
+                            columns=list(self.FIELDS), copy=False)
+
+
+class SharedBarFeed(BaseBarFeed):
+    def __init__(self, store, instruments=None, frequency=FREQUENCY.DAY):
+        """
+
+        :param store: SharedBarStore
+        :param instruments: 本分片的合约，默认 store 中的全部
+        :param frequency: 写入 Bar 的 frequency
+        """
+        super(SharedBarFeed, self).__init__()
+        # 每个 feed 用自己的事件引擎，同一个子进程先后跑多个分片时处理函数不会串在一起
+        self.event_engine = EventEngine()
+        self.__store = store
+        self.__instruments = list(store.instruments if instruments is None else instruments)
+        self.__frequency = frequency
+
+    @property
+    def instruments(self):
+        return self.__instruments
+
+    def get_dataframe(self, instrument):
+        return self.__store.dataframe(instrument)
+
+    def next_bar(self):
+        """与 CSVBarFeed 一样按合约轮流产生 bar，已经结束的合约跳过"""
+        cursors = [(instrument, self.__store.values(instrument), pd.DatetimeIndex(self.__store.index(instrument)))
+                   for instrument in self.__instruments]
+        frequency = self.__frequency
+        pos = 0
+        while cursors:
+            cursors = [cursor for cursor in cursors if pos < len(cursor[1])]
+            for instrument, values, index in cursors:
+                open_, high, low, close, volume, adj_close = values[pos]
+                yield Bar(date_time=index[pos], open_=open_, high=high, low=low, close=close,
+                          adj_close=adj_close, volume=volume, frequency=frequency, instrument=instrument)
+            pos += 1
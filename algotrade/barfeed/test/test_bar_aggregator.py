@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+import datetime
+
+from algotrade.const import FREQUENCY
+from algotrade.barfeed.bar_aggregator import (TimeBarAggregator, VolumeBarAggregator, TickBarAggregator)
+
+SESSIONS = [('09:00:00', '10:15:00'), ('10:30:00', '11:30:00'), ('13:30:00', '15:00:00')]
+
+
+def _tick(update_time, price, volume, instrument='rb1610', day='20160603'):
+    return {'InstrumentID': instrument, 'TradingDay': day, 'ActionDay': day, 'UpdateTime': update_time,
+            'UpdateMillisec': 0, 'LastPrice': price, 'Volume': volume}
+
+
+def test_time_bars():
+    bars = []
+    aggregator = TimeBarAggregator(bars.append, FREQUENCY.MINUTE, SESSIONS)
+    for tick in [_tick('08:59:00', 99.0, 10),     # 集合竞价，丢弃
+                 _tick('09:00:00', 100.0, 10),
+                 _tick('09:00:30', 102.0, 15),
+                 _tick('09:00:59', 101.0, 18),
+                 _tick('09:01:00', 103.0, 20),
+                 _tick('14:59:30', 104.0, 30),
+                 _tick('15:00:00', 105.0, 31),    # 收盘时刻，计入 14:59 并立即发出
+                 _tick('15:00:01', 106.0, 31)]:   # 时段外
+        aggregator.update(tick)
+
+    assert [(b.date_time, b.open, b.high, b.low, b.close, b.volume) for b in bars] == [
+        (datetime.datetime(2016, 6, 3, 9, 0), 100.0, 102.0, 100.0, 101.0, 8),
+        (datetime.datetime(2016, 6, 3, 9, 1), 103.0, 103.0, 103.0, 103.0, 2),
+        (datetime.datetime(2016, 6, 3, 14, 59), 104.0, 105.0, 104.0, 105.0, 11)]
+    assert all(b.frequency == FREQUENCY.MINUTE and b.instrument == 'rb1610' for b in bars)
+
+
+def test_day_bars():
+    bars = []
+    aggregator = TimeBarAggregator(bars.append, FREQUENCY.DAY)
+    aggregator.update(_tick('09:00:00', 100.0, 10, day='20160602'))
+    aggregator.update(_tick('14:00:00', 98.0, 20, day='20160602'))
+    aggregator.update(_tick('09:00:00', 99.0, 5, day='20160603'))
+    aggregator.flush()
+    assert [(b.date_time, b.open, b.low, b.close, b.volume) for b in bars] == [
+        (datetime.datetime(2016, 6, 2), 100.0, 98.0, 98.0, 10),
+        (datetime.datetime(2016, 6, 3), 99.0, 99.0, 99.0, 5)]
+
+
+def test_volume_and_tick_bars():
+    volume_bars, tick_bars = [], []
+    by_volume = VolumeBarAggregator(volume_bars.append, 10)
+    by_ticks = TickBarAggregator(tick_bars.append, 3)
+    for i in range(10):
+        for instrument in ('rb1610', 'IF1606'):
+            tick = _tick('09:00:%02d' % i, 100.0 + i, 4 * i, instrument)
+            by_volume.update(tick)
+            by_ticks.update(tick)
+    assert [b.volume for b in volume_bars if b.instrument == 'rb1610'] == [12, 12, 12]
+    assert [b.close for b in tick_bars if b.instrument == 'IF1606'] == [102.0, 105.0, 108.0]
+
+
+def test_night_session_across_midnight():
+    bars = []
+    aggregator = TimeBarAggregator(bars.append, FREQUENCY.MINUTE, [('21:00:00', '02:30:00')])
+    # 夜盘的 TradingDay 是下一个交易日，ActionDay 是自然日
+    for tick in [_tick('20:59:00', 99.0, 10, day='20160603'),     # 集合竞价，丢弃
+                 _tick('23:59:30', 100.0, 10, day='20160603'),
+                 _tick('00:00:10', 101.0, 12, day='20160604'),
+                 _tick('02:29:50', 102.0, 15, day='20160604'),
+                 _tick('02:30:00', 103.0, 16, day='20160604'),    # 收盘时刻，计入 02:29 并立即发出
+                 _tick('02:30:01', 104.0, 16, day='20160604'),    # 时段外
+                 _tick('09:00:00', 105.0, 20, day='20160604')]:   # 时段外
+        tick['TradingDay'] = '20160606'
+        aggregator.update(tick)
+
+    assert [(b.date_time, b.open, b.close, b.volume) for b in bars] == [
+        (datetime.datetime(2016, 6, 3, 23, 59), 100.0, 100.0, 0),
+        (datetime.datetime(2016, 6, 4, 0, 0), 101.0, 101.0, 2),
+        (datetime.datetime(2016, 6, 4, 2, 29), 102.0, 103.0, 4)]
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.testing.utils import assert_array_equal
+
+from algotrade.barfeed.shared_barfeed import SharedBarStore, SharedBarFeed
+
+
+def _dataframes(n_instruments=4, n=30):
+    rs = np.random.RandomState(0)
+    frames = OrderedDict()
+    for i in range(n_instruments):
+        close = 20 + np.cumsum(rs.normal(0, 0.5, n - i))
+        frames['s%02d' % i] = pd.DataFrame(
+            OrderedDict([('open', close), ('high', close + 1), ('low', close - 1), ('close', close),
+                         ('volume', rs.randint(1000, 5000, n - i).astype(float)), ('adj_close', close)]),
+            index=pd.date_range('2000-01-01', periods=n - i))
+    return frames
+
+
+def test_shared_bar_store():
+    frames = _dataframes()
+    store = SharedBarStore(frames)
+    assert store.instruments == ['s00', 's01', 's02', 's03']
+    for instrument, frame in frames.items():
+        shared = store.dataframe(instrument)
+        assert_array_equal(shared.values, frame.values)
+        assert (shared.index == frame.index).all()
+        # 建立在共享内存上，没有拷贝
+        assert np.may_share_memory(shared.values, store.values(instrument))
+
+
+def test_shared_barfeed():
+    frames = _dataframes()
+    feed = SharedBarFeed(SharedBarStore(frames), ['s01', 's03'])
+    bars = list(feed.next_bar())
+    assert len(bars) == 29 + 27
+    assert [bar.instrument for bar in bars[:4]] == ['s01', 's03', 's01', 's03']
+    assert [bar.instrument for bar in bars[-2:]] == ['s01', 's01']
+    assert bars[2].close == frames['s01']['close'].iloc[1]
+    assert bars[2].date_time == frames['s01'].index[1]
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+from algotrade.barfeed.tick import (DepthMarketData, DepthMarketDataArray, DEPTH_MARKET_DATA_DTYPE,
+                                    to_structured_array)
+
+
+def _depth_market_data(i):
+    data = dict((name, 0.0 if DEPTH_MARKET_DATA_DTYPE[name].kind == 'f' else 0)
+                for name in DEPTH_MARKET_DATA_DTYPE.names)
+    data.update(TradingDay='20160603', ActionDay='20160603', InstrumentID='IF1606', ExchangeID='CFFEX',
+                ExchangeInstID='IF1606', UpdateTime='09:30:%02d' % i, UpdateMillisec=500,
+                LastPrice=3000.0 + i, Volume=100 + i, BidPrice1=2999.8, AskPrice1=3000.2)
+    return data
+
+
+def test_from_dict():
+    data = _depth_market_data(1)
+    tick = DepthMarketData.from_dict(data)
+    assert tick.LastPrice == 3001.0
+    assert tick['InstrumentID'] is data['InstrumentID']
+    assert tick.to_dict() == data
+    assert not hasattr(tick, '__dict__')
+
+
+def test_structured_array():
+    ticks = [_depth_market_data(i) for i in range(10)]
+    records = DepthMarketDataArray(capacity=4)
+    records.extend(ticks[:5])
+    records.extend(DepthMarketData.from_dict(tick) for tick in ticks[5:])
+    assert len(records) == 10 and records.capacity == 16
+    array = records.array()
+    assert list(array['LastPrice']) == [3000.0 + i for i in range(10)]
+    assert array['UpdateTime'][9] == '09:30:09'
+    assert (to_structured_array(ticks) == array).all()
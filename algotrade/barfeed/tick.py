@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+"""
+CTP 深度行情的紧凑表示。
+
+API 回调里拿到的是一个有四十多个字符串键的 dict，记录一整天的 tick 时内存和
+GC 压力都很大。这里根据 ctp_data_type.typedefDict 里的字段类型生成：
+
+DepthMarketData：带 __slots__ 的记录类型，from_dict 只是把 dict 里的对象引用
+                 放进 slots，不拷贝数据，也支持 tick['LastPrice'] 这种 dict 式访问
+DepthMarketDataArray：按行追加的 NumPy 结构化数组，容量不够时按两倍扩容
+DEPTH_MARKET_DATA_DTYPE：对应的结构化数组 dtype
+"""
+
+from collections import OrderedDict
+from operator import attrgetter, itemgetter
+
+import numpy as np
+
+from ctp_data_type import typedefDict
+
+# CThostFtdcDepthMarketDataField 的字段，顺序与 ThostFtdcUserApiStruct.h 一致
+DEPTH_MARKET_DATA_FIELDS = OrderedDict([
+    ('TradingDay', 'TThostFtdcDateType'),
+    ('InstrumentID', 'TThostFtdcInstrumentIDType'),
+    ('ExchangeID', 'TThostFtdcExchangeIDType'),
+    ('ExchangeInstID', 'TThostFtdcExchangeInstIDType'),
+    ('LastPrice', 'TThostFtdcPriceType'),
+    ('PreSettlementPrice', 'TThostFtdcPriceType'),
+    ('PreClosePrice', 'TThostFtdcPriceType'),
+    ('PreOpenInterest', 'TThostFtdcLargeVolumeType'),
+    ('OpenPrice', 'TThostFtdcPriceType'),
+    ('HighestPrice', 'TThostFtdcPriceType'),
+    ('LowestPrice', 'TThostFtdcPriceType'),
+    ('Volume', 'TThostFtdcVolumeType'),
+    ('Turnover', 'TThostFtdcMoneyType'),
+    ('OpenInterest', 'TThostFtdcLargeVolumeType'),
+    ('ClosePrice', 'TThostFtdcPriceType'),
+    ('SettlementPrice', 'TThostFtdcPriceType'),
+    ('UpperLimitPrice', 'TThostFtdcPriceType'),
+    ('LowerLimitPrice', 'TThostFtdcPriceType'),
+    ('PreDelta', 'TThostFtdcRatioType'),
+    ('CurrDelta', 'TThostFtdcRatioType'),
+    ('UpdateTime', 'TThostFtdcTimeType'),
+    ('UpdateMillisec', 'TThostFtdcMillisecType'),
+    ('BidPrice1', 'TThostFtdcPriceType'),
+    ('BidVolume1', 'TThostFtdcVolumeType'),
+    ('AskPrice1', 'TThostFtdcPriceType'),
+    ('AskVolume1', 'TThostFtdcVolumeType'),
+    ('BidPrice2', 'TThostFtdcPriceType'),
+    ('BidVolume2', 'TThostFtdcVolumeType'),
+    ('AskPrice2', 'TThostFtdcPriceType'),
+    ('AskVolume2', 'TThostFtdcVolumeType'),
+    ('BidPrice3', 'TThostFtdcPriceType'),
+    ('BidVolume3', 'TThostFtdcVolumeType'),
+    ('AskPrice3', 'TThostFtdcPriceType'),
+    ('AskVolume3', 'TThostFtdcVolumeType'),
+    ('BidPrice4', 'TThostFtdcPriceType'),
+    ('BidVolume4', 'TThostFtdcVolumeType'),
+    ('AskPrice4', 'TThostFtdcPriceType'),
+    ('AskVolume4', 'TThostFtdcVolumeType'),
+    ('BidPrice5', 'TThostFtdcPriceType'),
+    ('BidVolume5', 'TThostFtdcVolumeType'),
+    ('AskPrice5', 'TThostFtdcPriceType'),
+    ('AskVolume5', 'TThostFtdcVolumeType'),
+    ('AveragePrice', 'TThostFtdcPriceType'),
+    ('ActionDay', 'TThostFtdcDateType'),
+])
+
+# typedefDict 里只有 "string"，字符串长度取头文件里 char 数组的长度减去结尾的 '\0'
+STRING_LENGTHS = {
+    'TThostFtdcDateType': 8,
+    'TThostFtdcTimeType': 8,
+    'TThostFtdcInstrumentIDType': 30,
+    'TThostFtdcExchangeIDType': 8,
+    'TThostFtdcExchangeInstIDType': 30,
+}
+
+
+def field_dtype(ctp_type):
+    """
+    CTP 类型 -> NumPy 类型
+    :param ctp_type: typedefDict 的键，e.g. 'TThostFtdcPriceType'
+    :return: str
+    """
+    kind = typedefDict[ctp_type]
+    if kind == 'float':
+        return 'f8'
+    elif kind == 'int':
+        return 'i4'
+    elif kind == 'char':
+        return 'S1'
+    elif kind == 'string':
+        return 'S{0}'.format(STRING_LENGTHS[ctp_type])
+    raise ValueError('unsupported ctp type {0}: {1}'.format(ctp_type, kind))
+
+
+def make_dtype(fields):
+    return np.dtype([(name, field_dtype(ctp_type)) for name, ctp_type in fields.items()])
+
+
+DEPTH_MARKET_DATA_DTYPE = make_dtype(DEPTH_MARKET_DATA_FIELDS)
+
+
+def make_record_class(class_name, fields):
+    """
+    生成带 __slots__ 的记录类型
+    :param class_name: 类名
+    :param fields: OrderedDict, 字段名 -> CTP 类型
+    :return: class
+    """
+    names = tuple(fields.keys())
+    from_dict_getter = itemgetter(*names)
+    values_getter = attrgetter(*names)
+
+    def __init__(self, *args):
+        for name, value in zip(names, args):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """API 回调里的 dict -> 记录，只拷贝引用"""
+        record = cls.__new__(cls)
+        for name, value in zip(names, from_dict_getter(data)):
+            setattr(record, name, value)
+        return record
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def values(self):
+        """按字段顺序返回 tuple，可以直接写入结构化数组的一行"""
+        return values_getter(self)
+
+    def to_dict(self):
+        return dict(zip(names, values_getter(self)))
+
+    def __repr__(self):
+        return '{0}({1})'.format(class_name, ', '.join('{0}={1!r}'.format(name, getattr(self, name, None))
+                                                      for name in names))
+
+    return type(class_name, (object,), {
+        '__slots__': names,
+        'fields': names,
+        'dtype': make_dtype(fields),
+        '__init__': __init__,
+        'from_dict': from_dict,
+        '__getitem__': __getitem__,
+        'values': values,
+        'to_dict': to_dict,
+        '__repr__': __repr__,
+    })
+
+
+DepthMarketData = make_record_class('DepthMarketData', DEPTH_MARKET_DATA_FIELDS)
+
+
+class DepthMarketDataArray(object):
+    """按行追加的深度行情结构化数组，用于记录整天的 tick"""
+
+    def __init__(self, capacity=4096):
+        self.__capacity = max(int(capacity), 1)
+        self.__size = 0
+        self.__array = np.zeros(self.__capacity, dtype=DEPTH_MARKET_DATA_DTYPE)
+        self.__from_dict = itemgetter(*DepthMarketData.fields)
+
+    def __len__(self):
+        return self.__size
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    def __grow(self, min_capacity):
+        capacity = self.__capacity
+        while capacity < min_capacity:
+            capacity *= 2
+        array = np.zeros(capacity, dtype=self.__array.dtype)
+        array[:self.__size] = self.__array[:self.__size]
+        self.__array = array
+        self.__capacity = capacity
+
+    def append(self, tick):
+        """
+        :param tick: DepthMarketData 或者 API 回调里的 dict
+        :return:
+        """
+        if self.__size == self.__capacity:
+            self.__grow(self.__size + 1)
+        if isinstance(tick, DepthMarketData):
+            self.__array[self.__size] = tick.values()
+        else:
+            self.__array[self.__size] = self.__from_dict(tick)
+        self.__size += 1
+
+    def extend(self, ticks):
+        for tick in ticks:
+            self.append(tick)
+
+    def array(self):
+        """已写入部分的视图，下一次扩容之前有效"""
+        return self.__array[:self.__size]
+
+    def __getitem__(self, item):
+        return self.array()[item]
+
+
+def to_structured_array(ticks):
+    """
+    一批 tick 一次性转成结构化数组
+    :param ticks: DepthMarketData 或 dict 的序列
+    :return: np.ndarray, dtype 为 DEPTH_MARKET_DATA_DTYPE
+    """
+    from_dict = itemgetter(*DepthMarketData.fields)
+    rows = [tick.values() if isinstance(tick, DepthMarketData) else from_dict(tick) for tick in ticks]
+    return np.array(rows, dtype=DEPTH_MARKET_DATA_DTYPE)
@@ -43,7 +43,7 @@ class EventType(Enum):
     EVENT_ERROR = 8  # 错误回报事件
     EVENT_MARKET_DATA = 9  # 常规行情事件
     EVENT_BAR_ARRIVE = 10  # Phil定义
-    EVENT_MARKET_DATA_CONTRACT = 11  # 特定合约行情事件
+    EVENT_MARKET_DATA_CONTRACT = 11  # 特定合约行情事件，实时行情已改为 EVENT_MARKET_DATA + 主题（合约代码）
     EVENT_INVESTOR = 12  # 投资者查询回报
     EVENT_INSTRUMENT = 13  # 合约查询回报
     EVENT_ORDER_ORDER_REF = 14  # 特定合约行情事件
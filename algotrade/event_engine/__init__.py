@@ -6,3 +6,5 @@ __author__ = 'phil.zhang'
 from event_engine import EventEngine
 from event_engine import Event
 from event_engine import EventEngineMixin
+from timer import ThreadTimer
+from timer import QtTimer
@@ -3,14 +3,12 @@
 # 系统模块
 from Queue import Queue, Empty
 from threading import Thread
-from collections import defaultdict
-# 第三方模块
-from PyQt4.QtCore import QTimer
-from numba import jit
+from collections import defaultdict, deque
 
 # 自己开发的模块
 # from eventType import *
 from algotrade.const import EventType
+from algotrade.event_engine.timer import make_timer
 
 
 ########################################################################
@@ -21,12 +19,25 @@ class EventEngine:
     事件驱动引擎中所有的变量都设置为了私有，这是为了防止不小心
     从外部修改了这些变量的值或状态，导致bug。
 
+    两种运行方式
+    threaded=False（回测）：事件队列是 deque，单一生产者下 append/popleft 不需要加锁，
+                        由调用方在同一线程里 put 之后调用 run() 处理完队列中的所有事件
+    threaded=True（实盘）：事件队列是 Queue，start() 之后由事件处理线程阻塞等待事件，
+                        每次取到事件后顺带取出队列里已有的事件（最多 batch_size 个）一起处理
+
     变量说明
     __queue：私有变量，事件队列
     __active：私有变量，事件引擎开关
     __thread：私有变量，事件处理线程
     __timer：私有变量，计时器
-    __handlers：私有变量，事件处理函数字典
+    __handlers：私有变量，事件处理函数字典，键为 (事件类型, 主题)
+    __handler_table：私有变量，事件类型 -> (通用处理函数元组, {主题: 处理函数元组})，
+                     register/unregister 时重建，处理事件时不再做任何查找以外的工作
+
+    主题
+    事件可以带一个主题（比如合约代码）。register 时不指定主题的处理函数收到该类型的
+    所有事件，指定了主题的只收到该主题的事件。一个带主题的事件只需要 put 一次，
+    就会按先通用、后特定主题的顺序分发给两类处理函数。
 
 
     方法说明
@@ -53,51 +64,116 @@ class EventEngine:
 
     # ----------------------------------------------------------------------
 
-    def __init__(self):
-        """初始化事件引擎"""
+    def __init__(self, threaded=False, batch_size=64, timer=None, timer_interval=1):
+        """
+        初始化事件引擎
+        :param threaded: True 时用单独的线程阻塞处理事件（实盘），否则由调用方调用 run()（回测）
+        :param batch_size: 实盘模式下事件处理线程一次最多处理的事件个数
+        :param timer: 计时器后端，None 表示不产生计时器事件；'thread'、'qt' 或计时器类，
+                      见 algotrade.event_engine.timer
+        :param timer_interval: 计时器事件间隔，单位秒
+        """
+        self.__threaded = threaded
+        self.__batch_size = batch_size
+
         # 事件队列
-        self.__queue = Queue()
+        if threaded:
+            self.__queue = Queue()
+            self.__put = self.__queue.put
+        else:
+            self.__queue = deque()
+            self.__put = self.__queue.append
 
         # 事件引擎开关
         self.__active = False
 
-        # 事件处理线程
-        self.__thread = Thread(target=self.run)
+        # 事件处理线程，start() 时创建
+        self.__thread = None
 
         # 计时器，用于触发计时器事件
-        self.__timer = QTimer()
-        self.__timer.timeout.connect(self.__on_timer)
+        self.__timer = None
+        if timer is not None:
+            self.__timer = make_timer(timer, timer_interval, self.__on_timer)
 
         # 这里的__handlers是一个字典，用来保存对应的事件调用关系
         # 其中每个键对应的值是一个列表，列表中保存了对该事件进行监听的函数功能
 
         #
         self.__handlers = defaultdict(list)
+        # 事件类型 -> 已注册的主题
+        self.__topics = defaultdict(set)
+        self.__handler_table = {}
 
     # ----------------------------------------------------------------------
-    # @jit
     def run(self):
-        """引擎运行"""
+        """引擎运行，处理完队列中当前所有的事件（包括处理过程中新产生的事件）后返回"""
+        if self.__threaded:
+            self.__drain_queue()
+            return
+
+        queue = self.__queue
+        popleft = queue.popleft
+        handler_table = self.__handler_table
+        while self.__active and queue:
+            event = popleft()
+            entry = handler_table.get(event.type_)
+            if entry is None:
+                continue
+            for handler in entry[1].get(event.topic, entry[0]):
+                handler(event)
+
+    # ----------------------------------------------------------------------
+    def __drain_queue(self):
         while self.__active:
             try:
-                event = self.__queue.get(
-                    False)  # 获取事件的阻塞时间设为1秒
-                self.__process(event)
+                event = self.__queue.get(False)
             except Empty:
                 break
+            self.__process(event)
+
+    # ----------------------------------------------------------------------
+    def __run_threaded(self):
+        """事件处理线程"""
+        queue = self.__queue
+        batch = []
+        while self.__active:
+            try:
+                # 阻塞等待，超时只是为了能检查引擎开关
+                batch.append(queue.get(True, 1))
+            except Empty:
+                continue
+            # 把已经到达的事件一起取出来，减少锁和唤醒的次数
+            try:
+                while len(batch) < self.__batch_size:
+                    batch.append(queue.get(False))
+            except Empty:
+                pass
+            for event in batch:
+                self.__process(event)
+            del batch[:]
 
     # ----------------------------------------------------------------------
-    # @jit
     def __process(self, event):
         """处理事件"""
-        # 检查是否存在对该事件进行监听的处理函数
-
-        # 若存在，则按顺序将事件传递给处理函数执行
-        [handler(event) for handler in self.__handlers[event.type_] if event.type_ in self.__handlers]
+        # 按注册顺序将事件传递给处理函数执行
+        entry = self.__handler_table.get(event.type_)
+        if entry is None:
+            return
+        for handler in entry[1].get(event.topic, entry[0]):
+            handler(event)
 
-        # 以上语句为Python列表解析方式的写法，对应的常规循环写法为：
-        # for handler in self.__handlers[event.type_]:
-        # handler(event)
+    # ----------------------------------------------------------------------
+    def __rebuild_handler_table(self, type_):
+        generic = self.__handlers.get((type_, None), [])
+        by_topic = {}
+        for topic in self.__topics[type_]:
+            specific = self.__handlers.get((type_, topic))
+            if specific:
+                by_topic[topic] = tuple(generic + specific)
+        if generic or by_topic:
+            self.__handler_table[type_] = (tuple(generic), by_topic)
+        else:
+            self.__handler_table.pop(type_, None)
 
     # ----------------------------------------------------------------------
     def __on_timer(self):
@@ -115,10 +191,14 @@ class EventEngine:
         self.__active = True
 
         # 启动事件处理线程
-        # self.__thread.start()
+        if self.__threaded and (self.__thread is None or not self.__thread.is_alive()):
+            self.__thread = Thread(target=self.__run_threaded)
+            self.__thread.daemon = True
+            self.__thread.start()
 
         # 启动计时器，计时器事件间隔默认设定为1秒
-        # self.__timer.start(1000)
+        if self.__timer is not None:
+            self.__timer.start()
 
     # ----------------------------------------------------------------------
     def stop(self):
@@ -127,14 +207,21 @@ class EventEngine:
         self.__active = False
 
         # 停止计时器
-        self.__timer.stop()
+        if self.__timer is not None:
+            self.__timer.stop()
 
         # 等待事件处理线程退出
-        self.__thread.join()
+        if self.__thread is not None and self.__thread.is_alive():
+            self.__thread.join()
 
     # ----------------------------------------------------------------------
-    def register(self, type_, handler):
-        """注册事件处理函数监听"""
+    def register(self, type_, handler, topic=None):
+        """
+        注册事件处理函数监听
+        :param type_: EventType
+        :param handler: 处理函数
+        :param topic: 只监听该主题（比如合约代码）的事件，None 表示监听所有事件
+        """
         # 尝试获取该事件类型对应的处理函数列表，若无则创建
         # try:
         #     handler_list = self.__handlers[type_]
@@ -147,11 +234,15 @@ class EventEngine:
         #     handler_list.append(handler)
 
         # assert isinstance(type_, basestring)
-        if handler not in self.__handlers[type_]:
-            self.__handlers[type_].append(handler)
+        handlers = self.__handlers[(type_, topic)]
+        if handler not in handlers:
+            handlers.append(handler)
+            if topic is not None:
+                self.__topics[type_].add(topic)
+            self.__rebuild_handler_table(type_)
 
     # ----------------------------------------------------------------------
-    def unregister(self, type_, handler):
+    def unregister(self, type_, handler, topic=None):
         # """注销事件处理函数监听"""
         # # 尝试获取该事件类型对应的处理函数列表，若无则忽略该次注销请求
         # try:
@@ -166,13 +257,18 @@ class EventEngine:
         #         del self.handlers[type_]
         # except KeyError:
         #     pass
-        if handler in self.__handlers[type_]:
-            self.__handlers[type_].remove(handler)
+        handlers = self.__handlers.get((type_, topic), [])
+        if handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self.__handlers[(type_, topic)]
+                self.__topics[type_].discard(topic)
+            self.__rebuild_handler_table(type_)
 
     # ----------------------------------------------------------------------
     def put(self, event):
         """向事件队列中存入事件"""
-        self.__queue.put(event)
+        self.__put(event)
 
 
 ########################################################################
@@ -181,12 +277,13 @@ class Event:
 
     # ----------------------------------------------------------------------
 
-    def __init__(self, type_=None, dict_=None):
+    def __init__(self, type_=None, dict_=None, topic=None):
         """Constructor
         :rtype : object
         """
         self.type_ = type_  # 事件类型
         self.dict_ = dict_  # 字典用于保存具体的事件数据
+        self.topic = topic  # 事件主题，比如合约代码，见 EventEngine.register
 
 
 class EventEngineMixin(object):
@@ -205,7 +302,7 @@ def test():
 
     app = QCoreApplication(sys.argv)
 
-    ee = EventEngine()
+    ee = EventEngine(threaded=True, timer='qt')
     # ee.register(EVENT_TIMER, simple_test)
     ee.register(EventType.EVENT_TIMER, simple_test)
     ee.start()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+"""
+事件引擎吞吐量测试，输出两种模式下每秒处理的事件数，以及在新的解释器里
+导入 algotrade.event_engine 并创建一个引擎所用的时间：
+
+    python -m algotrade.event_engine.event_engine_benchmark [事件个数]
+"""
+
+import sys
+import time
+import threading
+import subprocess
+
+from algotrade.const import EventType
+from algotrade.event_engine import EventEngine, Event
+
+
+def bench_backtest(n):
+    """回测方式：每个事件 put 之后立即 run()，与 BaseStrategy.run 一致"""
+    engine = EventEngine()
+    counter = [0]
+
+    def on_bar(event):
+        counter[0] += 1
+
+    engine.register(EventType.EVENT_BAR_ARRIVE, on_bar)
+    engine.start()
+    events = [Event(EventType.EVENT_BAR_ARRIVE, i) for i in xrange(n)]
+    start = time.time()
+    for event in events:
+        engine.put(event)
+        engine.run()
+    elapsed = time.time() - start
+    assert counter[0] == n
+    return n / elapsed
+
+
+def bench_threaded(n):
+    """实盘方式：生产者线程 put，事件处理线程阻塞等待并批量处理"""
+    engine = EventEngine(threaded=True)
+    done = threading.Event()
+    counter = [0]
+
+    def on_tick(event):
+        counter[0] += 1
+        if counter[0] == n:
+            done.set()
+
+    engine.register(EventType.EVENT_MARKET_DATA, on_tick)
+    engine.start()
+    events = [Event(EventType.EVENT_MARKET_DATA, i) for i in xrange(n)]
+    start = time.time()
+    for event in events:
+        engine.put(event)
+    done.wait()
+    elapsed = time.time() - start
+    engine.stop()
+    return n / elapsed
+
+
+def bench_topics(n, contracts=500):
+    """行情事件按合约代码分发：一个通用监听，每个合约一个特定监听"""
+    engine = EventEngine()
+    counter = [0]
+
+    def on_tick(event):
+        counter[0] += 1
+
+    instruments = ['c{0:04d}'.format(i) for i in xrange(contracts)]
+    engine.register(EventType.EVENT_MARKET_DATA, on_tick)
+    for instrument in instruments:
+        engine.register(EventType.EVENT_MARKET_DATA, on_tick, topic=instrument)
+    engine.start()
+    events = [Event(EventType.EVENT_MARKET_DATA, None, topic=instruments[i % contracts]) for i in xrange(n)]
+    start = time.time()
+    for event in events:
+        engine.put(event)
+        engine.run()
+    elapsed = time.time() - start
+    assert counter[0] == 2 * n
+    return n / elapsed
+
+
+IMPORT_SCRIPT = """
+import time
+start = time.time()
+from algotrade.event_engine import EventEngine
+EventEngine()
+print(time.time() - start)
+"""
+
+
+def bench_import(repeat=5):
+    """在新的解释器里导入并创建引擎，取最快的一次，单位秒"""
+    timings = []
+    for _ in xrange(repeat):
+        out = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT])
+        timings.append(float(out.strip()))
+    return min(timings)
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print('backtest: {0:,.0f} events/sec'.format(bench_backtest(n)))
+    print('threaded: {0:,.0f} events/sec'.format(bench_threaded(n)))
+    print('topics (500 contracts): {0:,.0f} ticks/sec'.format(bench_topics(n)))
+    print('import + construct: {0:.1f} ms'.format(bench_import() * 1000))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+import sys
+import threading
+import subprocess
+
+from algotrade.const import EventType
+from algotrade.event_engine import EventEngine, Event
+
+
+def test_backtest_dispatch():
+    engine = EventEngine()
+    received = []
+
+    def on_bar(event):
+        received.append(('bar', event.dict_))
+        # 处理过程中产生的事件在同一次 run() 里处理
+        if event.dict_ == 0:
+            engine.put(Event(EventType.EVENT_TIMER, 'timer'))
+
+    def on_timer(event):
+        received.append(('timer', event.dict_))
+
+    engine.register(EventType.EVENT_BAR_ARRIVE, on_bar)
+    engine.register(EventType.EVENT_BAR_ARRIVE, on_bar)
+    engine.register(EventType.EVENT_TIMER, on_timer)
+    engine.start()
+    engine.put(Event(EventType.EVENT_BAR_ARRIVE, 0))
+    engine.put(Event(EventType.EVENT_BAR_ARRIVE, 1))
+    engine.put(Event(EventType.EVENT_LOG, 'no handler'))
+    engine.run()
+    assert received == [('bar', 0), ('bar', 1), ('timer', 'timer')]
+
+    engine.unregister(EventType.EVENT_BAR_ARRIVE, on_bar)
+    engine.put(Event(EventType.EVENT_BAR_ARRIVE, 2))
+    engine.run()
+    assert len(received) == 3
+
+
+def test_threaded_dispatch():
+    engine = EventEngine(threaded=True, batch_size=8)
+    received = []
+    done = threading.Event()
+
+    def on_tick(event):
+        received.append(event.dict_)
+        if len(received) == 100:
+            done.set()
+
+    engine.register(EventType.EVENT_MARKET_DATA, on_tick)
+    engine.start()
+    for i in range(100):
+        engine.put(Event(EventType.EVENT_MARKET_DATA, i))
+    assert done.wait(5)
+    engine.stop()
+    assert received == list(range(100))
+
+
+def test_thread_timer():
+    engine = EventEngine(threaded=True, timer='thread', timer_interval=0.01)
+    fired = threading.Event()
+    engine.register(EventType.EVENT_TIMER, lambda event: fired.set())
+    engine.start()
+    assert fired.wait(5)
+    engine.stop()
+
+
+def test_import_is_headless():
+    # 导入事件引擎不应该带上 Qt、numba 和 matplotlib
+    script = ('import sys\n'
+              'from algotrade.event_engine import EventEngine\n'
+              'EventEngine()\n'
+              'print(sorted(m for m in ("PyQt4", "numba", "matplotlib") if m in sys.modules))\n')
+    out = subprocess.check_output([sys.executable, '-c', script])
+    assert out.strip() == '[]'
+
+
+def test_topic_dispatch():
+    engine = EventEngine()
+    received = []
+
+    def on_contract(event):
+        received.append(('IF1606', event.topic))
+
+    engine.register(EventType.EVENT_MARKET_DATA, lambda event: received.append(('all', event.topic)))
+    engine.register(EventType.EVENT_MARKET_DATA, on_contract, topic='IF1606')
+    engine.start()
+    for instrument in ['IF1606', 'rb1610', None]:
+        engine.put(Event(EventType.EVENT_MARKET_DATA, {'data': {}}, topic=instrument))
+    engine.run()
+    assert received == [('all', 'IF1606'), ('IF1606', 'IF1606'), ('all', 'rb1610'), ('all', None)]
+
+    engine.unregister(EventType.EVENT_MARKET_DATA, on_contract, topic='IF1606')
+    engine.put(Event(EventType.EVENT_MARKET_DATA, {'data': {}}, topic='IF1606'))
+    engine.run()
+    assert received[-1] == ('all', 'IF1606') and len(received) == 5
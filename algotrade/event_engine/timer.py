@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+"""
+事件引擎使用的计时器。
+
+所有计时器都只有 start()/stop() 两个方法，每隔 interval 秒调用一次 callback。
+ThreadTimer 只依赖标准库，回测、优化器的子进程和没有界面的服务器上都能用；
+QtTimer 需要 Qt 的事件循环，只有在真正创建时才导入 PyQt4。
+"""
+
+import threading
+
+
+class ThreadTimer(object):
+    """用一个后台线程实现的计时器"""
+
+    def __init__(self, interval, callback):
+        self.__interval = interval
+        self.__callback = callback
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def __run(self):
+        # wait 返回 False 说明超时，即到了触发时间
+        while not self.__stopped.wait(self.__interval):
+            self.__callback()
+
+    def start(self):
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stopped.clear()
+        self.__thread = threading.Thread(target=self.__run)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join()
+        self.__thread = None
+
+
+class QtTimer(object):
+    """PyQt4.QtCore.QTimer 的包装，需要在运行 Qt 事件循环的线程里使用"""
+
+    def __init__(self, interval, callback):
+        from PyQt4.QtCore import QTimer
+
+        self.__interval = interval
+        self.__timer = QTimer()
+        self.__timer.timeout.connect(callback)
+
+    def start(self):
+        self.__timer.start(int(self.__interval * 1000))
+
+    def stop(self):
+        self.__timer.stop()
+
+
+TIMER_BACKENDS = {
+    'thread': ThreadTimer,
+    'qt': QtTimer,
+}
+
+
+def make_timer(backend, interval, callback):
+    """
+    :param backend: 'thread', 'qt'，或者一个以 (interval, callback) 构造的计时器类
+    :param interval: 触发间隔，单位秒
+    :param callback: 无参数的回调函数
+    :return: 计时器对象
+    """
+    if isinstance(backend, basestring):
+        try:
+            backend = TIMER_BACKENDS[backend]
+        except KeyError:
+            raise ValueError('unknown timer backend: {0}'.format(backend))
+    return backend(interval, callback)
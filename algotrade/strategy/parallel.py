@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+"""
+多进程分片回测。
+
+合约（以及参数组合）被分成若干个分片，每个分片在进程池里用自己的
+SharedBarFeed 和策略独立跑一遍。bar 只加载一次，放在共享内存里（见
+algotrade.barfeed.shared_barfeed），子进程不需要重新读 csv 或接收 pickle 过的
+DataFrame。分片的划分只依赖排序后的合约代码，结果按 (参数序号, 分片序号)
+排列，与进程数和完成顺序无关，所以每次运行合并出来的结果都一样。
+
+    def make_strategy(barfeed, **params):
+        return MyStrategy(barfeed, broker=..., **params)
+
+    results = run_sharded(make_strategy, barfeed, n_shards=8,
+                          param_sets=[{'ta_factors': [('ACD', {})]}])
+    frames = merge_dataframes(results)
+
+strategy_factory 和 collect 会被 pickle 到子进程，必须是模块级的函数。
+
+目前只合并各分片的 DataFrame（bar 和指标）。每个分片有自己的 broker，
+资金、持仓和分析器的结果各自独立，需要时用 collect 取出后自行汇总。
+"""
+
+import multiprocessing
+from collections import namedtuple
+
+import pandas as pd
+
+from algotrade.barfeed.shared_barfeed import SharedBarStore, SharedBarFeed
+
+ShardResult = namedtuple('ShardResult', ['param_index', 'shard', 'instruments', 'params', 'result'])
+
+# 子进程里的 SharedBarStore，由 _init_worker 设置
+_store = None
+
+
+def partition_instruments(instruments, n_shards):
+    """
+    把排序后的合约轮流分到 n_shards 个分片里，去掉空的分片
+    :param instruments: list of instrument codes
+    :param n_shards: int
+    :return: list of lists
+    """
+    instruments = sorted(instruments)
+    shards = [instruments[i::n_shards] for i in range(n_shards)]
+    return [shard for shard in shards if shard]
+
+
+def collect_dataframe(strategy):
+    """默认的结果：策略所有合约的bar和指标"""
+    return strategy.dataframe
+
+
+def _init_worker(store):
+    global _store
+    _store = store
+
+
+def _run_shard(job):
+    param_index, shard, instruments, params, strategy_factory, collect = job
+    barfeed = SharedBarFeed(_store, instruments)
+    strategy = strategy_factory(barfeed, **params)
+    strategy.run()
+    return ShardResult(param_index, shard, tuple(instruments), params, collect(strategy))
+
+
+def run_sharded(strategy_factory, barfeed, n_shards=None, param_sets=None, collect=collect_dataframe,
+                processes=None):
+    """
+    :param strategy_factory: strategy_factory(barfeed, **params) -> BaseStrategy
+    :param barfeed: 已经 load_data_from_csv 的 CSVBarFeed，或者 SharedBarStore
+    :param n_shards: 合约分片个数，默认等于进程数
+    :param param_sets: 参数组合的列表，每个组合都在每个分片上跑一遍，默认 [{}]
+    :param collect: collect(strategy) -> 可以 pickle 的结果，在子进程里调用
+    :param processes: 进程数，默认 CPU 个数
+    :return: list of ShardResult，按 (param_index, shard) 排序
+    """
+    if isinstance(barfeed, SharedBarStore):
+        store = barfeed
+    else:
+        store = SharedBarStore.from_barfeed(barfeed)
+    processes = processes or multiprocessing.cpu_count()
+    shards = partition_instruments(store.instruments, n_shards or processes)
+    param_sets = param_sets or [{}]
+    jobs = [(param_index, shard, instruments, params, strategy_factory, collect)
+            for param_index, params in enumerate(param_sets)
+            for shard, instruments in enumerate(shards)]
+
+    pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(store,))
+    try:
+        # map 按提交顺序返回，合并结果与完成顺序无关
+        results = pool.map(_run_shard, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+
+def merge_dataframes(results):
+    """
+    把同一组参数下各个分片的 DataFrame 合并成一个，按时间、合约代码排序
+    :param results: run_sharded 的返回值，result 为 DataFrame
+    :return: list of DataFrame，与 param_sets 一一对应
+    """
+    frames = {}
+    for result in results:
+        frames.setdefault(result.param_index, []).append(result.result)
+    merged = []
+    for param_index in sorted(frames):
+        frame = pd.concat(frames[param_index])
+        # 稳定排序：先按合约，再按时间
+        frame = frame.iloc[frame['instrument'].values.argsort(kind='mergesort')]
+        frame = frame.iloc[frame.index.values.argsort(kind='mergesort')]
+        merged.append(frame)
+    return merged
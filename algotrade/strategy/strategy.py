@@ -1,17 +1,22 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import inspect
+import itertools
+from collections import deque
 
 import pandas as pd
-import concurrent.futures
 import numpy as np
 from numpy.testing.utils import assert_almost_equal
 
 import algotrade.technical as lsta
+from algotrade.technical import ls_talib_stream
+from algotrade.technical.indicator_pool import IndicatorPool
 from algotrade.const import EventType
 from algotrade.event_engine import Event
-from algotrade.technical.utils import (get_ta_functions, get_default_args, num_bars_to_accumulate)
+from algotrade.technical.utils import (get_ta_functions, get_default_args, num_bars_to_accumulate,
+                                       precompute_factors)
 from algotrade.barfeed import CSVBarFeed
+from algotrade.bar_buffer import BarBuffer
 from algotrade.broker import BackTestingBroker
 from algotrade import const
 
@@ -31,107 +36,169 @@ def merge_dicts(*dict_args):
 
 
 class BaseStrategy:
-    def __init__(self, barfeed, broker, ta_factors=None):
+    def __init__(self, barfeed, broker, ta_factors=None, incremental=False, precompute=False, processes=None):
+        """
+
+        :param incremental: True 时 ls_talib 中的指标用 ls_talib_stream 的增量版本计算，
+                            每根 bar O(1)，且是在全部历史上计算，而不是只在最后 lookback 行上
+        :param precompute: True 时在 run() 开始前对每个合约的全部历史把指标算一遍（只用于回测，
+                           barfeed 需要提供 get_dataframe），on_bar 里按行号取值
+        :param processes: 不为 None 时用 IndicatorPool 在这么多个常驻子进程里逐bar计算指标，
+                          指标多、计算量大时才比串行快，见 indicator_pool_benchmark.py
+        """
         self.barfeed = barfeed
         self.broker = broker
         self.__ta_factors = ta_factors
-        self.dataframe = pd.DataFrame()
+        self.__incremental = incremental
+        # (instrument, func_name) -> StreamFunction
+        self.__streams = {}
+        self.__precompute = precompute
+        # instrument -> {func_name: np.ndarray}
+        self.__precomputed = {}
+        self.__processes = processes
+        self.__indicator_pool = None
+        # IndicatorPool 算好、还没有被 on_bar 取走的结果，与 bar 的到达顺序一致
+        self.__pool_results = deque()
+        # 每个合约一个按列存储的缓冲区，代替逐行 DataFrame.append
+        self.__bar_buffers = {}
         self.event_engine = barfeed.event_engine
         self.event_engine.register(EventType.EVENT_BAR_ARRIVE, self.on_bar)
         #: TODO: 添加talib里面的函数
-        self.func_lib = merge_dicts(inspect.getmembers(lsta, inspect.isfunction), get_ta_functions())
+        ls_functions = inspect.getmembers(lsta, inspect.isfunction)
+        self.func_lib = merge_dicts(ls_functions, get_ta_functions())
+        # ls_talib 的函数名，on_bar 里逐个指标判断，只在这里 introspect 一次
+        self.__ls_function_names = set(name for name, _ in ls_functions)
 
     def run(self):
+        if self.__precompute:
+            self.__precompute_factors()
+        elif self.__processes:
+            self.__indicator_pool = IndicatorPool(self.__ta_factors, self.__processes)
         self.event_engine.start()
-        gen = self.__barfeed.next_bar()
+        gen = self.barfeed.next_bar()
         try:
+            if self.__indicator_pool is not None:
+                # 同一时刻各合约的 bar 一起发给子进程，子进程并行计算
+                for _, bars in itertools.groupby(gen, key=lambda bar: bar.date_time):
+                    bars = list(bars)
+                    self.__pool_results.extend(ret for _, ret in self.__indicator_pool.update_many(bars))
+                    for bar in bars:
+                        self.event_engine.put(Event(EventType.EVENT_BAR_ARRIVE, bar))
+                        self.event_engine.run()
+                self.on_finish()
+                return
             while True:
                 self.event_engine.put(
                     Event(EventType.EVENT_BAR_ARRIVE, gen.next()))
                 self.event_engine.run()
         except StopIteration:
             self.on_finish()
+        finally:
+            if self.__indicator_pool is not None:
+                self.__indicator_pool.close()
+                self.__indicator_pool = None
+
+    @property
+    def dataframe(self):
+        """
+        所有合约的bar和指标，按时间排序。每次访问都会重新生成，只在需要时调用
+        :return: DataFrame
+        """
+        if not self.__bar_buffers:
+            return pd.DataFrame()
+        frames = [buf.to_frame() for buf in self.__bar_buffers.values()]
+        return pd.concat(frames).sort_index(kind='mergesort')
+
+    def get_bar_buffer(self, instrument):
+        return self.__bar_buffers.get(instrument)
 
     def on_bar(self, event):
-        event_type, msg = event.type_, event.dict_
-        self.__append_data_frame(msg.values())
-        self.__calc_signals()
+        event_type, bar = event.type_, event.dict_
+        self.__append_bar(bar)
+        self.__calc_signals(bar)
         # self.on_finish()
 
-    def __calc_signals(self):
+    def __precompute_factors(self):
+        # 用到未来bar的指标预先算会泄露未来数据，仍然在 on_bar 里逐bar计算
+        ta_factors = [(func_name, param_dict) for func_name, param_dict in self.__ta_factors
+                      if func_name.upper() not in ls_talib_stream.LOOKAHEAD_FUNCTIONS]
+        for instrument in self.barfeed.instruments:
+            self.__precomputed[instrument] = precompute_factors(
+                self.barfeed.get_dataframe(instrument), ta_factors)
+
+    def __calc_signals(self, bar):
+        bar_buffer = self.__bar_buffers[bar.instrument]
+        precomputed = self.__precomputed.get(bar.instrument, {})
+        if precomputed:
+            # 同一合约的bar按顺序到达，缓冲区的行号就是预计算结果的行号
+            pos = len(bar_buffer) - 1
+            for func_name, values in precomputed.iteritems():
+                bar_buffer.set_value(func_name, values[pos])
+            if len(precomputed) == len(self.__ta_factors):
+                return
+
+        if self.__indicator_pool is not None:
+            # run() 里已经把这一时刻的 bar 发给子进程算好了，按到达顺序取出
+            for func_name, value in self.__pool_results.popleft().iteritems():
+                bar_buffer.set_value(func_name, value)
+            return
+
         for func_name, param_dict in self.__ta_factors:
+            if func_name in precomputed:
+                continue
+            if self.__incremental and func_name in ls_talib_stream.__all__:
+                self.__update_stream(bar_buffer, bar, func_name, param_dict)
+                continue
 
             try:
                 func = self.func_lib[func_name]
             except KeyError as e:
                 raise e
 
-            if not param_dict and func_name in dict(inspect.getmembers(lsta, inspect.isfunction)):
+            if not param_dict and func_name in self.__ls_function_names:
                 param_dict = get_default_args(func)
 
-            if func_name in dict(inspect.getmembers(lsta, inspect.isfunction)):
+            if func_name in self.__ls_function_names:
                 max_period = num_bars_to_accumulate(func_name=func_name, **param_dict)
             else:
                 max_period = func.lookback + 1
-            if len(self.dataframe) < max_period:
+            if len(bar_buffer) < max_period:
                 continue
             else:
+                ind = bar_buffer.last_date_time()
                 try:
-                    # TODO: 这里需要修改，合成一句
-                    ret = func(self.dataframe.iloc[-max_period:], **param_dict)
-                    if len(ret.shape) > 1:
+                    if func_name in self.__ls_function_names:
+                        # ls_talib 需要 DataFrame，只拷贝最后 max_period 行
+                        ret = func(bar_buffer.tail_frame(max_period), **param_dict)
+                    else:
+                        # TA-Lib 直接吃 numpy 数组，传视图，不拷贝
+                        ret = func(bar_buffer.tail(max_period), **param_dict)
+                    if isinstance(ret, list):
+                        ret = ret[0]
+                    elif len(ret.shape) > 1:
                         ret = ret.ix[:, 0]
-                    ind = self.dataframe.index[-1]
-                    print len(self.dataframe), func_name, ind, ret[-1]
-                    self.dataframe.ix[ind, func_name] = ret[-1]
+                    bar_buffer.set_value(func_name, ret[-1])
                 except IndexError as e:
                     print('__name={0},ind={1}'.format(func_name, ind))
-                    raise e(func_name + ' ' + ind)
-
-    def __calc_signals_concurrency(self):
-        """
-        deprecated: 速度慢
-        :return:
-        """
-        futures = set()
-        with concurrent.futures.ProcessPoolExecutor(max_workers=4) as executor:
-            for func_name, param_dict in self.__ta_factors:
-                try:
-                    func = self.func_lib[func_name]
-                except KeyError as e:
                     raise e
 
-                if not param_dict and func_name in inspect.getmembers(lsta, inspect.isfunction):
-                    param_dict = get_default_args(func)
-
-                if func_name in inspect.getmembers(lsta, inspect.isfunction):
-                    max_period = num_bars_to_accumulate(func_name=func_name, **param_dict)
-                else:
-                    max_period = func.lookback + 1
-                if len(self.dataframe) < max_period:
-                    continue
-                else:
-                    future = executor.submit(func, self.dataframe.tail(max_period), **param_dict)
-                    futures.add(future)
-
-        for future in concurrent.futures.as_completed(futures):
-            ret = future.result()
-            if len(ret.shape) > 1:
-                ret = ret.ix[:, 0]
-            ind = self.dataframe.index[-1]
-            print len(self.dataframe), func_name, ind, ret[-1]
-            self.dataframe.ix[ind, func_name] = ret[-1]
+    def __update_stream(self, bar_buffer, bar, func_name, param_dict):
+        key = (bar.instrument, func_name)
+        try:
+            indicator = self.__streams[key]
+        except KeyError:
+            indicator = self.__streams[key] = ls_talib_stream.stream(func_name, **(param_dict or {}))
+        bar_buffer.set_value(func_name, indicator.update_bar(bar))
 
     def on_finish(self):
         print(self.dataframe)
 
-    def __append_data_frame(self, bar):
-        # bar_ = {key: [val] for key,val in bar.iteritems()}
-        bar_frame = pd.DataFrame([bar], index=[bar['date_time']])
-        self.dataframe = self.dataframe.append(bar_frame)
-
-    def __update_data_frame(self, minibar):
-        self.dataframe[self.dataframe.index[-1]] = minibar
+    def __append_bar(self, bar):
+        try:
+            bar_buffer = self.__bar_buffers[bar.instrument]
+        except KeyError:
+            bar_buffer = self.__bar_buffers[bar.instrument] = BarBuffer(bar.instrument)
+        bar_buffer.append(bar)
 
     def limit_order(self, instrument, limit_price, quantity, good_till_canceled=False, all_or_none=False):
         """Submits a limit order.
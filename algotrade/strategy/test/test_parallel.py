@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.util.testing import assert_frame_equal
+
+from algotrade.barfeed.shared_barfeed import SharedBarStore, SharedBarFeed
+from algotrade.strategy.parallel import partition_instruments, run_sharded, merge_dataframes
+from algotrade.strategy.strategy import BaseStrategy
+
+TA_FACTORS = [('ACD', {}), ('TMA', {'timeperiod': 7})]
+
+
+def _dataframes(n_instruments=5, n=60):
+    rs = np.random.RandomState(0)
+    frames = OrderedDict()
+    for i in range(n_instruments):
+        close = 20 + np.cumsum(rs.normal(0, 0.5, n - i))
+        frames['s%02d' % i] = pd.DataFrame(
+            OrderedDict([('open', close + rs.normal(0, 0.3, n - i)), ('high', close + 1), ('low', close - 1),
+                         ('close', close), ('volume', rs.randint(1000, 5000, n - i).astype(float)),
+                         ('adj_close', close)]),
+            index=pd.date_range('2000-01-01', periods=n - i))
+    return frames
+
+
+class QuietStrategy(BaseStrategy):
+    def on_finish(self):
+        pass
+
+
+def make_strategy(barfeed, **params):
+    return QuietStrategy(barfeed, None, **params)
+
+
+def test_partition_instruments():
+    assert partition_instruments(['c', 'a', 'b', 'd', 'e'], 2) == [['a', 'c', 'e'], ['b', 'd']]
+    assert partition_instruments(['a', 'b'], 4) == [['a'], ['b']]
+
+
+def test_sharded_matches_single_process():
+    store = SharedBarStore(_dataframes())
+    param_sets = [{'ta_factors': TA_FACTORS}, {'ta_factors': TA_FACTORS[:1]}]
+    results = run_sharded(make_strategy, store, n_shards=2, param_sets=param_sets, processes=2)
+    assert [(r.param_index, r.shard) for r in results] == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    merged = merge_dataframes(results)
+    assert len(merged) == 2
+
+    for params, frame in zip(param_sets, merged):
+        strategy = make_strategy(SharedBarFeed(store), **params)
+        strategy.run()
+        expected = strategy.dataframe
+        expected = expected.iloc[expected['instrument'].values.argsort(kind='mergesort')]
+        expected = expected.iloc[expected.index.values.argsort(kind='mergesort')]
+        assert_frame_equal(frame, expected)
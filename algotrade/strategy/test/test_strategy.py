@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.testing.utils import assert_array_equal
+
+from algotrade.barfeed.shared_barfeed import SharedBarStore, SharedBarFeed
+from algotrade.strategy.strategy import BaseStrategy
+
+TA_FACTORS = [('ACD', {}), ('MTM', {}), ('TMA', {'timeperiod': 7}), ('DPO', {})]
+
+
+def _dataframes(n_instruments=2, n=80):
+    rs = np.random.RandomState(0)
+    frames = OrderedDict()
+    for i in range(n_instruments):
+        close = 20 + np.cumsum(rs.normal(0, 0.5, n))
+        frames['s%02d' % i] = pd.DataFrame(
+            OrderedDict([('open', close + rs.normal(0, 0.3, n)), ('high', close + 1), ('low', close - 1),
+                         ('close', close), ('volume', rs.randint(1000, 5000, n).astype(float)),
+                         ('adj_close', close)]),
+            index=pd.date_range('2000-01-01', periods=n))
+    return frames
+
+
+class SignalRecorder(BaseStrategy):
+    """记录每根bar到达时指标的取值，而不是回测结束后的结果"""
+
+    def __init__(self, barfeed, **kwargs):
+        BaseStrategy.__init__(self, barfeed, None, TA_FACTORS, **kwargs)
+        self.signals = []
+
+    def on_bar(self, event):
+        BaseStrategy.on_bar(self, event)
+        bar_buffer = self.get_bar_buffer(event.dict_.instrument)
+        self.signals.append([bar_buffer.column(func_name)[-1] if func_name in bar_buffer.columns else np.nan
+                             for func_name, _ in TA_FACTORS])
+
+    def on_finish(self):
+        pass
+
+
+def _run(**kwargs):
+    strategy = SignalRecorder(SharedBarFeed(SharedBarStore(_dataframes())), **kwargs)
+    strategy.run()
+    return np.array(strategy.signals, dtype=np.float64)
+
+
+def test_precompute_matches_incremental():
+    precomputed = _run(precompute=True)
+    incremental = _run(incremental=True)
+    assert precomputed.shape == (160, len(TA_FACTORS))
+    for i in range(len(precomputed)):
+        assert_array_equal(precomputed[i], incremental[i])
+    # DPO 在最新一根bar上用不到未来数据，两种方式都只能是 NaN
+    assert np.isnan(precomputed[:, -1]).all()
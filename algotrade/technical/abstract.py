@@ -9,6 +9,7 @@ import talib.abstract as ab
 import numpy as np
 
 import ls_talib
+import ls_talib_stream
 
 _LS_FUNCTION_NAMES = set(ls_talib.__all__)
 
@@ -131,6 +132,17 @@ class Function(ab.Function):
         # print len(tables)
         return tables[func_name]
 
+    def stream(self):
+        """
+        返回同样参数的增量版本，每根 bar 调用一次 update_bar
+        :return: ls_talib_stream.StreamFunction
+        """
+        # 先于取默认参数检查：talib 函数在 ls_talib 里没有默认参数可取；错误与 ls_talib_stream.stream 一致
+        if self.__name not in _LS_FUNCTION_NAMES:
+            raise KeyError('%s has no incremental version' % self.__name)
+        kwargs = self.parameters if self.parameters else self.__get_default_args(self.__name)
+        return ls_talib_stream.stream(self.__name, **kwargs)
+
     @property
     def default_args(self):
         return self.__get_default_args(self.__name)
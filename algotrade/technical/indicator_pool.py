@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+"""
+多进程逐bar计算指标。
+
+原来的 BaseStrategy.__calc_signals_concurrency 每根 bar 新建一个
+ProcessPoolExecutor，并且给每个指标 pickle 一份 DataFrame，比串行还慢。
+
+IndicatorPool 在创建时启动固定个数的子进程，每个合约固定分给一个子进程，
+合约的历史 bar 保存在该子进程的 BarBuffer 里。之后每根 bar 只把这一行的
+数值发过去，子进程算完该合约的所有指标后一次性返回。update_many 可以把同一
+时刻多个合约的 bar 打包，每个子进程只收发一条消息。
+
+IndicatorCalculator 是单个进程里的同一套计算，串行计算时也可以直接用。
+"""
+
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+import ls_talib
+from algotrade.bar_buffer import BarBuffer
+from algotrade.technical.abstract import Function
+from algotrade.technical.utils import num_bars_to_accumulate
+
+
+# ls_talib 函数开头检查输入长度 >= timeperiod，这些函数还要多几行
+_EXTRA_INPUT_ROWS = {'TMA': 1}
+
+
+def _ls_window(func_name, periods):
+    """
+    ls_talib 函数需要的行数，两张 lookback 表都不完整，取能查到的较大值，
+    并且不小于函数本身对输入长度的检查
+    """
+    windows = [periods.get('timeperiod', 1) + _EXTRA_INPUT_ROWS.get(func_name, 0)]
+    try:
+        windows.append(num_bars_to_accumulate(func_name=func_name, **periods))
+    except KeyError:
+        pass
+    try:
+        windows.append(Function(func_name, **periods).lookback + 1)
+    except KeyError:
+        pass
+    return max(windows)
+
+
+class IndicatorCalculator(object):
+    def __init__(self, ta_factors):
+        """
+
+        :param ta_factors: [(func_name, param_dict), ...], ls_talib 和 TA-Lib 的函数都可以
+        """
+        self.__factors = []
+        for func_name, param_dict in ta_factors:
+            param_dict = dict(param_dict or {})
+            if func_name in ls_talib.__all__:
+                func = getattr(ls_talib, func_name)
+                periods = dict(Function(func_name).default_args, **param_dict)
+                periods = dict((key, val) for key, val in periods.items() if key.startswith('timeperiod'))
+                self.__factors.append((func_name, func, param_dict, _ls_window(func_name, periods), True))
+            else:
+                func = Function(func_name, **param_dict)
+                self.__factors.append((func_name, func, {}, func.lookback + 1, False))
+
+    @property
+    def func_names(self):
+        return [factor[0] for factor in self.__factors]
+
+    def calculate(self, bar_buffer):
+        """
+        在 bar_buffer 最后一行上计算所有指标
+        :param bar_buffer: BarBuffer
+        :return: dict, func_name -> float, 数据不够时为 NaN
+        """
+        ret = {}
+        size = len(bar_buffer)
+        for func_name, func, param_dict, window, is_ls in self.__factors:
+            if size < window:
+                ret[func_name] = np.nan
+                continue
+            if is_ls:
+                # ls_talib 需要 DataFrame，只拷贝最后 window 行
+                values = func(bar_buffer.tail_frame(window), **param_dict)
+            else:
+                # TA-Lib 直接吃 numpy 数组，传视图，不拷贝
+                values = func(bar_buffer.tail(window))
+            if isinstance(values, list):
+                values = values[0]
+            elif isinstance(values, pd.DataFrame):
+                values = values.iloc[:, 0]
+            ret[func_name] = float(np.asarray(values)[-1])
+        return ret
+
+
+def _bar_row(bar):
+    return bar.date_time, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.adj_close
+
+
+def _worker(conn, ta_factors):
+    calculator = IndicatorCalculator(ta_factors)
+    bar_buffers = {}
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        results = []
+        for instrument, row in message:
+            try:
+                bar_buffer = bar_buffers[instrument]
+            except KeyError:
+                bar_buffer = bar_buffers[instrument] = BarBuffer(instrument)
+            bar_buffer.append_values(*row)
+            results.append((instrument, calculator.calculate(bar_buffer)))
+        conn.send(results)
+    conn.close()
+
+
+class IndicatorPool(object):
+    def __init__(self, ta_factors, processes=None):
+        """
+
+        :param ta_factors: [(func_name, param_dict), ...]
+        :param processes: 子进程个数，默认 CPU 个数
+        """
+        processes = processes or multiprocessing.cpu_count()
+        self.__connections = []
+        self.__processes = []
+        # instrument -> 子进程序号，按第一次出现的顺序轮流分配
+        self.__assignments = {}
+        for _ in range(processes):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(child_conn, ta_factors))
+            process.daemon = True
+            process.start()
+            child_conn.close()
+            self.__connections.append(parent_conn)
+            self.__processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __worker_of(self, instrument):
+        try:
+            return self.__assignments[instrument]
+        except KeyError:
+            worker = self.__assignments[instrument] = len(self.__assignments) % len(self.__connections)
+            return worker
+
+    def update(self, bar):
+        """
+        :param bar: algotrade.bar.Bar
+        :return: dict, func_name -> float
+        """
+        conn = self.__connections[self.__worker_of(bar.instrument)]
+        conn.send([(bar.instrument, _bar_row(bar))])
+        return conn.recv()[0][1]
+
+    def update_many(self, bars):
+        """
+        一批 bar（通常是同一时刻不同合约的 bar），每个子进程只收发一条消息。
+        同一个合约的多根 bar 按顺序处理。
+        :param bars: list of Bar
+        :return: list of (instrument, dict)，与 bars 一一对应
+        """
+        batches = {}
+        for i, bar in enumerate(bars):
+            batches.setdefault(self.__worker_of(bar.instrument), []).append((i, bar))
+        # 先全部发出去，子进程并行计算，再依次收回
+        for worker, batch in batches.items():
+            self.__connections[worker].send([(bar.instrument, _bar_row(bar)) for i, bar in batch])
+        ret = [None] * len(bars)
+        for worker, batch in batches.items():
+            for (i, bar), result in zip(batch, self.__connections[worker].recv()):
+                ret[i] = result
+        return ret
+
+    def close(self):
+        for conn in self.__connections:
+            try:
+                conn.send(None)
+            except (IOError, EOFError):
+                pass
+        for process in self.__processes:
+            process.join()
+        self.__connections = []
+        self.__processes = []
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+"""
+逐bar计算指标：串行（IndicatorCalculator）与常驻子进程（IndicatorPool）的对比。
+
+    python -m algotrade.technical.indicator_pool_benchmark [子进程个数]
+
+每一行是一组（合约个数, 指标个数），输出两种方式每秒处理的 bar 数。指标少、
+合约少时进程间通信的开销占主导，串行更快；每根 bar 的计算量足够大时多进程
+才开始占优，表中 speedup 第一次大于 1 的位置就是分界点。
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import ls_talib
+from algotrade.bar import Bar
+from algotrade.bar_buffer import BarBuffer
+from algotrade.const import FREQUENCY
+from algotrade.technical.indicator_pool import IndicatorCalculator, IndicatorPool
+
+
+def make_bars(n_instruments, n_bars, seed=0):
+    """按时间分组的 bar，每组是同一时刻所有合约的 bar"""
+    rs = np.random.RandomState(seed)
+    index = pd.date_range('2000-01-01', periods=n_bars)
+    steps = [[] for _ in range(n_bars)]
+    for i in range(n_instruments):
+        close = 20 + np.cumsum(rs.normal(0, 0.5, n_bars))
+        for t in range(n_bars):
+            steps[t].append(Bar(date_time=index[t], open_=close[t], high=close[t] + 1, low=close[t] - 1,
+                                close=close[t], volume=1000.0 + t, adj_close=close[t],
+                                frequency=FREQUENCY.DAY, instrument='s%03d' % i))
+    return steps
+
+
+def bench_serial(steps, ta_factors):
+    calculator = IndicatorCalculator(ta_factors)
+    bar_buffers = {}
+    n = 0
+    start = time.time()
+    for bars in steps:
+        for bar in bars:
+            try:
+                bar_buffer = bar_buffers[bar.instrument]
+            except KeyError:
+                bar_buffer = bar_buffers[bar.instrument] = BarBuffer(bar.instrument)
+            bar_buffer.append(bar)
+            calculator.calculate(bar_buffer)
+            n += 1
+    return n / (time.time() - start)
+
+
+def bench_pool(steps, ta_factors, processes):
+    with IndicatorPool(ta_factors, processes) as pool:
+        n = 0
+        start = time.time()
+        for bars in steps:
+            pool.update_many(bars)
+            n += len(bars)
+        return n / (time.time() - start)
+
+
+def main(processes=4, n_bars=60, instrument_counts=(1, 8, 32), factor_counts=(1, 4, 16)):
+    names = sorted(ls_talib.__all__)
+    print('{0:>11} {1:>10} {2:>12} {3:>12} {4:>8}'.format('instruments', 'indicators', 'serial', 'pool', 'speedup'))
+    for n_instruments in instrument_counts:
+        steps = make_bars(n_instruments, n_bars)
+        for n_factors in factor_counts:
+            ta_factors = [(name, {}) for name in names[:n_factors]]
+            serial = bench_serial(steps, ta_factors)
+            pool = bench_pool(steps, ta_factors, processes)
+            print('{0:>11} {1:>10} {2:>12,.0f} {3:>12,.0f} {4:>8.2f}'.format(
+                n_instruments, n_factors, serial, pool, pool / serial))
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -0,0 +1,1268 @@
+# coding:utf-8
+"""
+ls_talib 的增量（流式）版本。
+
+ls_talib 中的每个函数都是对整段 DataFrame 做批量计算，策略里每来一根 bar 就要
+把最后 lookback 行重新算一遍，只取最后一个值。这里的每个类与 ls_talib 中的同名
+函数一一对应，内部维护滚动和、递推 EMA 等状态，每根 bar 只做 O(1) 的更新：
+
+    acd = ACD(timeperiod=14)
+    for bar in bars:
+        value = acd.update_bar(bar)
+
+逐根 bar 喂入得到的序列与批量函数在整段数据上的结果逐位一致。为此各个基础
+算子严格按照 TA-Lib（SUM/SMA/EMA/MAX/MIN/STDDEV/RSI/CMO）和 pandas
+（rolling_sum/rolling_mean/rolling_max/rolling_std）的累加顺序实现，包括前导 NaN
+的处理方式。两处例外：
+
+    * 批量版本中用 scipy.ndimage.interpolation.shift 默认三次样条做平移的函数
+      （DDI、RI、TR、TSI、VHF、VR、VRSI、WAD），批量结果本身带有 1e-12 量级的
+      插值误差，增量版本用的是精确的前值；
+    * DMI 依赖 pandas 的 rolling_std，不同 pandas 版本的方差算法不同。
+
+DPO 使用了未来数据，最新一根 bar 上批量结果恒为 NaN，见 DPO 类的说明。
+"""
+from __future__ import division
+
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+nan = float('nan')
+inf = float('inf')
+
+
+# ======================================================================
+# 标量运算，语义与 numpy 一致（除零得到 inf/nan 而不是抛异常）
+# ======================================================================
+
+def _div(a, b):
+    if b == 0.0:
+        if a != a or a == 0.0:
+            return nan
+        return inf if (a > 0) == (math.copysign(1.0, b) > 0) else -inf
+    return a / b
+
+
+def _sqrt(x):
+    return math.sqrt(x) if x >= 0 else nan
+
+
+def _max2(a, b):
+    if a != a or b != b:
+        return nan
+    return a if a >= b else b
+
+
+def _min2(a, b):
+    if a != a or b != b:
+        return nan
+    return a if a <= b else b
+
+
+def _sign(x):
+    if x != x:
+        return nan
+    if x > 0:
+        return 1.0
+    if x < 0:
+        return -1.0
+    return 0.0
+
+
+def _isclose(a, b):
+    # np.isclose 的缺省参数
+    return abs(a - b) <= 1e-8 + 1e-5 * abs(b)
+
+
+def _isinf(x):
+    return x == inf or x == -inf
+
+
+# ======================================================================
+# 基础算子
+# ======================================================================
+
+class _Lag(object):
+    """x[t-n]，数据不够时返回 NaN"""
+
+    def __init__(self, n):
+        self.__n = n
+        self.__values = deque([nan] * n, maxlen=n) if n > 0 else None
+
+    def update(self, x):
+        if self.__n == 0:
+            return x
+        ret = self.__values[0]
+        self.__values.append(x)
+        return ret
+
+
+class _TaSum(object):
+    """
+    ta.SUM。跳过前导 NaN（与 talib 的 python 封装一致），之后
+    先加新值输出，再减去最旧的值，与 TA-Lib 的 periodTotal 顺序相同。
+    """
+
+    def __init__(self, n):
+        self.__n = n
+        self.__window = deque()
+        self.__total = 0.0
+        self.__started = False
+
+    def update(self, x):
+        if not self.__started:
+            if x != x:
+                return nan
+            self.__started = True
+        window = self.__window
+        window.append(x)
+        if len(window) < self.__n:
+            self.__total += x
+            return nan
+        ret = self.__total + x
+        self.__total = ret - window.popleft()
+        return ret
+
+
+class _TaSMA(object):
+    """ta.SMA"""
+
+    def __init__(self, n):
+        self.__n = n
+        self.__sum = _TaSum(n)
+
+    def update(self, x):
+        return self.__sum.update(x) / self.__n
+
+
+class _TaEMA(object):
+    """ta.EMA，用前 n 个值的均值做种子，之后递推"""
+
+    def __init__(self, n):
+        self.__n = n
+        self.__k = 2.0 / (n + 1)
+        self.__count = 0
+        self.__total = 0.0
+        self.__prev = nan
+
+    def update(self, x):
+        n = self.__n
+        if self.__count < n:
+            if self.__count == 0 and x != x:
+                return nan
+            self.__count += 1
+            self.__total += x
+            if self.__count < n:
+                return nan
+            self.__prev = self.__total / n
+            return self.__prev
+        self.__prev = ((x - self.__prev) * self.__k) + self.__prev
+        return self.__prev
+
+
+class _RollingExtreme(object):
+    """
+    滚动最大/最小值，单调队列实现，均摊 O(1)。
+    ta.MAX/ta.MIN 与 pd.rolling_max/pd.rolling_min 在没有中间 NaN 的情况下结果相同。
+    """
+
+    def __init__(self, n, is_max):
+        self.__n = n
+        self.__is_max = is_max
+        self.__queue = deque()
+        self.__count = 0
+
+    def update(self, x):
+        if self.__count == 0 and x != x:
+            return nan
+        i = self.__count
+        self.__count += 1
+        queue = self.__queue
+        if self.__is_max:
+            while queue and queue[-1][1] <= x:
+                queue.pop()
+        else:
+            while queue and queue[-1][1] >= x:
+                queue.pop()
+        queue.append((i, x))
+        if queue[0][0] <= i - self.__n:
+            queue.popleft()
+        return queue[0][1] if self.__count >= self.__n else nan
+
+
+def _TaMax(n):
+    return _RollingExtreme(n, True)
+
+
+def _TaMin(n):
+    return _RollingExtreme(n, False)
+
+
+_PdRollingMax = _TaMax
+
+
+class _TaStdDev(object):
+    """ta.STDDEV(nbdev=1)，按 TA_INT_VAR 的累加顺序"""
+
+    def __init__(self, n):
+        self.__n = n
+        self.__window = deque()
+        self.__total1 = 0.0
+        self.__total2 = 0.0
+        self.__started = False
+
+    def update(self, x):
+        if not self.__started:
+            if x != x:
+                return nan
+            self.__started = True
+        n = self.__n
+        window = self.__window
+        window.append(x)
+        self.__total1 += x
+        self.__total2 += x * x
+        if len(window) < n:
+            return nan
+        mean1 = self.__total1 / n
+        mean2 = self.__total2 / n
+        trailing = window.popleft()
+        self.__total1 -= trailing
+        self.__total2 -= trailing * trailing
+        var = mean2 - mean1 * mean1
+        return math.sqrt(var) if var >= 0.00000001 else 0.0
+
+
+class _TaMomentum(object):
+    """ta.RSI / ta.CMO 共用的 Wilder 平滑"""
+
+    def __init__(self, n):
+        self._n = n
+        self.__count = 0
+        self.__prev = nan
+        self.__gain = 0.0
+        self.__loss = 0.0
+
+    def _output(self, gain, loss):
+        raise NotImplementedError
+
+    def update(self, x):
+        if self.__count == 0:
+            if x != x:
+                return nan
+            self.__prev = x
+            self.__count = 1
+            return nan
+        n = self._n
+        diff = x - self.__prev
+        self.__prev = x
+        if self.__count <= n:
+            if diff < 0:
+                self.__loss -= diff
+            else:
+                self.__gain += diff
+            self.__count += 1
+            if self.__count <= n:
+                return nan
+        else:
+            self.__loss *= (n - 1)
+            self.__gain *= (n - 1)
+            if diff < 0:
+                self.__loss -= diff
+            else:
+                self.__gain += diff
+        self.__loss /= n
+        self.__gain /= n
+        return self._output(self.__gain, self.__loss)
+
+
+class _TaRSI(_TaMomentum):
+    def _output(self, gain, loss):
+        total = gain + loss
+        if -0.00000001 < total < 0.00000001:
+            return 0.0
+        return 100 * (gain / total)
+
+
+class _TaCMO(_TaMomentum):
+    def _output(self, gain, loss):
+        total = gain + loss
+        if -0.00000001 < total < 0.00000001:
+            return 0.0
+        return 100.0 * ((gain - loss) / total)
+
+
+class _PdRollingSum(object):
+    """pd.rolling_sum：窗口内有 NaN 时输出 NaN，先加后减"""
+
+    def __init__(self, n):
+        self.__n = n
+        self.__window = deque()
+        self.__nobs = 0
+        self.__total = 0.0
+
+    def update(self, x):
+        if x == x:
+            self.__nobs += 1
+            self.__total += x
+        window = self.__window
+        window.append(x)
+        if len(window) > self.__n:
+            prev = window.popleft()
+            if prev == prev:
+                self.__total -= prev
+                self.__nobs -= 1
+        return self.__total if self.__nobs >= self.__n else nan
+
+
+class _PdRollingMean(object):
+    """pd.rolling_mean，包括 pandas 对全正/全负窗口的符号修正"""
+
+    def __init__(self, n):
+        self.__n = n
+        self.__window = deque()
+        self.__nobs = 0
+        self.__neg_ct = 0
+        self.__total = 0.0
+
+    def update(self, x):
+        if x == x:
+            self.__nobs += 1
+            self.__total += x
+            if math.copysign(1.0, x) < 0:
+                self.__neg_ct += 1
+        window = self.__window
+        window.append(x)
+        if len(window) > self.__n:
+            prev = window.popleft()
+            if prev == prev:
+                self.__total -= prev
+                self.__nobs -= 1
+                if math.copysign(1.0, prev) < 0:
+                    self.__neg_ct -= 1
+        if self.__nobs < self.__n:
+            return nan
+        ret = self.__total / self.__nobs
+        if self.__neg_ct == 0 and ret < 0:
+            ret = 0.0
+        elif self.__neg_ct == self.__nobs and ret > 0:
+            ret = 0.0
+        return ret
+
+
+class _PdRollingStd(object):
+    """pd.rolling_std(ddof=1)，增删都用 Welford 更新"""
+
+    def __init__(self, n):
+        self.__n = n
+        self.__window = deque()
+        self.__nobs = 0
+        self.__mean = 0.0
+        self.__ssqdm = 0.0
+
+    def update(self, x):
+        window = self.__window
+        window.append(x)
+        prev = window.popleft() if len(window) > self.__n else nan
+        if x == x:
+            if prev == prev:
+                delta = x - prev
+                prev -= self.__mean
+                self.__mean += delta / self.__nobs
+                x -= self.__mean
+                self.__ssqdm += (x + prev) * delta
+            else:
+                self.__nobs += 1
+                delta = x - self.__mean
+                self.__mean += delta / self.__nobs
+                self.__ssqdm += delta * (x - self.__mean)
+        elif prev == prev:
+            self.__nobs -= 1
+            if self.__nobs:
+                delta = prev - self.__mean
+                self.__mean -= delta / self.__nobs
+                self.__ssqdm -= delta * (prev - self.__mean)
+            else:
+                self.__mean = 0.0
+                self.__ssqdm = 0.0
+        if self.__nobs < self.__n:
+            return nan
+        if self.__nobs == 1:
+            return 0.0
+        var = self.__ssqdm / (self.__nobs - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+# ======================================================================
+# 指标
+# ======================================================================
+
+class StreamFunction(object):
+    """
+    增量指标的基类。子类实现 _update，输入都是 float，返回最新一根 bar 上的值。
+    """
+
+    def __init__(self):
+        self.value = nan
+
+    def update(self, open_, high, low, close, volume):
+        self.value = self._update(float(open_), float(high), float(low), float(close), float(volume))
+        return self.value
+
+    def update_bar(self, bar):
+        """
+        :param bar: algotrade.bar.Bar
+        """
+        return self.update(bar.open, bar.high, bar.low, bar.close, bar.volume)
+
+    def _update(self, open_, high, low, close, volume):
+        raise NotImplementedError
+
+
+def _pick(price, open_, high, low, close):
+    if price == 'close':
+        return close
+    elif price == 'open':
+        return open_
+    elif price == 'high':
+        return high
+    return low
+
+
+class ACC(StreamFunction):
+    def __init__(self, timeperiod=12):
+        super(ACC, self).__init__()
+        self.__close_n = _Lag(timeperiod)
+        self.__mom_n = _Lag(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        mom = close - self.__close_n.update(close)
+        return mom - self.__mom_n.update(mom)
+
+
+class ACD(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(ACD, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__sum = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        close1 = self.__close1.update(close)
+        if close1 != close1:
+            dif = nan
+        elif _isclose(close, close1):
+            dif = 0.0
+        elif close > close1:
+            dif = close - _min2(low, close1)
+        else:
+            dif = close - _max2(high, close1)
+        return self.__sum.update(dif)
+
+
+class ADTM(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(ADTM, self).__init__()
+        self.__open1 = _Lag(1)
+        self.__stm = _TaSum(timeperiod)
+        self.__sbm = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        open1 = self.__open1.update(open_)
+        if open1 != open1:
+            dtm = dbm = nan
+        else:
+            dtm = 0.0 if open_ <= open1 else _max2(high - open_, open_ - open1)
+            dbm = 0.0 if open_ >= open1 else _max2(open_ - low, open_ - open1)
+        stm = self.__stm.update(dtm)
+        sbm = self.__sbm.update(dbm)
+        if stm != stm or sbm != sbm:
+            return nan
+        if _isclose(stm, sbm):
+            return 0.0
+        if stm > sbm:
+            return _div(stm - sbm, stm)
+        return _div(stm - sbm, sbm)
+
+
+class AR(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(AR, self).__init__()
+        self.__up = _PdRollingSum(timeperiod)
+        self.__down = _PdRollingSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        return _div(self.__up.update(high - open_), self.__down.update(open_ - low)) * 100
+
+
+class BR(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(BR, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__up = _TaSum(timeperiod)
+        self.__down = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        close1 = self.__close1.update(close)
+        max1 = high - close1
+        if max1 < 0:
+            max1 = 0.0
+        max2 = close1 - low
+        if max2 < 0:
+            max2 = 0.0
+        return _div(self.__up.update(max1), self.__down.update(max2)) * 100
+
+
+class ARC(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(ARC, self).__init__()
+        self.__close_n = _Lag(timeperiod)
+        self.__rcn1 = _Lag(1)
+        self.__mean = _PdRollingMean(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        rcn = _div(close, self.__close_n.update(close))
+        return self.__mean.update(self.__rcn1.update(rcn))
+
+
+class ASI(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(ASI, self).__init__()
+        self.__open1 = _Lag(1)
+        self.__low1 = _Lag(1)
+        self.__close1 = _Lag(1)
+        self.__sum = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        open1 = self.__open1.update(open_)
+        low1 = self.__low1.update(low)
+        close1 = self.__close1.update(close)
+
+        a = abs(high - close1)
+        b = abs(low - close1)
+        c = abs(high - low1)
+        d = abs(close1 - open1)
+        x = (close - close1) + 0.5 * (close - open_) + (close1 - open1)
+        k = _max2(a, b)
+        if a > b and a > c:
+            r = a + 0.5 * b + 0.25 * d
+        elif b > a and b > c:
+            r = b + 0.5 * a + 0.25 * d
+        else:
+            r = c + 0.25 * d
+        si = _div(16 * x, r) * k
+        return self.__sum.update(si)
+
+
+class BBI(StreamFunction):
+    def __init__(self, timeperiod1=3, timeperiod2=6, timeperiod3=12, timeperiod4=24):
+        super(BBI, self).__init__()
+        self.__ma1 = _PdRollingMean(timeperiod1)
+        self.__ma2 = _PdRollingMean(timeperiod2)
+        self.__ma3 = _PdRollingMean(timeperiod3)
+        self.__ma4 = _PdRollingMean(timeperiod4)
+
+    def _update(self, open_, high, low, close, volume):
+        return (self.__ma1.update(close) + self.__ma2.update(close) +
+                self.__ma3.update(close) + self.__ma4.update(close)) / 4
+
+
+class BIAS(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(BIAS, self).__init__()
+        self.__ma = _PdRollingMean(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        ma = self.__ma.update(close)
+        return _div(close - ma, ma) * 100
+
+
+class CMF(StreamFunction):
+    def __init__(self, timeperiod=20):
+        super(CMF, self).__init__()
+        self.__clv_sum = _PdRollingSum(timeperiod)
+        self.__volume_sum = _PdRollingSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        clv = _div((close - low) - (high - close), high - close) * volume
+        if _isinf(clv):
+            clv = volume
+        return _div(self.__clv_sum.update(clv), self.__volume_sum.update(volume))
+
+
+class CVI(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(CVI, self).__init__()
+        self.__ema = _TaEMA(timeperiod)
+        self.__ema_n = _Lag(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        ema = self.__ema.update(high - low)
+        cvi = _div(ema - self.__ema_n.update(ema), ema) * 100.0
+        return 0.0 if _isinf(cvi) else cvi
+
+
+class CR(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(CR, self).__init__()
+        self.__mid1 = _Lag(1)
+        self.__up = _TaSum(timeperiod)
+        self.__down = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        mid1 = self.__mid1.update((high + low + close) / 3.0)
+        up = self.__up.update(_max2(high - mid1, 0.0))
+        down = self.__down.update(_max2(mid1 - low, 0.0))
+        return _div(up, down) * 100
+
+
+class DBCD(StreamFunction):
+    def __init__(self, timeperiod1=14, timeperiod2=14, timeperiod3=14):
+        super(DBCD, self).__init__()
+        self.__bias = BIAS(timeperiod1)
+        self.__bias_n = _Lag(timeperiod2)
+        self.__sum = _PdRollingSum(timeperiod3)
+
+    def _update(self, open_, high, low, close, volume):
+        bias = self.__bias.update(open_, high, low, close, volume)
+        return self.__sum.update(bias - self.__bias_n.update(bias))
+
+
+class DDI(StreamFunction):
+    def __init__(self, timeperiod=20):
+        super(DDI, self).__init__()
+        self.__high1 = _Lag(1)
+        self.__low1 = _Lag(1)
+        self.__dmz = _TaSum(timeperiod)
+        self.__dmf = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        high1 = self.__high1.update(high)
+        low1 = self.__low1.update(low)
+        val_max = _max2(abs(high - high1), abs(low - low1))
+        # 与批量版本一致：条件为 False（包括 NaN）时 DMF 取 0
+        if high + low <= high1 + low1:
+            dmz, dmf = 0.0, val_max
+        else:
+            dmz, dmf = val_max, 0.0
+        sum_dmz = self.__dmz.update(dmz)
+        sum_dmf = self.__dmf.update(dmf)
+        total = sum_dmz + sum_dmf
+        return (_div(sum_dmz, total) - _div(sum_dmf, total)) * 100
+
+
+class DPO(StreamFunction):
+    """
+    批量版本是 CLOSE[t+K] - SMA[t+K]，用到了未来数据，所以最新一根 bar 上的值
+    永远是 NaN，update 也返回 NaN。lagged 是 K 根 bar 之前那一行的 DPO，
+    在当前 bar 上已经可以算出来。
+    """
+
+    def __init__(self, timeperiod=14):
+        super(DPO, self).__init__()
+        self.__ma = _PdRollingMean(timeperiod)
+        self.lagged = nan
+
+    def _update(self, open_, high, low, close, volume):
+        self.lagged = close - self.__ma.update(close)
+        return nan
+
+
+class DMI(StreamFunction):
+    def __init__(self, timeperiod1=5, timeperiod2=10):
+        super(DMI, self).__init__()
+        self.__std = _PdRollingStd(timeperiod1)
+        self.__ma = _PdRollingMean(timeperiod2)
+
+    def _update(self, open_, high, low, close, volume):
+        std = self.__std.update(close)
+        return _div(14 * self.__ma.update(std), std)
+
+
+class EMV(StreamFunction):
+    def __init__(self):
+        super(EMV, self).__init__()
+        self.__high1 = _Lag(1)
+        self.__low1 = _Lag(1)
+
+    def _update(self, open_, high, low, close, volume):
+        mm = ((high - low) - (self.__high1.update(high) - self.__low1.update(low))) / 2
+        br = _div(volume, high - low) / 10000
+        return _div(mm, br)
+
+
+class IMI(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(IMI, self).__init__()
+        self.__up = _TaSum(timeperiod)
+        self.__down = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        if close > open_:
+            u, d = close - open_, 0.0
+        else:
+            u, d = 0.0, open_ - close
+        usum = self.__up.update(u)
+        dsum = self.__down.update(d)
+        return _div(usum, usum + dsum) * 100
+
+
+class KVO(StreamFunction):
+    def __init__(self, timeperiod1=34, timeperiod2=55, timeperiod3=13):
+        super(KVO, self).__init__()
+        self.__tp1 = _Lag(1)
+        self.__ema1 = _TaEMA(timeperiod1)
+        self.__ema2 = _TaEMA(timeperiod2)
+        self.__trigger = _TaEMA(timeperiod3)
+
+    def _update(self, open_, high, low, close, volume):
+        tp = (high + low + close) / 3.0
+        sv = volume if tp > self.__tp1.update(tp) else -volume
+        kvo = self.__ema1.update(sv) - self.__ema2.update(sv)
+        return self.__trigger.update(kvo)
+
+
+class MI(StreamFunction):
+    def __init__(self, timeperiod=9):
+        super(MI, self).__init__()
+        self.__ema = _TaEMA(timeperiod)
+        self.__ema_ema = _TaEMA(timeperiod)
+        self.__sum = _PdRollingSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        ema = self.__ema.update(high - low)
+        return self.__sum.update(_div(ema, self.__ema_ema.update(ema)))
+
+
+class MTM(StreamFunction):
+    def __init__(self, timeperiod=20):
+        super(MTM, self).__init__()
+        self.__close_n = _Lag(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        return close - self.__close_n.update(close)
+
+
+class _VolumeIndex(StreamFunction):
+    """NVI/PVI 的公共部分，初值 1000"""
+
+    def __init__(self):
+        super(_VolumeIndex, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__volume1 = _Lag(1)
+        self.__index = None
+
+    def _step(self, index1, change):
+        raise NotImplementedError
+
+    def _accept(self, volume, volume1):
+        raise NotImplementedError
+
+    def _update(self, open_, high, low, close, volume):
+        close1 = self.__close1.update(close)
+        volume1 = self.__volume1.update(volume)
+        if self.__index is None:
+            self.__index = 1000.0
+        elif self._accept(volume, volume1):
+            self.__index = self._step(self.__index, _div(close - close1, close1))
+        return self.__index
+
+
+class NVI(_VolumeIndex):
+    def _accept(self, volume, volume1):
+        return volume < volume1
+
+    def _step(self, index1, change):
+        return index1 - change * index1
+
+
+class PVI(_VolumeIndex):
+    def _accept(self, volume, volume1):
+        return volume > volume1
+
+    def _step(self, index1, change):
+        return index1 + change * index1
+
+
+class PFE(StreamFunction):
+    def __init__(self, timeperiod1=10, timeperiod2=5):
+        super(PFE, self).__init__()
+        self.__timeperiod1 = timeperiod1
+        self.__close_n = _Lag(timeperiod1)
+        self.__close1 = _Lag(1)
+        self.__sum = _PdRollingSum(timeperiod1)
+        self.__ema = _TaEMA(timeperiod2)
+
+    def _update(self, open_, high, low, close, volume):
+        diff_n = close - self.__close_n.update(close)
+        diff1 = close - self.__close1.update(close)
+        p1 = _sqrt(diff_n * diff_n + self.__timeperiod1 ** 2)
+        p2 = self.__sum.update(_sqrt(diff1 * diff1 + 1))
+        fet = _div(_sign(diff_n) * p1, p2) * 100
+        return self.__ema.update(fet)
+
+
+class PVT(StreamFunction):
+    def __init__(self):
+        super(PVT, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__pvt = None
+
+    def _update(self, open_, high, low, close, volume):
+        close1 = self.__close1.update(close)
+        if close1 != close1 and self.__pvt is None:
+            return nan
+        change = _div(close - close1, close1) * volume
+        self.__pvt = change if self.__pvt is None else self.__pvt + change
+        return self.__pvt
+
+
+class QST(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(QST, self).__init__()
+        self.__timeperiod = timeperiod
+        self.__sum = _PdRollingSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        return self.__sum.update(close - open_) / self.__timeperiod
+
+
+def _true_range(high, low, close1):
+    return _max2(_max2(high - low, abs(high - close1)), abs(low - close1))
+
+
+class RI(StreamFunction):
+    def __init__(self, timeperiod1=20, timeperiod2=5):
+        super(RI, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__min = _TaMin(timeperiod1)
+        self.__max = _TaMax(timeperiod1)
+        self.__ema = _TaEMA(timeperiod2)
+
+    def _update(self, open_, high, low, close, volume):
+        close1 = self.__close1.update(close)
+        w = _true_range(high, low, close1)
+        if close > close1:
+            w = _div(w, close - close1)
+        min_w = self.__min.update(w)
+        max_w = self.__max.update(w)
+        if max_w > min_w:
+            sr = _div(w - min_w, max_w - min_w) * 100
+        else:
+            sr = (w - min_w) * 100.0
+        return self.__ema.update(sr)
+
+
+class _WilderAverage(object):
+    """
+    RMI/RVI 中的 UA/DA：第 start 根 bar 取 SMA 做种子，之后按
+    (UA[1]*(N-1)+X)/N 递推。
+    """
+
+    def __init__(self, start, n):
+        self.__start = start
+        self.__n = n
+        self.__sma = _TaSMA(n)
+        self.__count = 0
+        self.__value = nan
+
+    def update(self, x):
+        t = self.__count
+        self.__count += 1
+        sma = self.__sma.update(x)
+        if t == self.__start:
+            self.__value = sma
+        elif t > self.__start:
+            self.__value = (self.__value * (self.__n - 1) + x) / self.__n
+        return self.__value
+
+
+class RMI(StreamFunction):
+    def __init__(self, timeperiod1=5, timeperiod2=14):
+        super(RMI, self).__init__()
+        self.__close_n = _Lag(timeperiod1)
+        self.__ua = _WilderAverage(timeperiod1 + timeperiod2, timeperiod2)
+        self.__da = _WilderAverage(timeperiod1 + timeperiod2, timeperiod2)
+
+    def _update(self, open_, high, low, close, volume):
+        close_n = self.__close_n.update(close)
+        if close_n != close_n:
+            um = dm = nan
+        else:
+            um = close - close_n if close > close_n else 0.0
+            dm = close_n - close if close < close_n else 0.0
+        ua = self.__ua.update(um)
+        da = self.__da.update(dm)
+        rmi = _div(ua, ua + da) * 100
+        return 50.0 if _isinf(rmi) else rmi
+
+
+class _RelativeVolatility(object):
+    """RVI 中对单个价格序列计算的 RS"""
+
+    def __init__(self, timeperiod1, timeperiod2):
+        self.__timeperiod1 = timeperiod1
+        self.__price1 = _Lag(1)
+        self.__std = _TaStdDev(timeperiod1)
+        self.__ua = _WilderAverage(timeperiod1 + timeperiod2, timeperiod2)
+        self.__da = _WilderAverage(timeperiod1 + timeperiod2, timeperiod2)
+        self.__count = 0
+
+    def update(self, price):
+        t = self.__count
+        self.__count += 1
+        price1 = self.__price1.update(price)
+        std = self.__std.update(price)
+        if t < self.__timeperiod1:
+            um = dm = nan
+        else:
+            um = std if price > price1 else 0.0
+            dm = std if price < price1 else 0.0
+        ua = self.__ua.update(um)
+        da = self.__da.update(dm)
+        rs = _div(ua, ua + da) * 100
+        return 0.0 if _isinf(rs) else rs
+
+
+class RVI(StreamFunction):
+    def __init__(self, timeperiod1=10, timeperiod2=14):
+        super(RVI, self).__init__()
+        self.__high = _RelativeVolatility(timeperiod1, timeperiod2)
+        self.__low = _RelativeVolatility(timeperiod1, timeperiod2)
+
+    def _update(self, open_, high, low, close, volume):
+        return (self.__high.update(high) + self.__low.update(low)) / 2
+
+
+class SMI(StreamFunction):
+    def __init__(self, timeperiod1=10, timeperiod2=3, timeperiod3=3):
+        super(SMI, self).__init__()
+        self.__max_high = _PdRollingMax(timeperiod1)
+        self.__max_low = _PdRollingMax(timeperiod1)
+        self.__sh1 = _TaEMA(timeperiod2)
+        self.__sh2 = _TaEMA(timeperiod3)
+        self.__sr1 = _TaEMA(timeperiod2)
+        self.__sr2 = _TaEMA(timeperiod3)
+
+    def _update(self, open_, high, low, close, volume):
+        max_high = self.__max_high.update(high)
+        max_low = self.__max_low.update(low)
+        h = close - (max_high + max_low) / 2
+        sh2 = self.__sh2.update(self.__sh1.update(h))
+        sr2 = self.__sr2.update(self.__sr1.update(max_high - max_low)) / 2
+        return _div(sh2, sr2) * 100
+
+
+class SRSI(StreamFunction):
+    def __init__(self, timeperiod1=14, timeperiod2=14):
+        super(SRSI, self).__init__()
+        self.__rsi = _TaRSI(timeperiod1)
+        self.__max = _TaMax(timeperiod2)
+        self.__min = _TaMin(timeperiod2)
+
+    def _update(self, open_, high, low, close, volume):
+        rsi = self.__rsi.update(close)
+        max_rsi = self.__max.update(rsi)
+        min_rsi = self.__min.update(rsi)
+        srsi = _div(rsi - max_rsi, max_rsi - min_rsi) * 100
+        return 0.0 if _isinf(srsi) else srsi
+
+
+class TS(StreamFunction):
+    def __init__(self, timeperiod=20):
+        super(TS, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__sum = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        return self.__sum.update(1.0 if close >= self.__close1.update(close) else -1.0)
+
+
+class TMA(StreamFunction):
+    def __init__(self, timeperiod=10, price='close'):
+        super(TMA, self).__init__()
+        assert price in ('open', 'close', 'high', 'low')
+        self.__price = price
+        if timeperiod % 2 == 0:
+            self.__sma1 = _TaSMA(timeperiod // 2 + 1)
+            self.__sma2 = _TaSMA(timeperiod // 2)
+        else:
+            self.__sma1 = _TaSMA((timeperiod + 1) // 2)
+            self.__sma2 = _TaSMA((timeperiod + 1) // 2)
+
+    def _update(self, open_, high, low, close, volume):
+        return self.__sma2.update(self.__sma1.update(_pick(self.__price, open_, high, low, close)))
+
+
+class TR(StreamFunction):
+    def __init__(self):
+        super(TR, self).__init__()
+        self.__close1 = _Lag(1)
+
+    def _update(self, open_, high, low, close, volume):
+        return _true_range(high, low, self.__close1.update(close))
+
+
+class VIDYA(StreamFunction):
+    def __init__(self, timeperiod=20):
+        super(VIDYA, self).__init__()
+        self.__sc = 2.0 / (timeperiod + 1)
+        self.__cmo = _TaCMO(timeperiod)
+        self.__close1 = _Lag(1)
+
+    def _update(self, open_, high, low, close, volume):
+        sc_vi = self.__sc * self.__cmo.update(close)
+        return sc_vi * close + (1 - sc_vi) * self.__close1.update(close)
+
+
+class TSI(StreamFunction):
+    def __init__(self, timeperiod1=25, timeperiod2=13):
+        super(TSI, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__ema1 = _TaEMA(timeperiod1)
+        self.__ema2 = _TaEMA(timeperiod2)
+        self.__abs_ema1 = _TaEMA(timeperiod1)
+        self.__abs_ema2 = _TaEMA(timeperiod2)
+
+    def _update(self, open_, high, low, close, volume):
+        # 批量版本中 mom 就是前一根 bar 的收盘价
+        mom = self.__close1.update(close)
+        num = self.__ema2.update(self.__ema1.update(mom))
+        den = self.__abs_ema2.update(self.__abs_ema1.update(abs(mom)))
+        tsi = _div(num, den) * 100
+        return 0.0 if _isinf(tsi) else tsi
+
+
+class UI(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(UI, self).__init__()
+        self.__timeperiod = timeperiod
+        self.__max = _PdRollingMax(timeperiod)
+        self.__sum = _PdRollingSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        max_close = self.__max.update(close)
+        r = _div(close - max_close, max_close) * 100
+        return self.__sum.update(r * r) / self.__timeperiod
+
+
+class VAMA(StreamFunction):
+    def __init__(self, timeperiod=20, price='close'):
+        super(VAMA, self).__init__()
+        self.__price = price
+        self.__sma_pv = _TaSMA(timeperiod)
+        self.__sma_v = _TaSMA(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        price = _pick(self.__price, open_, high, low, close)
+        return _div(self.__sma_pv.update(price * volume), self.__sma_v.update(volume))
+
+
+class VHF(StreamFunction):
+    def __init__(self, timeperiod=20):
+        super(VHF, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__max = _TaMax(timeperiod)
+        self.__min = _TaMin(timeperiod)
+        self.__sum = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        a = abs(self.__max.update(high) - self.__min.update(low))
+        b = self.__sum.update(abs(close - self.__close1.update(close)))
+        vhf = _div(a, b)
+        return 0.0 if _isinf(vhf) else vhf
+
+
+class VMACD(StreamFunction):
+    def __init__(self, timeperiod1=12, timeperiod2=26, timeperiod3=9):
+        super(VMACD, self).__init__()
+        self.__short = _TaEMA(timeperiod1)
+        self.__long = _TaEMA(timeperiod2)
+        self.__dea = _TaEMA(timeperiod3)
+
+    def _update(self, open_, high, low, close, volume):
+        diff = self.__short.update(volume) - self.__long.update(volume)
+        return diff - self.__dea.update(diff)
+
+
+class VO(StreamFunction):
+    def __init__(self, timeperiod1=2, timeperiod2=5):
+        super(VO, self).__init__()
+        self.__sma1 = _TaSMA(timeperiod1)
+        self.__sma2 = _TaSMA(timeperiod2)
+
+    def _update(self, open_, high, low, close, volume):
+        sma1 = self.__sma1.update(volume)
+        sma2 = self.__sma2.update(volume)
+        return _div(sma1 - sma2, sma2) * 100
+
+
+class VOSC(StreamFunction):
+    def __init__(self, timeperiod1=12, timeperiod2=26):
+        super(VOSC, self).__init__()
+        self.__timeperiod1 = timeperiod1
+        self.__timeperiod2 = timeperiod2
+        self.__short = _PdRollingSum(timeperiod1)
+        self.__long = _PdRollingSum(timeperiod2)
+
+    def _update(self, open_, high, low, close, volume):
+        short = self.__short.update(volume) / self.__timeperiod1
+        long_ = self.__long.update(volume) / self.__timeperiod2
+        return _div(short - long_, short) * 100
+
+
+class VR(StreamFunction):
+    def __init__(self, timeperiod=26):
+        super(VR, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__up = _TaSum(timeperiod)
+        self.__down = _TaSum(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        close1 = self.__close1.update(close)
+        a = volume if close > close1 else 0.0
+        b = volume if close < close1 else 0.0
+        vr = _div(self.__up.update(a), self.__down.update(b)) * 100
+        return 0.0 if _isinf(vr) else vr
+
+
+class VROC(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(VROC, self).__init__()
+        self.__volume_n = _Lag(timeperiod)
+
+    def _update(self, open_, high, low, close, volume):
+        volume_n = self.__volume_n.update(volume)
+        return _div(volume - volume_n, volume_n) * 100
+
+
+class VRSI(StreamFunction):
+    def __init__(self, timeperiod=14):
+        super(VRSI, self).__init__()
+        self.__timeperiod = timeperiod
+        self.__close1 = _Lag(1)
+        self.__u1 = _Lag(1)
+        self.__d1 = _Lag(1)
+
+    def _update(self, open_, high, low, close, volume):
+        n = self.__timeperiod
+        close1 = self.__close1.update(close)
+        if _isclose(close, close1):
+            u = d = 0.5 * volume
+        else:
+            u = volume if close > close1 else 0.0
+            d = volume if close < close1 else 0.0
+        uu = ((n - 1) * self.__u1.update(u) + u) / n
+        dd = ((n - 1) * self.__d1.update(d) + d) / n
+        return _div(100 * uu, uu + dd)
+
+
+class WC(StreamFunction):
+    def _update(self, open_, high, low, close, volume):
+        return (close * 2 + high - low) / 4
+
+
+class WAD(StreamFunction):
+    def __init__(self):
+        super(WAD, self).__init__()
+        self.__close1 = _Lag(1)
+        self.__wad = None
+
+    def _update(self, open_, high, low, close, volume):
+        close1 = self.__close1.update(close)
+        if close > close1:
+            a_over_d = close - _min2(close1, low)
+        elif close < close1:
+            a_over_d = close - _max2(close1, high)
+        else:
+            a_over_d = 0.0
+        self.__wad = a_over_d if self.__wad is None else self.__wad + a_over_d
+        return self.__wad
+
+
+__all__ = {
+    'ACC',
+    'ACD',
+    'ADTM',
+    'AR',
+    'ARC',
+    'ASI',
+    'BBI',
+    'BIAS',
+    'BR',
+    'CMF',
+    'CR',
+    'CVI',
+    'DBCD',
+    'DDI',
+    'DMI',
+    'DPO',
+    'EMV',
+    'IMI',
+    'KVO',
+    'MI',
+    'MTM',
+    'NVI',
+    'PFE',
+    'PVI',
+    'PVT',
+    'QST',
+    'RI',
+    'RMI',
+    'RVI',
+    'SMI',
+    'SRSI',
+    'TMA',
+    'TR',
+    'TS',
+    'TSI',
+    'UI',
+    'VAMA',
+    'VHF',
+    'VIDYA',
+    'VMACD',
+    'VO',
+    'VOSC',
+    'VR',
+    'VROC',
+    'VRSI',
+    'WAD',
+    'WC'
+}
+
+# 批量结果带有三次样条平移误差或依赖 pandas 版本的函数，只能近似比较
+INEXACT_FUNCTIONS = {'DDI', 'DMI', 'RI', 'TR', 'TSI', 'VHF', 'VR', 'VRSI', 'WAD'}
+
+# 批量结果在第 i 行用到了 i 之后的 bar 的函数，不能在整段历史上预先计算
+LOOKAHEAD_FUNCTIONS = {'DPO'}
+
+
+def stream(func_name, **kwargs):
+    """
+    按名字构造增量指标
+    :param func_name: ls_talib 中的函数名，如 'ACD'
+    :param kwargs: 与批量函数相同的参数
+    :return: StreamFunction
+    """
+    func_name = func_name.upper()
+    if func_name not in __all__:
+        raise KeyError('%s has no incremental version' % func_name)
+    return globals()[func_name](**kwargs)
+
+
+def run_stream(func_name, prices, **kwargs):
+    """
+    把 prices 逐行喂给增量指标，返回与批量函数同样形状的 Series，用于和批量版本对照。
+    :param func_name: ls_talib 中的函数名
+    :param prices: DataFrame，包含 open,high,low,close,volume
+    :return: Series
+    """
+    indicator = stream(func_name, **kwargs)
+    df_price = prices.sort_index(ascending=True)
+    open_, high, low, close, volume = [
+        df_price[col].values.astype(float) for col in ('open', 'high', 'low', 'close', 'volume')]
+    ret = np.empty(len(df_price), dtype=np.float64)
+    for idx in range(len(df_price)):
+        ret[idx] = indicator.update(open_[idx], high[idx], low[idx], close[idx], volume[idx])
+    return pd.Series(ret, index=df_price.index)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+import numpy as np
+from numpy.testing.utils import assert_array_equal
+
+import algotrade.technical.ls_talib as ls_talib
+from algotrade.bar_buffer import BarBuffer
+from algotrade.technical.indicator_pool import IndicatorCalculator, IndicatorPool
+from algotrade.technical.indicator_pool_benchmark import make_bars
+
+TA_FACTORS = [('MTM', {}), ('TMA', {'timeperiod': 7}), ('BBI', {})]
+
+
+def test_calculator():
+    steps = make_bars(1, 60)
+    calculator = IndicatorCalculator(TA_FACTORS)
+    bar_buffer = BarBuffer('s000')
+    results = []
+    for bars in steps:
+        bar_buffer.append(bars[0])
+        results.append(calculator.calculate(bar_buffer))
+    frame = bar_buffer.tail_frame(len(bar_buffer))
+    # 窗口足够长，最后一个值与在全部历史上计算的一致
+    mtm = np.asarray(ls_talib.MTM(frame), dtype=float)
+    assert results[-1]['MTM'] == mtm[-1]
+    assert np.isnan(results[0]['BBI'])
+
+
+def test_calculator_window_covers_input_check():
+    # TMA 要求输入至少 timeperiod + 1 行，窗口不能按 lookback 表取得更小
+    steps = make_bars(1, 20)
+    calculator = IndicatorCalculator([('TMA', {'timeperiod': 7})])
+    bar_buffer = BarBuffer('s000')
+    values = []
+    for bars in steps:
+        bar_buffer.append(bars[0])
+        values.append(calculator.calculate(bar_buffer)['TMA'])
+    first = next(i for i, value in enumerate(values) if not np.isnan(value))
+    assert first >= 7
+    frame = bar_buffer.tail_frame(len(bar_buffer))
+    assert values[-1] == np.asarray(ls_talib.TMA(frame, timeperiod=7), dtype=float)[-1]
+
+
+def test_pool_matches_serial():
+    steps = make_bars(5, 40)
+    calculator = IndicatorCalculator(TA_FACTORS)
+    bar_buffers = {}
+    expected = []
+    for bars in steps:
+        for bar in bars:
+            bar_buffer = bar_buffers.setdefault(bar.instrument, BarBuffer(bar.instrument))
+            bar_buffer.append(bar)
+            expected.append((bar.instrument, calculator.calculate(bar_buffer)))
+
+    actual = []
+    with IndicatorPool(TA_FACTORS, processes=2) as pool:
+        for bars in steps[:-1]:
+            actual.extend(pool.update_many(bars))
+        for bar in steps[-1]:
+            actual.append((bar.instrument, pool.update(bar)))
+
+    assert [instrument for instrument, _ in actual] == [instrument for instrument, _ in expected]
+    for name, _ in TA_FACTORS:
+        assert_array_equal([values[name] for _, values in actual], [values[name] for _, values in expected])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+import numpy as np
+import pandas as pd
+from numpy.testing.utils import (assert_array_equal, assert_array_almost_equal)
+
+import algotrade.technical.ls_talib as ls_talib
+import algotrade.technical.ls_talib_stream as ls_talib_stream
+
+
+def _prices(n=300, seed=0):
+    # 连续取值的随机游走，避免收盘价相等（三次样条平移在相等处会改变比较结果）
+    rs = np.random.RandomState(seed)
+    close = 20 + np.cumsum(rs.normal(0, 0.5, n))
+    open_ = close + rs.normal(0, 0.3, n)
+    high = np.maximum(open_, close) + rs.uniform(0, 0.5, n)
+    low = np.minimum(open_, close) - rs.uniform(0, 0.5, n)
+    volume = rs.randint(1000, 5000, n).astype(float)
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume},
+                        index=pd.date_range('2000-01-01', periods=n))
+
+
+def test_stream_matches_batch():
+    p = _prices()
+    for func_name in ls_talib_stream.__all__ - {'DPO'}:
+        batch = np.asarray(getattr(ls_talib, func_name)(p), dtype=float)
+        stream = ls_talib_stream.run_stream(func_name, p).values
+        assert_array_equal(np.isnan(stream), np.isnan(batch), err_msg=func_name)
+        if func_name in ls_talib_stream.INEXACT_FUNCTIONS:
+            assert_array_almost_equal(stream, batch, decimal=6, err_msg=func_name)
+        else:
+            # 逐位一致
+            assert_array_equal(stream, batch, err_msg=func_name)
+
+
+def test_stream_with_parameters():
+    p = _prices(seed=1)
+    cases = [
+        ('ACD', {'timeperiod': 5}),
+        ('TMA', {'timeperiod': 7, 'price': 'high'}),
+        ('KVO', {'timeperiod1': 5, 'timeperiod2': 9, 'timeperiod3': 4}),
+        ('RVI', {'timeperiod1': 6, 'timeperiod2': 8}),
+        ('SMI', {'timeperiod1': 12, 'timeperiod2': 4, 'timeperiod3': 5}),
+    ]
+    for func_name, kwargs in cases:
+        batch = np.asarray(getattr(ls_talib, func_name)(p, **kwargs), dtype=float)
+        stream = ls_talib_stream.run_stream(func_name, p, **kwargs).values
+        assert_array_equal(stream, batch, err_msg=func_name)
+
+
+def test_dpo_lagged():
+    p = _prices()
+    batch = np.asarray(ls_talib.DPO(p), dtype=float)
+    indicator = ls_talib_stream.DPO()
+    lagged = []
+    for row in p.itertuples():
+        assert np.isnan(indicator.update(row.open, row.high, row.low, row.close, row.volume))
+        lagged.append(indicator.lagged)
+    k = int(14 / 2) + 1
+    assert_array_equal(np.array(lagged[k:]), batch[:-k])
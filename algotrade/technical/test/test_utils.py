@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+import numpy as np
+import pandas as pd
+from numpy.testing.utils import assert_array_equal
+
+import algotrade.technical.ls_talib as ls_talib
+from algotrade.technical.utils import precompute_factors
+
+
+def test_precompute_factors():
+    rs = np.random.RandomState(0)
+    close = 20 + np.cumsum(rs.normal(0, 0.5, 200))
+    p = pd.DataFrame({'open': close + rs.normal(0, 0.3, 200), 'high': close + 1, 'low': close - 1,
+                      'close': close, 'volume': rs.randint(1000, 5000, 200).astype(float)},
+                     index=pd.date_range('2000-01-01', periods=200))
+    ta_factors = [('ACD', {}), ('TMA', {'timeperiod': 7}), ('MTM', None)]
+    ret = precompute_factors(p, ta_factors)
+    assert sorted(ret.keys()) == ['ACD', 'MTM', 'TMA']
+    assert_array_equal(ret['ACD'], np.asarray(ls_talib.ACD(p), dtype=float))
+    assert_array_equal(ret['TMA'], np.asarray(ls_talib.TMA(p, timeperiod=7), dtype=float))
+    assert_array_equal(ret['MTM'], np.asarray(ls_talib.MTM(p), dtype=float))
+    assert len(ret['ACD']) == len(p)
+
+
+def test_precompute_factors_rejects_lookahead():
+    p = pd.DataFrame({'open': [1.0] * 30, 'high': [2.0] * 30, 'low': [0.5] * 30,
+                      'close': [1.5] * 30, 'volume': [100.0] * 30},
+                     index=pd.date_range('2000-01-01', periods=30))
+    try:
+        precompute_factors(p, [('DPO', {})])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('DPO must not be precomputed')
@@ -6,8 +6,12 @@ import inspect
 
 import talib as ta
 import numpy as np
+import pandas as pd
 from talib.abstract import Function
 
+from algotrade.technical import abstract
+from algotrade.technical.ls_talib_stream import LOOKAHEAD_FUNCTIONS
+
 __author__ = 'phil.zhang'
 
 
@@ -94,5 +98,29 @@ def num_bars_to_accumulate(func_name, timeperiod=np.nan, timeperiod1=np.nan, tim
     # print len(tables)
     return tables[func_name]
 
+def precompute_factors(prices, ta_factors):
+    """
+    回测时所有bar事先已知，把每个指标在整段历史上算一遍，
+    on_bar 里只需要按行号取值，不用每根bar重算 lookback 行。
+    LOOKAHEAD_FUNCTIONS 中的函数在整段历史上计算会用到未来的bar，不能预先计算。
+
+    :param prices: DataFrame, 一个合约的全部bar, 列名小写, 按时间升序
+    :param ta_factors: [(func_name, param_dict), ...], ls_talib 和 TA-Lib 的函数都可以
+    :return: dict, func_name -> np.ndarray, 与 prices 逐行对齐
+    """
+    ret = {}
+    for func_name, param_dict in ta_factors:
+        if func_name.upper() in LOOKAHEAD_FUNCTIONS:
+            raise ValueError('%s uses future bars and cannot be precomputed' % func_name)
+        values = abstract.Function(func_name)(prices, **(param_dict or {}))
+        # 多个输出的函数只取第一列，与 BaseStrategy 逐bar计算时一致
+        if isinstance(values, pd.DataFrame):
+            values = values.iloc[:, 0]
+        elif isinstance(values, list):
+            values = values[0]
+        ret[func_name] = np.asarray(values, dtype=np.float64)
+    return ret
+
+
 if __name__ == '__main__':
     num_bars_to_accumulate('ACC')
\ No newline at end of file
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__author__ = 'phil.zhang'
+
+import datetime
+
+import numpy as np
+import pandas as pd
+from numpy.testing.utils import assert_array_equal
+
+from algotrade.bar import Bar
+from algotrade.bar_buffer import BarBuffer
+
+
+def _fill(bar_buffer, n, start=0):
+    for i in range(start, start + n):
+        bar_buffer.append_values(datetime.datetime(2000, 1, 1) + datetime.timedelta(days=i),
+                                 i, i + 2, i - 1, i + 1, 100 * i)
+
+
+def test_append_values():
+    bar_buffer = BarBuffer('s00', capacity=4)
+    assert len(bar_buffer) == 0
+    assert bar_buffer.last_date_time() is None
+    _fill(bar_buffer, 3)
+    assert len(bar_buffer) == 3
+    assert list(bar_buffer.columns) == list(BarBuffer.BAR_FIELDS)
+    assert_array_equal(bar_buffer.column('open'), [0, 1, 2])
+    assert_array_equal(bar_buffer.column('high'), [2, 3, 4])
+    assert_array_equal(bar_buffer.column('volume'), [0, 100, 200])
+    # adj_close 默认为 NaN
+    assert np.isnan(bar_buffer.column('adj_close')).all()
+    assert bar_buffer.last_date_time() == np.datetime64('2000-01-03', 'ns')
+
+
+def test_append_bar():
+    bar_buffer = BarBuffer('s00')
+    bar_buffer.append(Bar(date_time=datetime.datetime(2000, 1, 1), open_=10, high=12, low=9, close=11,
+                          volume=500, adj_close=None, instrument='s00'))
+    assert_array_equal(bar_buffer.column('close'), [11])
+    assert np.isnan(bar_buffer.column('adj_close')[0])
+
+
+def test_grow():
+    bar_buffer = BarBuffer('s00', capacity=2)
+    _fill(bar_buffer, 2)
+    bar_buffer.set_value('ACD', 1.5)
+    assert bar_buffer.capacity == 2
+    _fill(bar_buffer, 5, start=2)
+    assert len(bar_buffer) == 7
+    assert bar_buffer.capacity == 8
+    assert_array_equal(bar_buffer.column('open'), range(7))
+    assert_array_equal(bar_buffer.index(), pd.date_range('2000-01-01', periods=7).values)
+    # 扩容之后指标列保留原来的值，新的行是 NaN
+    assert bar_buffer.column('ACD')[1] == 1.5
+    assert np.isnan(bar_buffer.column('ACD')[0])
+    assert np.isnan(bar_buffer.column('ACD')[2:]).all()
+
+
+def test_set_value():
+    bar_buffer = BarBuffer('s00')
+    _fill(bar_buffer, 3)
+    bar_buffer.set_value('ACD', 1.0)
+    bar_buffer.set_value('ACD', 2.0, pos=0)
+    bar_buffer.set_value('ACD', 3.0, pos=-2)
+    assert_array_equal(bar_buffer.column('ACD'), [2.0, 3.0, 1.0])
+    # 新的一行上指标列先是 NaN
+    _fill(bar_buffer, 1, start=3)
+    assert np.isnan(bar_buffer.column('ACD')[-1])
+    for pos in (4, -5):
+        try:
+            bar_buffer.set_value('ACD', 1.0, pos=pos)
+        except IndexError:
+            pass
+        else:
+            assert False, 'IndexError expected'
+
+
+def test_tail():
+    bar_buffer = BarBuffer('s00')
+    _fill(bar_buffer, 5)
+    tail = bar_buffer.tail(2)
+    assert sorted(tail.keys()) == sorted(BarBuffer.BAR_FIELDS)
+    assert_array_equal(tail['close'], [4, 5])
+    # 是视图，不拷贝
+    tail['close'][0] = 42
+    assert bar_buffer.column('close')[3] == 42
+    # n 大于行数时返回全部
+    assert_array_equal(bar_buffer.tail(10)['open'], range(5))
+    assert_array_equal(bar_buffer.tail_index(2), pd.date_range('2000-01-04', periods=2).values)
+
+
+def test_tail_frame():
+    bar_buffer = BarBuffer('s00')
+    _fill(bar_buffer, 5)
+    bar_buffer.set_value('ACD', 1.0)
+    frame = bar_buffer.tail_frame(3)
+    assert list(frame.columns) == list(BarBuffer.BAR_FIELDS)
+    assert_array_equal(frame.index.values, pd.date_range('2000-01-03', periods=3).values)
+    assert_array_equal(frame['low'].values, [1, 2, 3])
+    frame = bar_buffer.tail_frame(2, columns=('close', 'ACD'))
+    assert list(frame.columns) == ['close', 'ACD']
+    assert_array_equal(frame['ACD'].values, [np.nan, 1.0])
+
+
+def test_to_frame():
+    bar_buffer = BarBuffer('s00', capacity=2)
+    _fill(bar_buffer, 3)
+    bar_buffer.set_value('ACD', 1.0)
+    frame = bar_buffer.to_frame()
+    assert list(frame.columns) == list(BarBuffer.BAR_FIELDS) + ['ACD', 'instrument']
+    assert (frame['instrument'] == 's00').all()
+    assert_array_equal(frame['close'].values, [1, 2, 3])
+    assert_array_equal(frame['ACD'].values, [np.nan, np.nan, 1.0])
+    # 是拷贝，之后修改缓冲区不影响
+    bar_buffer.set_value('ACD', 2.0)
+    assert frame['ACD'].values[-1] == 1.0
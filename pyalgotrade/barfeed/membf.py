@@ -21,13 +21,15 @@
 from pyalgotrade import barfeed
 from pyalgotrade import dataseries
 from pyalgotrade import bar
-from pyalgotrade import utils
 
 
 # A non real-time BarFeed responsible for:
 # - Holding bars in memory.
 # - Aligning them with respect to time.
 #
+# The remaining bars are merged once into a timeline of (datetime, instruments with a bar at that datetime), so each step
+# only looks at the bars it returns instead of scanning all the instruments.
+#
 # Subclasses should:
 # - Forward the call to start() if they override it.
 
@@ -36,6 +38,8 @@ class BarFeed(barfeed.BaseBarFeed):
         barfeed.BaseBarFeed.__init__(self, frequency, maxLen)
         self.__bars = {}
         self.__nextPos = {}
+        self.__timeline = None
+        self.__timelinePos = 0
         self.__started = False
         self.__currDateTime = None
 
@@ -43,6 +47,7 @@ class BarFeed(barfeed.BaseBarFeed):
         self.__nextPos = {}
         for instrument in self.__bars.keys():
             self.__nextPos.setdefault(instrument, 0)
+        self.__timeline = None
         self.__currDateTime = None
         barfeed.BaseBarFeed.reset(self)
 
@@ -69,45 +74,54 @@ class BarFeed(barfeed.BaseBarFeed):
         self.__bars[instrument].extend(bars)
         barCmp = lambda x, y: cmp(x.getDateTime(), y.getDateTime())
         self.__bars[instrument].sort(barCmp)
+        self.__timeline = None
 
         self.registerInstrument(instrument)
 
+    # Builds the timeline with the bars that were not consumed yet. It is built lazily because bars can be added, and
+    # positions reset, at any time before consuming them.
+    def __getTimeline(self):
+        if self.__timeline is None:
+            instrumentsByDateTime = {}
+            for instrument, bars in self.__bars.iteritems():
+                for i in xrange(self.__nextPos[instrument], len(bars)):
+                    instrumentsByDateTime.setdefault(bars[i].getDateTime(), []).append(instrument)
+            self.__timeline = sorted(instrumentsByDateTime.iteritems())
+            self.__timelinePos = 0
+        return self.__timeline
+
     def eof(self):
-        ret = True
         # Check if there is at least one more bar to return.
-        for instrument, bars in self.__bars.iteritems():
-            nextPos = self.__nextPos[instrument]
-            if nextPos < len(bars):
-                ret = False
-                break
-        return ret
+        timeline = self.__getTimeline()
+        return self.__timelinePos >= len(timeline)
 
     def peekDateTime(self):
         ret = None
-
-        for instrument, bars in self.__bars.iteritems():
-            nextPos = self.__nextPos[instrument]
-            if nextPos < len(bars):
-                ret = utils.safe_min(ret, bars[nextPos].getDateTime())
+        timeline = self.__getTimeline()
+        if self.__timelinePos < len(timeline):
+            ret = timeline[self.__timelinePos][0]
         return ret
 
+    def getDispatchDateTimes(self):
+        timeline = self.__getTimeline()
+        return [dateTime for dateTime, instruments in timeline[self.__timelinePos:]]
+
     def getNextBars(self):
         # All bars must have the same datetime. We will return all the ones with the smallest datetime.
-        smallestDateTime = self.peekDateTime()
-
-        if smallestDateTime is None:
+        timeline = self.__getTimeline()
+        if self.__timelinePos >= len(timeline):
             return None
+        smallestDateTime, instruments = timeline[self.__timelinePos]
+        self.__timelinePos += 1
 
-        # Make a second pass to get all the bars that had the smallest datetime.
         ret = {}
-        for instrument, bars in self.__bars.iteritems():
+        for instrument in instruments:
+            # An instrument shows up more than once if it has many bars with the same datetime.
+            if instrument in ret:
+                raise Exception("Duplicate bars found for %s on %s" % ([instrument], smallestDateTime))
             nextPos = self.__nextPos[instrument]
-            if nextPos < len(bars) and bars[nextPos].getDateTime() == smallestDateTime:
-                ret[instrument] = bars[nextPos]
-                self.__nextPos[instrument] += 1
-
-        if self.__currDateTime == smallestDateTime:
-            raise Exception("Duplicate bars found for %s on %s" % (ret.keys(), smallestDateTime))
+            ret[instrument] = self.__bars[instrument][nextPos]
+            self.__nextPos[instrument] = nextPos + 1
 
         self.__currDateTime = smallestDateTime
         return bar.Bars(ret)
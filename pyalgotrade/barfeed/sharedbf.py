@@ -0,0 +1,270 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from pyalgotrade import bar
+from pyalgotrade import barfeed
+from pyalgotrade import dataseries
+from pyalgotrade.dataseries import bards
+from pyalgotrade.utils import dt
+
+
+class SharedBars(object):
+    """Bars held column by column in memory mapped files, so that many processes can use them without copying.
+
+    The values are kept in an array with shape (columns, instruments, datetimes), using the column order from
+    :mod:`pyalgotrade.dataseries.bards`, and the datetimes in a separate array as microseconds since the epoch.
+    Missing bars are NaN. When pickled, only the path and a few attributes are included, and the files are mapped
+    again when unpickled.
+
+    .. note::
+        Use :meth:`SharedBars.create` to build an instance. Only the values in :class:`pyalgotrade.bar.BasicBar` are kept.
+    """
+
+    DATETIMES_FILE = "datetimes.npy"
+    VALUES_FILE = "values.npy"
+    # Number of datetimes per chunk used by create.
+    CHUNK_SIZE = 4096
+
+    def __init__(self, path, instruments, frequency, barsHaveAdjClose, timeZone=None):
+        self.__path = path
+        self.__instruments = list(instruments)
+        self.__frequency = frequency
+        self.__barsHaveAdjClose = barsHaveAdjClose
+        self.__timeZone = timeZone
+        self.__owner = False
+        self.__dateTimes = None
+        self.__map()
+
+    def __map(self):
+        self.__timestamps = np.load(os.path.join(self.__path, SharedBars.DATETIMES_FILE), mmap_mode="r")
+        self.__values = np.load(os.path.join(self.__path, SharedBars.VALUES_FILE), mmap_mode="r")
+
+    @classmethod
+    def create(cls, barFeed, path=None):
+        """Loads all the bars from a bar feed into memory mapped files.
+
+        :param barFeed: The bar feed to load the bars from.
+        :type barFeed: :class:`pyalgotrade.barfeed.BaseBarFeed`.
+        :param path: An empty directory where the files will be written. If None, a temporary directory is created and
+            removed by :meth:`close`.
+        :type path: string.
+        :rtype: :class:`SharedBars`.
+        """
+        owner = path is None
+        if owner:
+            path = tempfile.mkdtemp(prefix="pyalgotrade-")
+
+        instruments = barFeed.getRegisteredInstruments()
+        positions = dict((instrument, i) for i, instrument in enumerate(instruments))
+        timestamps = []
+        timeZone = None
+        # The number of datetimes is not known until the feed is exhausted, so the values are written to fixed size
+        # chunks with shape (datetimes, instruments, columns), and copied to the mapped file at the end.
+        chunks = []
+        chunk = None
+        chunkPos = cls.CHUNK_SIZE
+        for dateTime, bars in barFeed:
+            if not timestamps:
+                timeZone = dateTime.tzinfo
+            timestamps.append(dt.datetime_to_microseconds(dateTime))
+            if chunkPos == cls.CHUNK_SIZE:
+                chunk = np.empty((cls.CHUNK_SIZE, len(instruments), bards.COLUMN_COUNT), dtype=np.float64)
+                chunk.fill(np.nan)
+                chunks.append(chunk)
+                chunkPos = 0
+            row = chunk[chunkPos]
+            chunkPos += 1
+            for instrument in bars.getInstruments():
+                currentBar = bars[instrument]
+                values = row[positions[instrument]]
+                values[bards.OPEN_COLUMN] = currentBar.getOpen()
+                values[bards.HIGH_COLUMN] = currentBar.getHigh()
+                values[bards.LOW_COLUMN] = currentBar.getLow()
+                values[bards.CLOSE_COLUMN] = currentBar.getClose()
+                values[bards.VOLUME_COLUMN] = currentBar.getVolume()
+                adjClose = currentBar.getAdjClose()
+                if adjClose is not None:
+                    values[bards.ADJ_CLOSE_COLUMN] = adjClose
+
+        timestampsFile = np.lib.format.open_memmap(
+            os.path.join(path, SharedBars.DATETIMES_FILE), mode="w+", dtype=np.int64, shape=(len(timestamps),)
+        )
+        timestampsFile[:] = timestamps
+        timestampsFile.flush()
+        del timestampsFile
+
+        valuesFile = np.lib.format.open_memmap(
+            os.path.join(path, SharedBars.VALUES_FILE), mode="w+", dtype=np.float64,
+            shape=(bards.COLUMN_COUNT, len(instruments), len(timestamps))
+        )
+        begin = 0
+        while chunks:
+            # Release every chunk once it is copied.
+            chunk = chunks.pop(0)
+            end = min(begin + cls.CHUNK_SIZE, len(timestamps))
+            # (datetimes, instruments, columns) -> (columns, instruments, datetimes)
+            valuesFile[:, :, begin:end] = chunk[:end - begin].transpose(2, 1, 0)
+            begin = end
+        chunk = None
+        valuesFile.flush()
+        del valuesFile
+
+        ret = cls(path, instruments, barFeed.getFrequency(), barFeed.barsHaveAdjClose(), timeZone)
+        ret.__owner = owner
+        return ret
+
+    def __getstate__(self):
+        return (self.__path, self.__instruments, self.__frequency, self.__barsHaveAdjClose, self.__timeZone)
+
+    def __setstate__(self, state):
+        self.__path, self.__instruments, self.__frequency, self.__barsHaveAdjClose, self.__timeZone = state
+        self.__owner = False
+        self.__dateTimes = None
+        self.__map()
+
+    def close(self):
+        """Removes the files if they were written to a temporary directory by :meth:`create`."""
+        self.__timestamps = None
+        self.__values = None
+        if self.__owner:
+            shutil.rmtree(self.__path, ignore_errors=True)
+            self.__owner = False
+
+    def getPath(self):
+        return self.__path
+
+    def getInstruments(self):
+        return self.__instruments
+
+    def getFrequency(self):
+        return self.__frequency
+
+    def barsHaveAdjClose(self):
+        return self.__barsHaveAdjClose
+
+    def __len__(self):
+        return len(self.__timestamps)
+
+    def getTimestamps(self):
+        """Returns a numpy.array with the datetimes as microseconds since the epoch."""
+        return self.__timestamps
+
+    def getDateTimes(self):
+        """Returns a list of :class:`datetime.datetime`. They are built the first time this is called in a process."""
+        if self.__dateTimes is None:
+            self.__dateTimes = [dt.microseconds_to_datetime(timestamp, self.__timeZone) for timestamp in self.__timestamps.tolist()]
+        return self.__dateTimes
+
+    def getValues(self):
+        """Returns a numpy.array with shape (columns, instruments, datetimes) with the values mapped from the file."""
+        return self.__values
+
+
+class Feed(barfeed.BaseBarFeed):
+    """A bar feed that builds bars on the fly from :class:`SharedBars`.
+
+    Building a feed only sets a cursor at the first datetime, so a new feed can be used for every strategy run.
+
+    :param sharedBars: The bars.
+    :type sharedBars: :class:`SharedBars`.
+    :param maxLen: The maximum number of values that the :class:`pyalgotrade.dataseries.bards.BarDataSeries` will hold.
+        Once a bounded length is full, when new items are added, a corresponding number of items are discarded
+        from the opposite end.
+    :type maxLen: int.
+    :param end: The number of datetimes to use, starting from the first one. If None, all of them are used.
+    :type end: int.
+    """
+
+    def __init__(self, sharedBars, maxLen=dataseries.DEFAULT_MAX_LEN, end=None):
+        barfeed.BaseBarFeed.__init__(self, sharedBars.getFrequency(), maxLen)
+        for instrument in sharedBars.getInstruments():
+            self.registerInstrument(instrument)
+        self.__sharedBars = sharedBars
+        self.__instruments = sharedBars.getInstruments()
+        self.__dateTimes = sharedBars.getDateTimes()
+        # A plain ndarray over the mapped memory, slicing numpy.memmap instances is slower.
+        self.__values = np.asarray(sharedBars.getValues())
+        if end is None:
+            end = len(self.__dateTimes)
+        self.__end = min(end, len(self.__dateTimes))
+        self.__nextPos = 0
+        self.__currDateTime = None
+
+    def reset(self):
+        self.__nextPos = 0
+        self.__currDateTime = None
+        barfeed.BaseBarFeed.reset(self)
+
+    def getCurrentDateTime(self):
+        return self.__currDateTime
+
+    def barsHaveAdjClose(self):
+        return self.__sharedBars.barsHaveAdjClose()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def join(self):
+        pass
+
+    def peekDateTime(self):
+        ret = None
+        if self.__nextPos < self.__end:
+            ret = self.__dateTimes[self.__nextPos]
+        return ret
+
+    def getDispatchDateTimes(self):
+        return self.__dateTimes[self.__nextPos:self.__end]
+
+    def getNextBars(self):
+        ret = None
+        pos = self.__nextPos
+        if pos < self.__end:
+            dateTime = self.__dateTimes[pos]
+            frequency = self.getFrequency()
+            barDict = {}
+            # One call to get all the values in the row as python floats.
+            for instrument, values in zip(self.__instruments, self.__values[:, :, pos].T.tolist()):
+                openPrice = values[bards.OPEN_COLUMN]
+                # NaN if the instrument has no bar at this datetime.
+                if openPrice == openPrice:
+                    adjClose = values[bards.ADJ_CLOSE_COLUMN]
+                    if adjClose != adjClose:
+                        adjClose = None
+                    barDict[instrument] = bar.BasicBar(
+                        dateTime, openPrice, values[bards.HIGH_COLUMN], values[bards.LOW_COLUMN],
+                        values[bards.CLOSE_COLUMN], values[bards.VOLUME_COLUMN], adjClose, frequency
+                    )
+            ret = bar.Bars(barDict)
+            self.__currDateTime = dateTime
+            self.__nextPos = pos + 1
+        return ret
+
+    def eof(self):
+        return self.__nextPos >= self.__end
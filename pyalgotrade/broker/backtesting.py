@@ -488,6 +488,10 @@ class Broker(broker.Broker):
     def peekDateTime(self):
         return None
 
+    def getDispatchDateTimes(self):
+        # There is nothing to dispatch on our own, see dispatch().
+        return []
+
     def createMarketOrder(self, action, instrument, quantity, onClose=False):
         # In order to properly support market-on-close with intraday feeds I'd need to know about different
         # exchange/market trading hours and support specifying routing an order to a specific exchange/market.
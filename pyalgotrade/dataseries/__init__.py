@@ -20,8 +20,11 @@
 
 import abc
 
+import numpy as np
+
 from pyalgotrade import observer
 from pyalgotrade.utils import collections
+from pyalgotrade.utils import dt
 
 DEFAULT_MAX_LEN = 1024
 
@@ -134,3 +137,121 @@ class SequenceDataSeries(DataSeries):
 
     def getDateTimes(self):
         return self.__dateTimes.data()
+
+
+# Timestamp used for values appended without a datetime.
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+class NumericDataSeries(DataSeries):
+    """Base class for data series that hold float values in a numpy.array.
+
+    .. note::
+        This is a base class and should not be used directly.
+    """
+
+    @abc.abstractmethod
+    def asarray(self, count=None):
+        """Returns the last count values, or all of them if count is None, as a float64 numpy.array.
+
+        .. note::
+            The array is a view on the internal storage, not a copy. It should not be modified and it is only
+            valid until the next value is appended.
+        """
+        raise NotImplementedError()
+
+
+class NumericSequenceDataSeries(NumericDataSeries):
+    """A DataSeries that holds float values in memory using NumPy arrays.
+    Values are stored as float64 and datetimes as int64 timestamps, so the last values can be retrieved as a
+    numpy.array without copying them. None values are stored as NaN.
+
+    :param maxLen: The maximum number of values to hold.
+        Once a bounded length is full, when new items are added, a corresponding number of items are discarded from the opposite end.
+    :type maxLen: int.
+    """
+
+    def __init__(self, maxLen=DEFAULT_MAX_LEN):
+        if not maxLen > 0:
+            raise Exception("Invalid maximum length")
+
+        self.__newValueEvent = observer.Event()
+        self.__values = collections.NumPyDeque(maxLen, np.float64)
+        self.__timestamps = collections.NumPyDeque(maxLen, np.int64)
+        self.__lastTimestamp = NO_TIMESTAMP
+        self.__timeZone = None
+
+    def __len__(self):
+        return len(self.__values)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.__values.data()[key].tolist()
+        elif isinstance(key, (int, long)):
+            return float(self.__values[key])
+        else:
+            raise TypeError("Invalid argument type")
+
+    def setMaxLen(self, maxLen):
+        """Sets the maximum number of values to hold and resizes accordingly if necessary."""
+        self.__values.resize(maxLen)
+        self.__timestamps.resize(maxLen)
+
+    def getMaxLen(self):
+        """Returns the maximum number of values to hold."""
+        return self.__values.getMaxLen()
+
+    # Event handler receives:
+    # 1: Dataseries generating the event
+    # 2: The datetime for the new value
+    # 3: The new value
+    def getNewValueEvent(self):
+        return self.__newValueEvent
+
+    def getValueAbsolute(self, pos):
+        ret = None
+        if pos >= 0 and pos < len(self.__values):
+            ret = float(self.__values[pos])
+        return ret
+
+    def append(self, value):
+        """Appends a value."""
+        self.appendWithDateTime(None, value)
+
+    def appendWithDateTime(self, dateTime, value):
+        """
+        Appends a value with an associated datetime.
+
+        .. note::
+            If dateTime is not None, it must be greater than the last one.
+        """
+
+        if dateTime is None:
+            timestamp = NO_TIMESTAMP
+        else:
+            timestamp = dt.datetime_to_microseconds(dateTime)
+            if len(self.__values) != 0 and self.__lastTimestamp >= timestamp:
+                raise Exception("Invalid datetime. It must be bigger than that last one")
+            self.__timeZone = dateTime.tzinfo
+
+        self.__lastTimestamp = timestamp
+        self.__timestamps.append(timestamp)
+        self.__values.append(value)
+
+        self.__newValueEvent.emit(self, dateTime, value)
+
+    def getDateTimes(self):
+        timeZone = self.__timeZone
+        return [None if timestamp == NO_TIMESTAMP else dt.microseconds_to_datetime(timestamp, timeZone)
+                for timestamp in self.__timestamps.data().tolist()]
+
+    def asarray(self, count=None):
+        values = self.__values.data()
+        if count is not None:
+            values = values[max(len(values) - count, 0):]
+        return values
+
+    def getTimestamps(self):
+        """Returns the int64 timestamps (microseconds since the epoch) associated with each value, as a numpy.array
+        view. Values appended without a datetime have NO_TIMESTAMP."""
+        return self.__timestamps.data()
@@ -18,11 +18,89 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import numpy as np
+
 from pyalgotrade import dataseries
+from pyalgotrade import observer
+from pyalgotrade.utils import collections
+
+# Bar values are stored in these columns.
+OPEN_COLUMN = 0
+HIGH_COLUMN = 1
+LOW_COLUMN = 2
+CLOSE_COLUMN = 3
+VOLUME_COLUMN = 4
+ADJ_CLOSE_COLUMN = 5
+COLUMN_COUNT = 6
+
+
+class BarColumnDataSeries(dataseries.NumericDataSeries):
+    """A DataSeries with the values from one column of a :class:`BarDataSeries`.
+    It doesn't hold any values by itself, it reads them from the columns where the bar dataseries stores them.
+
+    .. note::
+        Values are appended through the bar dataseries. This class should not be used directly.
+    """
+
+    def __init__(self, barDataSeries, columns, column, noneIfNaN=False):
+        self.__barDataSeries = barDataSeries
+        self.__columns = columns
+        self.__column = column
+        self.__noneIfNaN = noneIfNaN
+        self.__newValueEvent = observer.Event()
+
+    def __len__(self):
+        return len(self.__columns)
+
+    def __toValue(self, value):
+        value = float(value)
+        # Missing values (like the adjusted close in some feeds) are stored as NaN.
+        if self.__noneIfNaN and value != value:
+            value = None
+        return value
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            values = self.__columns.column(self.__column)[key]
+            if self.__noneIfNaN:
+                return [self.__toValue(value) for value in values]
+            return values.tolist()
+        elif isinstance(key, (int, long)):
+            return self.__toValue(self.__columns.column(self.__column)[key])
+        else:
+            raise TypeError("Invalid argument type")
+
+    def getMaxLen(self):
+        """Returns the maximum number of values to hold."""
+        return self.__columns.getMaxLen()
+
+    # Event handler receives:
+    # 1: Dataseries generating the event
+    # 2: The datetime for the new value
+    # 3: The new value
+    def getNewValueEvent(self):
+        return self.__newValueEvent
+
+    def getValueAbsolute(self, pos):
+        ret = None
+        if pos >= 0 and pos < len(self.__columns):
+            ret = self.__toValue(self.__columns.column(self.__column)[pos])
+        return ret
+
+    def getDateTimes(self):
+        return self.__barDataSeries.getDateTimes()
+
+    def asarray(self, count=None):
+        values = self.__columns.column(self.__column)
+        if count is not None:
+            values = values[max(len(values) - count, 0):]
+        return values
 
 
 class BarDataSeries(dataseries.SequenceDataSeries):
     """A DataSeries of :class:`pyalgotrade.bar.Bar` instances.
+    Open, high, low, close, volume and adjusted close values are stored column by column in NumPy arrays, and are
+    available through :class:`BarColumnDataSeries` instances.
 
     :param maxLen: The maximum number of values to hold.
         Once a bounded length is full, when new items are added, a corresponding number of items are discarded from the opposite end.
@@ -31,17 +109,32 @@ class BarDataSeries(dataseries.SequenceDataSeries):
 
     def __init__(self, maxLen=dataseries.DEFAULT_MAX_LEN):
         dataseries.SequenceDataSeries.__init__(self, maxLen)
-        self.__openDS = dataseries.SequenceDataSeries(maxLen)
-        self.__closeDS = dataseries.SequenceDataSeries(maxLen)
-        self.__highDS = dataseries.SequenceDataSeries(maxLen)
-        self.__lowDS = dataseries.SequenceDataSeries(maxLen)
-        self.__volumeDS = dataseries.SequenceDataSeries(maxLen)
-        self.__adjCloseDS = dataseries.SequenceDataSeries(maxLen)
+        self.__columns = collections.NumPyColumnDeque(maxLen, COLUMN_COUNT, np.float64)
+        self.__openDS = BarColumnDataSeries(self, self.__columns, OPEN_COLUMN)
+        self.__closeDS = BarColumnDataSeries(self, self.__columns, CLOSE_COLUMN)
+        self.__highDS = BarColumnDataSeries(self, self.__columns, HIGH_COLUMN)
+        self.__lowDS = BarColumnDataSeries(self, self.__columns, LOW_COLUMN)
+        self.__volumeDS = BarColumnDataSeries(self, self.__columns, VOLUME_COLUMN)
+        self.__adjCloseDS = BarColumnDataSeries(self, self.__columns, ADJ_CLOSE_COLUMN, True)
+        # Events are emitted in this order, (column dataseries, column).
+        self.__columnDataSeries = [
+            (self.__openDS, OPEN_COLUMN),
+            (self.__closeDS, CLOSE_COLUMN),
+            (self.__highDS, HIGH_COLUMN),
+            (self.__lowDS, LOW_COLUMN),
+            (self.__volumeDS, VOLUME_COLUMN),
+            (self.__adjCloseDS, ADJ_CLOSE_COLUMN),
+        ]
         self.__useAdjustedValues = False
 
     def setUseAdjustedValues(self, useAdjusted):
         self.__useAdjustedValues = useAdjusted
 
+    def setMaxLen(self, maxLen):
+        """Sets the maximum number of values to hold and resizes accordingly if necessary."""
+        dataseries.SequenceDataSeries.setMaxLen(self, maxLen)
+        self.__columns.resize(maxLen)
+
     def append(self, bar):
         self.appendWithDateTime(bar.getDateTime(), bar)
 
@@ -50,12 +143,14 @@ class BarDataSeries(dataseries.SequenceDataSeries):
         assert(bar is not None)
         bar.setUseAdjustedValue(self.__useAdjustedValues)
         dataseries.SequenceDataSeries.appendWithDateTime(self, dateTime, bar)
-        self.__openDS.appendWithDateTime(dateTime, bar.getOpen())
-        self.__closeDS.appendWithDateTime(dateTime, bar.getClose())
-        self.__highDS.appendWithDateTime(dateTime, bar.getHigh())
-        self.__lowDS.appendWithDateTime(dateTime, bar.getLow())
-        self.__volumeDS.appendWithDateTime(dateTime, bar.getVolume())
-        self.__adjCloseDS.appendWithDateTime(dateTime, bar.getAdjClose())
+
+        row = (bar.getOpen(), bar.getHigh(), bar.getLow(), bar.getClose(), bar.getVolume(), bar.getAdjClose())
+        self.__columns.append(row)
+        # Only column dataseries that someone is listening to emit events.
+        for ds, column in self.__columnDataSeries:
+            event = ds.getNewValueEvent()
+            if event.hasSubscribers():
+                event.emit(ds, dateTime, row[column])
 
     def getOpenDataSeries(self):
         """Returns a :class:`pyalgotrade.dataseries.DataSeries` with the open prices."""
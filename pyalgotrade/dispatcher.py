@@ -18,18 +18,26 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import time
+
 from pyalgotrade import utils
 from pyalgotrade import observer
 
 
 # This class is responsible for dispatching events from multiple subjects, synchronizing them if necessary.
+# If every subject knows the datetimes of the events left to dispatch (see observer.Subject.getDispatchDateTimes), as
+# when backtesting, those are merged into a timeline once and subjects are dispatched following it. Otherwise every
+# subject is polled on each iteration.
 class Dispatcher(object):
-    def __init__(self):
+    def __init__(self, useTimeline=True):
         self.__subjects = []
         self.__stop = False
         self.__startEvent = observer.Event()
         self.__idleEvent = observer.Event()
         self.__currDateTime = None
+        self.__useTimeline = useTimeline
+        self.__eventsDispatched = 0
+        self.__runTime = 0
 
     # Returns the current event datetime. It may be None for events from realtime subjects.
     def getCurrentDateTime(self):
@@ -44,6 +52,17 @@ class Dispatcher(object):
     def stop(self):
         self.__stop = True
 
+    # Returns the number of dispatch() calls that dispatched events during the last run.
+    def getEventsDispatched(self):
+        return self.__eventsDispatched
+
+    # Returns the events dispatched per second during the last run.
+    def getEventsPerSecond(self):
+        ret = 0
+        if self.__runTime > 0:
+            ret = self.__eventsDispatched / self.__runTime
+        return ret
+
     def getSubjects(self):
         return self.__subjects
 
@@ -66,6 +85,8 @@ class Dispatcher(object):
         # Dispatch if the datetime is currEventDateTime of if its a realtime subject.
         if not subject.eof() and subject.peekDateTime() in (None, currEventDateTime):
             ret = subject.dispatch() is True
+            if ret:
+                self.__eventsDispatched += 1
         return ret
 
     # Returns a tuple with booleans
@@ -91,19 +112,68 @@ class Dispatcher(object):
                     eventsDispatched = True
         return eof, eventsDispatched
 
+    # Returns a list of (datetime, subjects to dispatch) sorted by datetime, or None if a subject can't tell in advance
+    # when its events will be dispatched.
+    def __buildTimeline(self):
+        subjectsByKey = {}
+        for subject in self.__subjects:
+            dateTimes = subject.getDispatchDateTimes()
+            if dateTimes is None:
+                return None
+            # A subject can dispatch many events with the same datetime. Those are taken one at a time, just like the
+            # polling loop does, so the key includes the number of previous events with that datetime.
+            lastDateTime = None
+            repeated = 0
+            for dateTime in dateTimes:
+                if dateTime == lastDateTime:
+                    repeated += 1
+                else:
+                    lastDateTime = dateTime
+                    repeated = 0
+                # Subjects are appended in dispatch priority order.
+                subjectsByKey.setdefault((dateTime, repeated), []).append(subject)
+        return [(key[0], subjects) for key, subjects in sorted(subjectsByKey.iteritems())]
+
+    def __runPolling(self):
+        while not self.__stop:
+            eof, eventsDispatched = self.__dispatch()
+            if eof:
+                self.__stop = True
+            elif not eventsDispatched:
+                self.__idleEvent.emit()
+
+    def __runTimeline(self, timeline):
+        eventsDispatched = 0
+        try:
+            for dateTime, subjects in timeline:
+                if self.__stop:
+                    break
+                self.__currDateTime = dateTime
+                for subject in subjects:
+                    if subject.dispatch() is True:
+                        eventsDispatched += 1
+        finally:
+            self.__eventsDispatched += eventsDispatched
+        self.__stop = True
+
     def run(self):
+        self.__eventsDispatched = 0
+        self.__runTime = 0
         try:
             for subject in self.__subjects:
                 subject.start()
 
             self.__startEvent.emit()
 
-            while not self.__stop:
-                eof, eventsDispatched = self.__dispatch()
-                if eof:
-                    self.__stop = True
-                elif not eventsDispatched:
-                    self.__idleEvent.emit()
+            begin = time.time()
+            timeline = None
+            if self.__useTimeline:
+                timeline = self.__buildTimeline()
+            if timeline is not None:
+                self.__runTimeline(timeline)
+            else:
+                self.__runPolling()
+            self.__runTime = time.time() - begin
         finally:
             for subject in self.__subjects:
                 subject.stop()
@@ -53,6 +53,9 @@ class MemFeed(feed.BaseFeed):
             ret = self.__values[self.__nextIdx][0]
         return ret
 
+    def getDispatchDateTimes(self):
+        return [dateTime for dateTime, values in self.__values[self.__nextIdx:]]
+
     def createDataSeries(self, key, maxLen):
         return dataseries.SequenceDataSeries(maxLen)
 
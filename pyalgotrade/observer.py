@@ -52,6 +52,9 @@ class Event(object):
         else:
             self.__handlers.remove(handler)
 
+    def hasSubscribers(self):
+        return len(self.__handlers) > 0 or len(self.__toSubscribe) > 0
+
     def emit(self, *args, **kwargs):
         try:
             self.__emitting = True
@@ -101,3 +104,9 @@ class Subject(object):
         # Returns a number (or None) used to sort subjects within the dispatch queue.
         # The return value should never change.
         return None
+
+    def getDispatchDateTimes(self):
+        # Returns a list with the datetime of every event left to dispatch, in order, one for each call to dispatch().
+        # This allows the dispatcher to build the timeline up front when backtesting.
+        # Return None if that can't be known in advance, like in realtime subjects.
+        return None
@@ -26,25 +26,28 @@ import random
 import os
 
 from pyalgotrade.optimizer import server
+from pyalgotrade.optimizer import store
 from pyalgotrade.optimizer import worker
+from pyalgotrade.barfeed import sharedbf
 
 
 class ServerThread(threading.Thread):
-    def __init__(self, server, barFeed, strategyParameters):
+    def __init__(self, server, barFeed, strategyParameters, dataFingerprint=None):
         threading.Thread.__init__(self)
         self.__server = server
         self.__barFeed = barFeed
         self.__strategyParameters = strategyParameters
+        self.__dataFingerprint = dataFingerprint
         self.__results = None
 
     def getResults(self):
         return self.__results
 
     def run(self):
-        self.__results = self.__server.serve(self.__barFeed, self.__strategyParameters)
+        self.__results = self.__server.serve(self.__barFeed, self.__strategyParameters, self.__dataFingerprint)
 
 
-def worker_process(strategyClass, port):
+def worker_process(strategyClass, port, sharedBars=None):
     class Worker(worker.Worker):
         def runStrategy(self, barFeed, *args, **kwargs):
             strat = strategyClass(barFeed, *args, **kwargs)
@@ -53,7 +56,7 @@ def worker_process(strategyClass, port):
 
     # Create a worker and run it.
     name = "worker-%s" % (os.getpid())
-    w = Worker("localhost", port, name)
+    w = Worker("localhost", port, name, sharedBars)
     w.getLogger().setLevel(logging.ERROR)
     w.run()
 
@@ -70,15 +73,24 @@ def find_port():
             pass
 
 
-def run(strategyClass, barFeed, strategyParameters, workerCount=None):
+def run(strategyClass, barFeed, strategyParameters, workerCount=None, shareBars=False, resultStore=None, resultLog=None):
     """Executes many instances of a strategy in parallel and finds the parameters that yield the best results.
 
     :param strategyClass: The strategy class.
     :param barFeed: The bar feed to use to backtest the strategy.
     :type barFeed: :class:`pyalgotrade.barfeed.BarFeed`.
-    :param strategyParameters: The set of parameters to use for backtesting. An iterable object where **each element is a tuple that holds parameter values**.
+    :param strategyParameters: The set of parameters to use for backtesting. An iterable object where **each element is a tuple that holds parameter values**,
+        or a :class:`pyalgotrade.optimizer.search.SearchStrategy` to choose the parameters based on previous results.
     :param workerCount: The number of strategies to run in parallel. If None then as many workers as CPUs are used.
     :type workerCount: int.
+    :param shareBars: True to load the bars once into memory mapped files that all the workers use, instead of sending
+        a copy of the bars to every worker.
+    :type shareBars: boolean.
+    :param resultStore: Where to save results, and look for results from previous executions before running the
+        strategy, so that an interrupted execution can be resumed or a search extended.
+    :type resultStore: :class:`pyalgotrade.optimizer.store.ResultStore`.
+    :param resultLog: Where to write every result as it arrives.
+    :type resultLog: :class:`pyalgotrade.optimizer.store.ResultLog`.
     :rtype: A :class:`Results` instance with the best results found.
     """
 
@@ -92,15 +104,28 @@ def run(strategyClass, barFeed, strategyParameters, workerCount=None):
     if port is None:
         raise Exception("Failed to find a port to listen")
 
+    sharedBars = None
+    dataFingerprint = None
+    if shareBars:
+        sharedBars = sharedbf.SharedBars.create(barFeed)
+        # Workers map the bars themselves so the server doesn't need to load them.
+        barFeed = None
+        if resultStore is not None:
+            dataFingerprint = store.fingerprint_bars(
+                sharedBars.getInstruments(), (bars for dateTime, bars in sharedbf.Feed(sharedBars))
+            )
+
     # Build and start the server thread before the worker processes. We'll manually stop the server once workers have finished.
-    srv = server.Server("localhost", port, False)
-    serverThread = ServerThread(srv, barFeed, strategyParameters)
+    srv = server.Server("localhost", port, False, resultStore)
+    if resultLog is not None:
+        srv.getNewResultsEvent().subscribe(resultLog.addResults)
+    serverThread = ServerThread(srv, barFeed, strategyParameters, dataFingerprint)
     serverThread.start()
 
     try:
         # Build the worker processes.
         for i in range(workerCount):
-            workers.append(multiprocessing.Process(target=worker_process, args=(strategyClass, port)))
+            workers.append(multiprocessing.Process(target=worker_process, args=(strategyClass, port, sharedBars)))
 
         # Start workers
         for process in workers:
@@ -115,4 +140,6 @@ def run(strategyClass, barFeed, strategyParameters, workerCount=None):
         srv.stop()
         serverThread.join()
         ret = serverThread.getResults()
+        if sharedBars is not None:
+            sharedBars.close()
     return ret
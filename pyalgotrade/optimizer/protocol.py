@@ -0,0 +1,84 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
+"""
+
+import socket
+import struct
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+# Messages are pickles preceded by their length, as an 8 byte unsigned integer in network byte order.
+# Requests are (function name, arguments) tuples and responses are the values returned, except for functions that
+# don't respond.
+HEADER = struct.Struct("!Q")
+
+
+# A socket.error, so that it is handled like any other network error.
+class ConnectionClosed(socket.error):
+    pass
+
+
+# Sent instead of the response when the function fails, and raised by the worker.
+class RemoteError(Exception):
+    pass
+
+
+class EncodedMessage(object):
+    """A message that was already encoded, to send the same big message many times without pickling it again."""
+    def __init__(self, message):
+        self.__data = encode(message)
+
+    def getData(self):
+        return self.__data
+
+
+def encode(message):
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(len(data)) + data
+
+
+def send_message(sock, message):
+    if isinstance(message, EncodedMessage):
+        sock.sendall(message.getData())
+    else:
+        sock.sendall(encode(message))
+
+
+def recv_exactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionClosed("Connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return "".join(chunks)
+
+
+def recv_message(sock):
+    size = HEADER.unpack(recv_exactly(sock, HEADER.size))[0]
+    return pickle.loads(recv_exactly(sock, size))
+
+
+def configure_socket(sock):
+    # Messages are small and every request waits for a response, so don't wait to fill packets.
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
@@ -0,0 +1,424 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
+"""
+
+import abc
+import math
+import random
+
+import numpy as np
+
+
+class ParameterSpace(object):
+    """The values that each strategy parameter can take. Every combination of values is a set of parameters.
+
+    :param values: A sequence with the values for each parameter, in the order they are passed to the strategy.
+        For example, [["orcl"], range(5, 101)] for a strategy with an instrument and a period.
+    :type values: list.
+    """
+
+    def __init__(self, values):
+        self.__values = [list(parameterValues) for parameterValues in values]
+        for parameterValues in self.__values:
+            if len(parameterValues) == 0:
+                raise Exception("Every parameter must have at least one value")
+        self.__size = 1
+        for parameterValues in self.__values:
+            self.__size *= len(parameterValues)
+
+    def getValues(self):
+        return self.__values
+
+    def getSize(self):
+        """Returns the number of sets of parameters."""
+        return self.__size
+
+    def getParameters(self, index):
+        """Returns the set of parameters at a given position, between 0 and :meth:`getSize` - 1."""
+        ret = []
+        for parameterValues in reversed(self.__values):
+            index, pos = divmod(index, len(parameterValues))
+            ret.append(parameterValues[pos])
+        ret.reverse()
+        return tuple(ret)
+
+    def getCoordinates(self, index):
+        """Returns the position of each value in a set of parameters, scaled to [0, 1]."""
+        ret = []
+        for parameterValues in reversed(self.__values):
+            index, pos = divmod(index, len(parameterValues))
+            if len(parameterValues) > 1:
+                ret.append(pos / float(len(parameterValues) - 1))
+            else:
+                ret.append(0.0)
+        ret.reverse()
+        return ret
+
+    def sample(self, count, rnd, exclude=()):
+        """Returns up to count different positions chosen at random.
+
+        :param count: The number of positions.
+        :type count: int.
+        :param rnd: The random number generator.
+        :type rnd: random.Random.
+        :param exclude: Positions that should not be returned.
+        """
+        available = self.__size - len(exclude)
+        count = min(count, available)
+        if count <= 0:
+            return []
+        if available <= count * 4:
+            # Small spaces.
+            return rnd.sample([i for i in xrange(self.__size) if i not in exclude], count)
+        ret = []
+        chosen = set(exclude)
+        while len(ret) < count:
+            index = rnd.randrange(self.__size)
+            if index not in chosen:
+                chosen.add(index)
+                ret.append(index)
+        return ret
+
+
+def build_parameter_space(parameterSpace):
+    if isinstance(parameterSpace, ParameterSpace):
+        return parameterSpace
+    return ParameterSpace(parameterSpace)
+
+
+class SearchStrategy(object):
+    """Base class for search strategies, that decide which parameters to backtest.
+
+    The server asks the search strategy for parameters every time a worker needs a job, and passes the results
+    back as workers push them, so a search strategy can decide what to backtest next based on previous results.
+    The parameters can be backtested using only the first bars, which is faster and good enough to discard bad
+    parameters.
+
+    .. note::
+        This is a base class and should not be used directly.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractmethod
+    def getNextParameters(self, count):
+        """Returns a tuple with a list of up to count sets of parameters to backtest, and the fraction of the bars to
+        use. The list is empty if there are no parameters to backtest until more results are in.
+
+        :param count: The maximum number of sets of parameters.
+        :type count: int.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def addResults(self, results, barsFraction):
+        """Called with the results of backtesting parameters returned by :meth:`getNextParameters`.
+
+        :param results: A list of (parameters, result) tuples.
+        :param barsFraction: The fraction of the bars used.
+        :type barsFraction: float.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def isFinished(self):
+        """Returns True if there are no more parameters to backtest."""
+        raise NotImplementedError()
+
+
+class GridSearch(SearchStrategy):
+    """Backtests every set of parameters, in order.
+
+    :param strategyParameters: An iterable object where each element is a tuple that holds parameter values.
+    """
+
+    def __init__(self, strategyParameters):
+        self.__parametersIterator = iter(strategyParameters)
+
+    def getNextParameters(self, count):
+        ret = []
+        if self.__parametersIterator is not None:
+            try:
+                for i in xrange(count):
+                    ret.append(self.__parametersIterator.next())
+            except StopIteration:
+                self.__parametersIterator = None
+        return ret, 1.0
+
+    def addResults(self, results, barsFraction):
+        pass
+
+    def isFinished(self):
+        return self.__parametersIterator is None
+
+
+class RandomSearch(GridSearch):
+    """Backtests sets of parameters chosen at random, without repeating them.
+
+    :param parameterSpace: The values for each parameter.
+    :type parameterSpace: :class:`ParameterSpace` or a sequence with the values for each parameter.
+    :param count: The number of sets of parameters to backtest.
+    :type count: int.
+    :param seed: The seed for the random number generator.
+    """
+
+    def __init__(self, parameterSpace, count, seed=None):
+        parameterSpace = build_parameter_space(parameterSpace)
+        indexes = parameterSpace.sample(count, random.Random(seed))
+        GridSearch.__init__(self, (parameterSpace.getParameters(index) for index in indexes))
+
+
+class RoundSearch(SearchStrategy):
+    """Base class for search strategies that backtest parameters in rounds, and wait for all the results from a
+    round before deciding what to backtest in the next one.
+
+    .. note::
+        This is a base class and should not be used directly. Subclasses implement :meth:`nextRound` and
+        :meth:`onResults`.
+    """
+
+    def __init__(self):
+        self.__parameters = []
+        self.__barsFraction = 1.0
+        self.__pending = 0
+        self.__finished = False
+
+    def __advance(self):
+        while not self.__finished and len(self.__parameters) == 0 and self.__pending == 0:
+            nextRound = self.nextRound()
+            if nextRound is None:
+                self.__finished = True
+            else:
+                self.__parameters = list(nextRound[0])
+                self.__barsFraction = nextRound[1]
+
+    @abc.abstractmethod
+    def nextRound(self):
+        """Returns a tuple with a list with the sets of parameters to backtest in the next round and the fraction of
+        the bars to use, or None if the search is over."""
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def onResults(self, results, barsFraction):
+        """Called with a list of (parameters, result) tuples with results from the current round."""
+        raise NotImplementedError()
+
+    def getNextParameters(self, count):
+        self.__advance()
+        ret = self.__parameters[:count]
+        del self.__parameters[:count]
+        self.__pending += len(ret)
+        return ret, self.__barsFraction
+
+    def addResults(self, results, barsFraction):
+        self.__pending -= len(results)
+        self.onResults(results, barsFraction)
+
+    def isFinished(self):
+        self.__advance()
+        return self.__finished
+
+
+class SuccessiveHalving(RoundSearch):
+    """Backtests sets of parameters chosen at random using a fraction of the bars, and keeps backtesting the
+    best 1/eta of them using eta times more bars, until the remaining ones are backtested using all the bars.
+
+    :param parameterSpace: The values for each parameter.
+    :type parameterSpace: :class:`ParameterSpace` or a sequence with the values for each parameter.
+    :param count: The number of sets of parameters to start with.
+    :type count: int.
+    :param eta: The factor by which the number of sets of parameters is reduced in each round.
+    :type eta: int.
+    :param minBarsFraction: The minimum fraction of the bars to use. Strategies need enough bars for the results
+        to mean something.
+    :type minBarsFraction: float.
+    :param seed: The seed for the random number generator.
+    """
+
+    def __init__(self, parameterSpace, count, eta=3, minBarsFraction=0.1, seed=None):
+        RoundSearch.__init__(self)
+        if eta < 2:
+            raise Exception("eta must be greater than 1")
+        parameterSpace = build_parameter_space(parameterSpace)
+        indexes = parameterSpace.sample(count, random.Random(seed))
+        self.__candidates = [parameterSpace.getParameters(index) for index in indexes]
+        self.__eta = eta
+        self.__minBarsFraction = minBarsFraction
+        self.__results = []
+        self.__round = 0
+        self.__rounds = 1
+        size = len(self.__candidates)
+        while size >= eta:
+            size /= eta
+            self.__rounds += 1
+
+    def getBarsFraction(self, round):
+        """Returns the fraction of the bars used in a given round."""
+        return max(self.__eta ** (round - self.__rounds + 1), self.__minBarsFraction)
+
+    def nextRound(self):
+        if self.__round > 0:
+            if self.__round == self.__rounds:
+                return None
+            # Keep the best ones. sorted is stable, so ties are broken by the order of the candidates.
+            results = dict(self.__results)
+            self.__candidates = sorted(self.__candidates, key=lambda parameters: results[parameters], reverse=True)
+            self.__candidates = self.__candidates[:max(1, len(self.__candidates) / self.__eta)]
+            self.__results = []
+        ret = (self.__candidates, self.getBarsFraction(self.__round))
+        self.__round += 1
+        return ret
+
+    def onResults(self, results, barsFraction):
+        self.__results.extend(results)
+
+
+class SurrogateSearch(RoundSearch):
+    """Backtests sets of parameters chosen at random, and then uses a model of the results fitted on the ones
+    backtested so far (a gaussian process) to choose the sets of parameters with the largest expected improvement
+    over the best result.
+
+    :param parameterSpace: The values for each parameter. Values should be sorted, since the model assumes that
+        results are similar for values that are close to each other.
+    :type parameterSpace: :class:`ParameterSpace` or a sequence with the values for each parameter.
+    :param count: The number of sets of parameters to backtest.
+    :type count: int.
+    :param initialCount: The number of sets of parameters chosen at random before using the model.
+        Defaults to 10 or a quarter of count, whichever is smaller.
+    :type initialCount: int.
+    :param batchSize: The number of sets of parameters chosen by the model in each round. Should be at least the
+        number of workers to keep them busy.
+    :type batchSize: int.
+    :param candidateCount: The number of sets of parameters, chosen at random, that the model evaluates in each round.
+    :type candidateCount: int.
+    :param seed: The seed for the random number generator.
+    """
+
+    LENGTH_SCALES = [0.05, 0.1, 0.2, 0.4, 0.8]
+    NOISE = 1e-4
+
+    def __init__(self, parameterSpace, count, initialCount=None, batchSize=8, candidateCount=1000, seed=None):
+        RoundSearch.__init__(self)
+        self.__parameterSpace = build_parameter_space(parameterSpace)
+        self.__count = min(count, self.__parameterSpace.getSize())
+        if initialCount is None:
+            initialCount = min(10, max(1, self.__count / 4))
+        self.__initialCount = min(initialCount, self.__count)
+        self.__batchSize = batchSize
+        self.__candidateCount = candidateCount
+        self.__random = random.Random(seed)
+        # Set of parameters -> position in the parameter space.
+        self.__indexes = {}
+        self.__results = {}
+
+    def __issue(self, indexes):
+        ret = []
+        for index in indexes:
+            parameters = self.__parameterSpace.getParameters(index)
+            self.__indexes[parameters] = index
+            ret.append(parameters)
+        return ret
+
+    def nextRound(self):
+        issued = len(self.__indexes)
+        if issued >= self.__count:
+            return None
+        if issued == 0:
+            ret = self.__parameterSpace.sample(self.__initialCount, self.__random)
+        else:
+            ret = self.__propose(min(self.__batchSize, self.__count - issued))
+        return self.__issue(ret), 1.0
+
+    def onResults(self, results, barsFraction):
+        for parameters, result in results:
+            self.__results[parameters] = result
+
+    def __propose(self, count):
+        exclude = set(self.__indexes.values())
+        candidates = self.__parameterSpace.sample(self.__candidateCount, self.__random, exclude)
+        if len(candidates) <= count:
+            return candidates
+
+        x = np.array([self.__parameterSpace.getCoordinates(index) for index in self.__indexes.values()])
+        y = [self.__results.get(parameters) for parameters in self.__indexes.keys()]
+        known = [result for result in y if result is not None]
+        if len(known) == 0:
+            return candidates[:count]
+        # Failed backtests count as the worst result.
+        y = np.array([result if result is not None else min(known) for result in y], dtype=float)
+        std = y.std()
+        y = (y - y.mean()) / (std if std > 0 else 1)
+        candidateX = np.array([self.__parameterSpace.getCoordinates(index) for index in candidates])
+        lengthScale = self.__fitLengthScale(x, y)
+
+        # Pick one at a time, and assume that its result is the predicted one (kriging believer) so that the next
+        # ones are not chosen right next to it.
+        ret = []
+        available = np.ones(len(candidates), dtype=bool)
+        for i in xrange(count):
+            mean, sigma = gp_predict(x, y, candidateX, lengthScale, SurrogateSearch.NOISE)
+            ei = expected_improvement(mean, sigma, y.max())
+            ei[~available] = -1
+            pos = int(ei.argmax())
+            available[pos] = False
+            ret.append(candidates[pos])
+            x = np.vstack([x, candidateX[pos]])
+            y = np.append(y, mean[pos])
+        return ret
+
+    def __fitLengthScale(self, x, y):
+        ret = None
+        bestLikelihood = None
+        for lengthScale in SurrogateSearch.LENGTH_SCALES:
+            likelihood = gp_log_likelihood(x, y, lengthScale, SurrogateSearch.NOISE)
+            if bestLikelihood is None or likelihood > bestLikelihood:
+                bestLikelihood = likelihood
+                ret = lengthScale
+        return ret
+
+
+def rbf_kernel(a, b, lengthScale):
+    sqDist = (a ** 2).sum(axis=1)[:, np.newaxis] + (b ** 2).sum(axis=1)[np.newaxis, :] - 2 * np.dot(a, b.T)
+    return np.exp(-0.5 * np.maximum(sqDist, 0) / lengthScale ** 2)
+
+
+def gp_log_likelihood(x, y, lengthScale, noise):
+    k = rbf_kernel(x, x, lengthScale) + noise * np.eye(len(x))
+    l = np.linalg.cholesky(k)
+    alpha = np.linalg.solve(l.T, np.linalg.solve(l, y))
+    return -0.5 * np.dot(y, alpha) - np.log(np.diag(l)).sum()
+
+
+def gp_predict(x, y, newX, lengthScale, noise):
+    k = rbf_kernel(x, x, lengthScale) + noise * np.eye(len(x))
+    l = np.linalg.cholesky(k)
+    alpha = np.linalg.solve(l.T, np.linalg.solve(l, y))
+    kStar = rbf_kernel(newX, x, lengthScale)
+    mean = np.dot(kStar, alpha)
+    v = np.linalg.solve(l, kStar.T)
+    variance = np.maximum(1 - (v ** 2).sum(axis=0), 1e-12)
+    return mean, np.sqrt(variance)
+
+
+def expected_improvement(mean, sigma, best):
+    improvement = mean - best
+    z = improvement / sigma
+    cdf = 0.5 * (1 + np.array([math.erf(value / math.sqrt(2)) for value in z.tolist()]))
+    pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2 * math.pi)
+    return improvement * cdf + sigma * pdf
@@ -18,11 +18,19 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
-import SimpleXMLRPCServer
+import SocketServer
+import collections
+import heapq
+import itertools
+import socket
 import threading
 import time
-import pickle
+
 import pyalgotrade.logger
+from pyalgotrade import observer
+from pyalgotrade.optimizer import protocol
+from pyalgotrade.optimizer import search
+from pyalgotrade.optimizer import store
 
 
 class AutoStopThread(threading.Thread):
@@ -38,9 +46,12 @@ class AutoStopThread(threading.Thread):
 
 class Results(object):
     """The results of the strategy executions."""
-    def __init__(self, parameters, result):
+    def __init__(self, parameters, result, topResults=None):
         self.__parameters = parameters
         self.__result = result
+        if topResults is None:
+            topResults = [(parameters, result)]
+        self.__topResults = topResults
 
     def getParameters(self):
         """Returns a sequence of parameter values."""
@@ -50,10 +61,47 @@ class Results(object):
         """Returns the result for a given set of parameters."""
         return self.__result
 
+    def getTopResults(self):
+        """Returns a list of (parameters, result) tuples with the best results, the best one first.
+        **pyalgotrade.optimizer.server.Server.topResultsCount** controls how many are kept."""
+        return self.__topResults
+
+
+class TopResults(object):
+    """Keeps the best results in a heap.
+
+    :param count: The number of results to keep.
+    :type count: int.
+    """
+
+    def __init__(self, count):
+        assert(count > 0)
+        self.__count = count
+        # (result, sequence number, parameters) with the worst result first. The sequence number breaks ties so that
+        # parameters are never compared, and keeps the first results found.
+        self.__heap = []
+        self.__counter = itertools.count()
+
+    def add(self, parameters, result):
+        item = (result, -self.__counter.next(), parameters)
+        if len(self.__heap) < self.__count:
+            heapq.heappush(self.__heap, item)
+        elif item > self.__heap[0]:
+            heapq.heapreplace(self.__heap, item)
+
+    def getResults(self):
+        """Returns a list of (parameters, result) tuples, the best one first."""
+        return [(parameters, result) for result, counter, parameters in sorted(self.__heap, reverse=True)]
+
+    def __len__(self):
+        return len(self.__heap)
+
 
 class Job(object):
-    def __init__(self, strategyParameters):
+    def __init__(self, strategyParameters, barsFraction=1.0):
         self.__strategyParameters = strategyParameters
+        self.__parameterCount = len(strategyParameters)
+        self.__barsFraction = barsFraction
         self.__bestResult = None
         self.__bestParameters = None
         self.__id = id(self)
@@ -61,6 +109,13 @@ class Job(object):
     def getId(self):
         return self.__id
 
+    def getParameterCount(self):
+        return self.__parameterCount
+
+    def getBarsFraction(self):
+        """Returns the fraction of the bars to use, starting from the first one."""
+        return self.__barsFraction
+
     def getNextParameters(self):
         ret = None
         if len(self.__strategyParameters):
@@ -82,49 +137,153 @@ class Job(object):
         self.__bestWorkerName = workerName
 
 
-# Restrict to a particular path.
-class RequestHandler(SimpleXMLRPCServer.SimpleXMLRPCRequestHandler):
-    rpc_paths = ('/PyAlgoTradeRPC',)
+class RequestHandler(SocketServer.BaseRequestHandler):
+    # Handles the requests from a single worker, one after the other, until the worker disconnects.
+    def handle(self):
+        protocol.configure_socket(self.request)
+        # The jobs given to the worker that it didn't push results for yet. They are put back if the connection is lost.
+        jobIds = set()
+        try:
+            while True:
+                try:
+                    functionName, args = protocol.recv_message(self.request)
+                except (protocol.ConnectionClosed, socket.error):
+                    break
+                try:
+                    function, reply = self.server.getFunction(functionName)
+                except KeyError:
+                    function, reply = None, True
+                try:
+                    if function is None:
+                        raise Exception("Unknown function %s" % functionName)
+                    ret = function(*args)
+                except Exception, e:
+                    self.server.getLogger().exception("Error processing %s" % functionName)
+                    if not reply:
+                        # The worker doesn't wait for a response, so close the connection to let it know.
+                        break
+                    ret = protocol.RemoteError("Error processing %s: %s" % (functionName, e))
+                if functionName == "getNextJob" and isinstance(ret, Job) and ret.getParameterCount():
+                    jobIds.add(ret.getId())
+                elif functionName == "pushJobResults":
+                    jobIds.discard(args[0])
+                if reply:
+                    try:
+                        protocol.send_message(self.request, ret)
+                    except socket.error:
+                        break
+        finally:
+            self.server.requeueJobs(jobIds)
 
 
-class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
+class Server(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    # The maximum number of parameters in a job. The actual number depends on how long it takes to run the strategy.
     defaultBatchSize = 200
+    # How long, in seconds, should it take a worker to process a job.
+    targetJobDuration = 1.0
+    # How long, in seconds, to wait for results when the search strategy needs them to decide what to backtest next.
+    jobWaitTimeout = 0.1
+    # The number of best results to keep.
+    topResultsCount = 10
 
-    def __init__(self, address, port, autoStop=True):
-        SimpleXMLRPCServer.SimpleXMLRPCServer.__init__(self, (address, port), requestHandler=RequestHandler, logRequests=False, allow_none=True)
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, address, port, autoStop=True, resultStore=None):
+        SocketServer.TCPServer.__init__(self, (address, port), RequestHandler)
 
         self.__instrumentsAndBars = None  # Pickle'd instruments and bars for faster retrieval.
         self.__barsFreq = None
         self.__activeJobs = {}
+        # Active jobs given to workers that lost their connection, to give them to other workers.
+        self.__requeuedJobs = collections.deque()
         self.__activeJobsLock = threading.Lock()
         self.__parametersLock = threading.Lock()
+        self.__resultsAvailable = threading.Condition(self.__parametersLock)
         self.__bestJob = None
-        self.__parametersIterator = None
+        self.__topResults = TopResults(Server.topResultsCount)
+        self.__resultsLock = threading.Lock()
+        self.__newResultsEvent = observer.Event()
+        self.__search = None
+        self.__resultStore = resultStore
+        self.__dataFingerprint = None
+        # Exponential moving average of the seconds it takes to run the strategy with a set of parameters.
+        self.__secondsPerParameters = None
+        self.__lastBarsFraction = 1.0
         self.__logger = pyalgotrade.logger.getLogger("server")
         if autoStop:
             self.__autoStopThread = AutoStopThread(self)
         else:
             self.__autoStopThread = None
 
-        self.register_introspection_functions()
-        self.register_function(self.getInstrumentsAndBars, 'getInstrumentsAndBars')
-        self.register_function(self.getBarsFrequency, 'getBarsFrequency')
-        self.register_function(self.getNextJob, 'getNextJob')
-        self.register_function(self.pushJobResults, 'pushJobResults')
+        # Function name -> (function, True if the function sends a response).
+        self.__functions = {}
+        self.registerFunction(self.getInstrumentsAndBars, "getInstrumentsAndBars")
+        self.registerFunction(self.getBarsFrequency, "getBarsFrequency")
+        self.registerFunction(self.getNextJob, "getNextJob")
+        # Workers don't wait for a response after pushing results.
+        self.registerFunction(self.pushJobResults, "pushJobResults", False)
         self.__forcedStop = False
 
-    def __getNextParams(self):
-        ret = []
+    def registerFunction(self, function, name, reply=True):
+        self.__functions[name] = (function, reply)
+
+    def getFunction(self, name):
+        return self.__functions[name]
+
+    def getBatchSize(self, barsFraction=1.0):
+        """Returns the number of parameters to include in the next job."""
+        secondsPerParameters = self.__secondsPerParameters
+        # Start with small jobs until the time it takes to run the strategy is known.
+        if secondsPerParameters is None:
+            return 1
+        secondsPerParameters *= barsFraction
+        if secondsPerParameters <= 0:
+            return Server.defaultBatchSize
+        return max(1, min(Server.defaultBatchSize, int(Server.targetJobDuration / secondsPerParameters)))
+
+    def __updateSecondsPerParameters(self, parameterCount, barsFraction, elapsed):
+        # Estimate how long it would take to use all the bars.
+        secondsPerParameters = elapsed / float(parameterCount) / barsFraction
+        if self.__secondsPerParameters is None:
+            self.__secondsPerParameters = secondsPerParameters
+        else:
+            self.__secondsPerParameters = 0.8 * self.__secondsPerParameters + 0.2 * secondsPerParameters
+
+    def __getParamsToBacktest(self):
+        # The batch size depends on the fraction of the bars to use, which is not known until the search strategy
+        # returns parameters, so assume it is the same as in the previous job.
+        ret, barsFraction = self.__search.getNextParameters(self.getBatchSize(self.__lastBarsFraction))
+        # Parameters that were already backtested are answered from the result store.
+        while self.__resultStore is not None and len(ret):
+            storedResults = self.__resultStore.getResults(self.__dataFingerprint, ret, barsFraction)
+            if len(storedResults) == 0:
+                break
+            stored = set(store.get_parameters_key(parameters) for parameters, result in storedResults)
+            ret = [parameters for parameters in ret if store.get_parameters_key(parameters) not in stored]
+            self.__search.addResults(storedResults, barsFraction)
+            self.__addResults(Job([parameters for parameters, result in storedResults], barsFraction), storedResults, store.STORE_WORKER_NAME)
+            if len(ret):
+                break
+            # Looking up results is cheap and doesn't tell how long the strategy takes to run, so keep looking them up
+            # in full batches while they are all found.
+            ret, barsFraction = self.__search.getNextParameters(Server.defaultBatchSize)
+        return ret, barsFraction
 
+    def __getNextParams(self):
         # Get the next set of parameters.
         with self.__parametersLock:
-            if self.__parametersIterator is not None:
-                try:
-                    for i in xrange(Server.defaultBatchSize):
-                        ret.append(self.__parametersIterator.next())
-                except StopIteration:
-                    self.__parametersIterator = None
-        return ret
+            if self.__search is None:
+                return [], 1.0
+            ret, barsFraction = self.__getParamsToBacktest()
+            if len(ret) == 0 and (not self.__search.isFinished() or self.__hasActiveJobs()):
+                # Wait for another worker to push results, but not too long since the results needed may be from the
+                # worker waiting for this job. Once the search is finished, wait in case an active job is put back.
+                self.__resultsAvailable.wait(Server.jobWaitTimeout)
+                ret, barsFraction = self.__getParamsToBacktest()
+            self.__lastBarsFraction = barsFraction
+        return ret, barsFraction
 
     def getLogger(self):
         return self.__logger
@@ -133,42 +292,73 @@ class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
         return self.__instrumentsAndBars
 
     def getBarsFrequency(self):
-        return str(self.__barsFreq)
+        return self.__barsFreq
 
     def getBestJob(self):
         return self.__bestJob
 
+    def getSearchStrategy(self):
+        return self.__search
+
+    def getResultStore(self):
+        return self.__resultStore
+
+    def getDataFingerprint(self):
+        return self.__dataFingerprint
+
     def getNextJob(self):
-        ret = None
-        params = []
+        """Returns the next job, None if there are no more jobs, or a job without parameters if the search strategy
+        is waiting for results."""
+        ret = self.__getRequeuedJob()
+        if ret is not None:
+            return ret
 
         # Get the next set of parameters.
-        params = self.__getNextParams()
+        params, barsFraction = self.__getNextParams()
 
         # Map the active job
         if len(params):
-            ret = Job(params)
+            ret = Job(params, barsFraction)
             with self.__activeJobsLock:
                 self.__activeJobs[ret.getId()] = ret
+        elif not self.__searchFinished() or self.__hasActiveJobs():
+            # Workers wait for the active jobs too, since they may be put back.
+            ret = Job([])
+
+        return ret
+
+    def __getRequeuedJob(self):
+        with self.__activeJobsLock:
+            while len(self.__requeuedJobs):
+                job = self.__requeuedJobs.popleft()
+                # The results may have been pushed after all.
+                if job.getId() in self.__activeJobs:
+                    return job
+        return None
+
+    def __hasActiveJobs(self):
+        with self.__activeJobsLock:
+            return len(self.__activeJobs) > 0
+
+    def requeueJobs(self, jobIds):
+        """Puts back active jobs given to a worker that lost its connection before pushing their results."""
+        with self.__activeJobsLock:
+            jobs = [self.__activeJobs[jobId] for jobId in jobIds if jobId in self.__activeJobs]
+            self.__requeuedJobs.extend(jobs)
+        for job in jobs:
+            self.getLogger().warning("Connection lost before results were pushed. Job %s put back" % job.getId())
 
-        return pickle.dumps(ret)
+    def __searchFinished(self):
+        with self.__parametersLock:
+            return self.__search is None or self.__search.isFinished()
 
     def jobsPending(self):
         if self.__forcedStop:
             return False
 
-        with self.__parametersLock:
-            jobsPending = self.__parametersIterator is not None
-        with self.__activeJobsLock:
-            activeJobs = len(self.__activeJobs) > 0
-        return jobsPending or activeJobs
-
-    def pushJobResults(self, jobId, result, parameters, workerName):
-        jobId = pickle.loads(jobId)
-        result = pickle.loads(result)
-        parameters = pickle.loads(parameters)
-        workerName = pickle.loads(workerName)
+        return not self.__searchFinished() or self.__hasActiveJobs()
 
+    def pushJobResults(self, jobId, results, workerName, elapsed=None):
         job = None
 
         # Get the active job and remove the mapping.
@@ -180,29 +370,85 @@ class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
                 # The job's results were already submitted.
                 return
 
-        # Save the job with the best result
-        if self.__bestJob is None or result > self.__bestJob.getBestResult():
-            job.setBestResult(result, parameters, workerName)
-            self.__bestJob = job
+        if self.__resultStore is not None:
+            self.__resultStore.addResults(self.__dataFingerprint, results, job.getBarsFraction())
+
+        with self.__parametersLock:
+            if elapsed is not None:
+                self.__updateSecondsPerParameters(job.getParameterCount(), job.getBarsFraction(), elapsed)
+            self.__search.addResults(results, job.getBarsFraction())
+            self.__resultsAvailable.notifyAll()
+
+        self.__addResults(job, results, workerName)
+
+    def __addResults(self, job, results, workerName):
+        parameters, result = results[0]
+        for jobParameters, jobResult in results[1:]:
+            if jobResult > result:
+                parameters, result = jobParameters, jobResult
+
+        with self.__resultsLock:
+            # Save the job with the best result. Results using only some of the bars can't be compared.
+            if job.getBarsFraction() == 1:
+                if self.__bestJob is None or result > self.__bestJob.getBestResult():
+                    job.setBestResult(result, parameters, workerName)
+                    self.__bestJob = job
+                for jobParameters, jobResult in results:
+                    self.__topResults.add(jobParameters, jobResult)
+            self.__newResultsEvent.emit(results, job.getBarsFraction(), workerName)
 
         self.getLogger().info("Partial result %s with parameters: %s from %s" % (result, parameters, workerName))
 
+    def getNewResultsEvent(self):
+        """Returns the event emitted with the results of every job, including the ones found in the result store.
+        Handlers are called, one at a time, with a list of (parameters, result) tuples, the fraction of the bars used
+        and the worker name, which is :data:`pyalgotrade.optimizer.store.STORE_WORKER_NAME` for stored results."""
+        return self.__newResultsEvent
+
+    def getTopResults(self):
+        """Returns a list of (parameters, result) tuples with the best results so far, the best one first."""
+        with self.__resultsLock:
+            return self.__topResults.getResults()
+
     def stop(self):
         self.shutdown()
 
-    def serve(self, barFeed, strategyParameters):
+    def serve(self, barFeed, strategyParameters, dataFingerprint=None):
+        """Provides bars and strategy parameters for workers to use until there are no more jobs.
+
+        :param barFeed: The bar feed that each worker will use to backtest the strategy, or None if workers get the
+            bars some other way.
+        :type barFeed: :class:`pyalgotrade.barfeed.BarFeed`.
+        :param strategyParameters: The parameters to use for backtesting. Either a
+            :class:`pyalgotrade.optimizer.search.SearchStrategy` or an iterable object where each element is a tuple
+            that holds parameter values.
+        :param dataFingerprint: Identifies the bars in the result store. If None, it is calculated from the bars.
+            Required to use a result store without a bar feed.
+        :type dataFingerprint: string.
+        :rtype: A :class:`Results` instance with the best results found.
+        """
         ret = None
         try:
             # Initialize instruments, bars and parameters.
-            self.getLogger().info("Loading bars")
-            loadedBars = []
-            for dateTime, bars in barFeed:
-                loadedBars.append(bars)
-            instruments = barFeed.getRegisteredInstruments()
-            self.__instrumentsAndBars = pickle.dumps((instruments, loadedBars))
-            self.__barsFreq = barFeed.getFrequency()
-
-            self.__parametersIterator = iter(strategyParameters)
+            # barFeed is None if workers get the bars some other way, like optimizer.local does with shared bars.
+            if barFeed is not None:
+                self.getLogger().info("Loading bars")
+                loadedBars = []
+                for dateTime, bars in barFeed:
+                    loadedBars.append(bars)
+                instruments = barFeed.getRegisteredInstruments()
+                self.__instrumentsAndBars = protocol.EncodedMessage((instruments, loadedBars))
+                self.__barsFreq = barFeed.getFrequency()
+                if self.__resultStore is not None and dataFingerprint is None:
+                    dataFingerprint = store.fingerprint_bars(instruments, loadedBars)
+            if self.__resultStore is not None and dataFingerprint is None:
+                raise Exception("A data fingerprint is required to use a result store without a bar feed")
+            self.__dataFingerprint = dataFingerprint
+
+            if isinstance(strategyParameters, search.SearchStrategy):
+                self.__search = strategyParameters
+            else:
+                self.__search = search.GridSearch(strategyParameters)
 
             if self.__autoStopThread:
                 self.__autoStopThread.start()
@@ -217,25 +463,34 @@ class Server(SimpleXMLRPCServer.SimpleXMLRPCServer):
             bestJob = self.getBestJob()
             if bestJob:
                 self.getLogger().info("Best final result %s with parameters: %s from client %s" % (bestJob.getBestResult(), bestJob.getBestParameters(), bestJob.getBestWorkerName()))
-                ret = Results(bestJob.getBestParameters(), bestJob.getBestResult())
+                ret = Results(bestJob.getBestParameters(), bestJob.getBestResult(), self.getTopResults())
             else:
                 self.getLogger().error("No jobs processed")
         finally:
             self.__forcedStop = True
+            self.server_close()
         return ret
 
 
-def serve(barFeed, strategyParameters, address, port):
+def serve(barFeed, strategyParameters, address, port, resultStore=None, resultLog=None):
     """Executes a server that will provide bars and strategy parameters for workers to use.
 
     :param barFeed: The bar feed that each worker will use to backtest the strategy.
     :type barFeed: :class:`pyalgotrade.barfeed.BarFeed`.
-    :param strategyParameters: The set of parameters to use for backtesting. An iterable object where **each element is a tuple that holds parameter values**.
+    :param strategyParameters: The set of parameters to use for backtesting. An iterable object where **each element is a tuple that holds parameter values**,
+        or a :class:`pyalgotrade.optimizer.search.SearchStrategy` to choose the parameters based on previous results.
     :param address: The address to listen for incoming worker connections.
     :type address: string.
     :param port: The port to listen for incoming worker connections.
     :type port: int.
+    :param resultStore: Where to save results, and look for results from previous executions before dispatching
+        parameters to workers, so that an interrupted execution can be resumed or a search extended.
+    :type resultStore: :class:`pyalgotrade.optimizer.store.ResultStore`.
+    :param resultLog: Where to write every result as it arrives.
+    :type resultLog: :class:`pyalgotrade.optimizer.store.ResultLog`.
     :rtype: A :class:`Results` instance with the best results found.
     """
-    s = Server(address, port)
+    s = Server(address, port, resultStore=resultStore)
+    if resultLog is not None:
+        s.getNewResultsEvent().subscribe(resultLog.addResults)
     return s.serve(barFeed, strategyParameters)
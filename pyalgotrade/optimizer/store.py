@@ -0,0 +1,261 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
+"""
+
+import csv
+import hashlib
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+
+from pyalgotrade.utils import dt
+
+# The worker name used for results found in a ResultStore instead of backtested.
+STORE_WORKER_NAME = "store"
+
+
+def get_strategy_name(strategyClass):
+    if isinstance(strategyClass, basestring):
+        return strategyClass
+    return "%s.%s" % (strategyClass.__module__, strategyClass.__name__)
+
+
+def get_parameters_key(parameters):
+    # repr is stable for the tuples of strings and numbers used as parameters, and easy to read in the database.
+    return repr(tuple(parameters))
+
+
+def fingerprint_bars(instruments, bars):
+    """Returns a string that identifies the instruments and bars used to backtest a strategy.
+
+    :param instruments: The instruments.
+    :param bars: A sequence of :class:`pyalgotrade.bar.Bars`, in order.
+    """
+    barStruct = struct.Struct("!q5d?d")
+    ret = hashlib.sha1()
+    for instrument in sorted(instruments):
+        ret.update("%s\n" % instrument)
+    for currentBars in bars:
+        ret.update(struct.pack("!q", dt.datetime_to_microseconds(currentBars.getDateTime())))
+        for instrument in sorted(currentBars.getInstruments()):
+            currentBar = currentBars[instrument]
+            adjClose = currentBar.getAdjClose()
+            ret.update("%s\n" % instrument)
+            ret.update(barStruct.pack(
+                currentBar.getFrequency(), currentBar.getOpen(), currentBar.getHigh(), currentBar.getLow(),
+                currentBar.getClose(), currentBar.getVolume(), adjClose is not None,
+                adjClose if adjClose is not None else 0
+            ))
+    return ret.hexdigest()
+
+
+class ResultStore(object):
+    """Keeps the results of backtesting a strategy in a SQLite database, so that the server doesn't dispatch the
+    same parameters again if it is restarted, or if a search is extended with new parameters.
+
+    Results are keyed by the strategy, a fingerprint of the bars, the parameters and the fraction of the bars used.
+
+    :param dbFilePath: The path to the database file. It is created if it doesn't exist.
+    :type dbFilePath: string.
+    :param strategyClass: The strategy class, or a name for it.
+
+    .. note::
+        Results are only valid for the same version of the strategy. Use a different name, or a different file,
+        if the strategy changes.
+    """
+
+    def __init__(self, dbFilePath, strategyClass):
+        self.__strategyName = get_strategy_name(strategyClass)
+        # The server uses the store from the threads that handle workers.
+        self.__lock = threading.Lock()
+        initialize = not os.path.exists(dbFilePath)
+        self.__connection = sqlite3.connect(dbFilePath, check_same_thread=False)
+        self.__connection.isolation_level = None  # To do auto-commit
+        if initialize:
+            self.createSchema()
+
+    def createSchema(self):
+        self.__connection.execute(
+            "create table result ("
+            "strategy text not null"
+            ", data text not null"
+            ", parameters text not null"
+            ", bars_fraction real not null"
+            ", value blob"
+            ", primary key (strategy, data, parameters, bars_fraction))")
+
+    def getStrategyName(self):
+        return self.__strategyName
+
+    def getResults(self, dataFingerprint, parametersList, barsFraction=1.0):
+        """Returns a list of (parameters, result) tuples with the parameters that were already backtested.
+
+        :param dataFingerprint: Identifies the bars. See :func:`fingerprint_bars`.
+        :type dataFingerprint: string.
+        :param parametersList: A list with sets of parameters.
+        :param barsFraction: The fraction of the bars used.
+        :type barsFraction: float.
+        """
+        ret = []
+        sql = "select value from result where strategy = ? and data = ? and parameters = ? and bars_fraction = ?"
+        with self.__lock:
+            for parameters in parametersList:
+                cursor = self.__connection.execute(
+                    sql, [self.__strategyName, dataFingerprint, get_parameters_key(parameters), barsFraction]
+                )
+                row = cursor.fetchone()
+                cursor.close()
+                if row is not None:
+                    ret.append((parameters, pickle.loads(str(row[0]))))
+        return ret
+
+    def addResults(self, dataFingerprint, results, barsFraction=1.0):
+        """Saves results.
+
+        :param dataFingerprint: Identifies the bars. See :func:`fingerprint_bars`.
+        :type dataFingerprint: string.
+        :param results: A list of (parameters, result) tuples.
+        :param barsFraction: The fraction of the bars used.
+        :type barsFraction: float.
+        """
+        sql = "insert or replace into result (strategy, data, parameters, bars_fraction, value) values (?, ?, ?, ?, ?)"
+        rows = [
+            (self.__strategyName, dataFingerprint, get_parameters_key(parameters), barsFraction,
+                sqlite3.Binary(pickle.dumps(result, pickle.HIGHEST_PROTOCOL)))
+            for parameters, result in results
+        ]
+        with self.__lock:
+            # All the results from a job in one transaction.
+            self.__connection.execute("begin")
+            try:
+                self.__connection.executemany(sql, rows)
+            except:
+                self.__connection.execute("rollback")
+                raise
+            self.__connection.execute("commit")
+
+    def getCount(self, dataFingerprint=None):
+        """Returns the number of results saved for the strategy, optionally only for some bars."""
+        sql = "select count(*) from result where strategy = ?"
+        args = [self.__strategyName]
+        if dataFingerprint is not None:
+            sql += " and data = ?"
+            args.append(dataFingerprint)
+        with self.__lock:
+            return self.__connection.execute(sql, args).fetchone()[0]
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+
+def parse_value(value):
+    if value == "":
+        return None
+    for valueType in (int, float):
+        try:
+            return valueType(value)
+        except ValueError:
+            pass
+    return value
+
+
+def format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        # str rounds to 12 significant digits.
+        return repr(value)
+    return value
+
+
+class ResultLog(object):
+    """Appends every result to a CSV file as it arrives, so that the whole parameter surface can be analyzed later
+    without backtesting again. There is a row for each set of parameters with a column for each parameter, followed
+    by bars_fraction, result and worker columns.
+
+    :param path: The path to the file. Results are appended if it already exists.
+    :type path: string.
+    :param parameterNames: Names for the parameter columns. If None, parameter_0, parameter_1, ... are used.
+    :type parameterNames: list.
+    :param logStoredResults: True to also write the results found in a :class:`ResultStore`. They are skipped by
+        default since resuming an execution with the same log would write them twice.
+    :type logStoredResults: boolean.
+
+    .. note::
+        Parameters and results should be strings or numbers. Use :func:`load_result_log` to read the file.
+    """
+
+    def __init__(self, path, parameterNames=None, logStoredResults=False):
+        writeHeader = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.__file = open(path, "ab")
+        self.__writer = csv.writer(self.__file)
+        self.__parameterNames = parameterNames
+        self.__writeHeader = writeHeader
+        self.__logStoredResults = logStoredResults
+        self.__lock = threading.Lock()
+
+    def addResults(self, results, barsFraction, workerName):
+        """Writes results. Can be subscribed to :meth:`pyalgotrade.optimizer.server.Server.getNewResultsEvent`.
+
+        :param results: A list of (parameters, result) tuples.
+        :param barsFraction: The fraction of the bars used.
+        :type barsFraction: float.
+        :param workerName: The name of the worker.
+        :type workerName: string.
+        """
+        if workerName == STORE_WORKER_NAME and not self.__logStoredResults:
+            return
+        with self.__lock:
+            if self.__writeHeader and len(results):
+                parameterNames = self.__parameterNames
+                if parameterNames is None:
+                    parameterNames = ["parameter_%d" % i for i in range(len(results[0][0]))]
+                self.__writer.writerow(list(parameterNames) + ["bars_fraction", "result", "worker"])
+                self.__writeHeader = False
+            for parameters, result in results:
+                row = [format_value(value) for value in parameters]
+                row.extend([format_value(barsFraction), format_value(result), workerName])
+                self.__writer.writerow(row)
+            # Everything written so far survives if the process dies.
+            self.__file.flush()
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+
+
+def load_result_log(path):
+    """Loads the results written by :class:`ResultLog`.
+
+    :param path: The path to the file.
+    :type path: string.
+    :rtype: A list of (parameters, barsFraction, result, workerName) tuples.
+    """
+    ret = []
+    with open(path, "rb") as f:
+        reader = csv.reader(f)
+        header = reader.next()
+        parameterCount = len(header) - 3
+        for row in reader:
+            parameters = tuple(parse_value(value) for value in row[:parameterCount])
+            ret.append((parameters, parse_value(row[parameterCount]), parse_value(row[parameterCount + 1]), row[parameterCount + 2]))
+    return ret
@@ -18,8 +18,6 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
-import xmlrpclib
-import pickle
 import time
 import socket
 import random
@@ -27,6 +25,8 @@ import multiprocessing
 
 import pyalgotrade.logger
 from pyalgotrade import barfeed
+from pyalgotrade.barfeed import sharedbf
+from pyalgotrade.optimizer import protocol
 
 
 def call_function(function, *args, **kwargs):
@@ -46,75 +46,153 @@ def call_and_retry_on_network_error(function, retryCount, *args, **kwargs):
     return ret
 
 
+def get_bar_count(count, barsFraction):
+    # The number of bars to use, but at least one.
+    return max(1, int(round(count * barsFraction)))
+
+
 class Worker(object):
-    def __init__(self, address, port, workerName=None):
-        url = "http://%s:%s/PyAlgoTradeRPC" % (address, port)
-        self.__server = xmlrpclib.ServerProxy(url, allow_none=True)
+    def __init__(self, address, port, workerName=None, sharedBars=None):
+        self.__address = address
+        self.__port = port
+        self.__socket = None
         self.__logger = pyalgotrade.logger.getLogger(workerName)
         if workerName is None:
             self.__workerName = socket.gethostname()
         else:
             self.__workerName = workerName
+        self.__sharedBars = sharedBars
+
+    def __connect(self):
+        ret = socket.create_connection((self.__address, self.__port))
+        protocol.configure_socket(ret)
+        return ret
+
+    def __getSocket(self):
+        if self.__socket is None:
+            self.__socket = self.__connect()
+        return self.__socket
+
+    def __dropSocket(self):
+        # Reconnect on the next request. The server puts back the jobs that were given on this connection.
+        if self.__socket is not None:
+            self.__socket.close()
+            self.__socket = None
+
+    def __sendRequest(self, functionName, *args):
+        # Returns the socket where the response will arrive.
+        try:
+            sock = self.__getSocket()
+            protocol.send_message(sock, (functionName, args))
+        except socket.error:
+            self.__dropSocket()
+            raise
+        return sock
+
+    def __recvResponse(self, sock):
+        try:
+            ret = protocol.recv_message(sock)
+        except socket.error:
+            self.__dropSocket()
+            raise
+        if isinstance(ret, protocol.RemoteError):
+            self.getLogger().error(str(ret))
+            raise ret
+        return ret
+
+    def __callOnce(self, functionName, *args):
+        return self.__recvResponse(self.__sendRequest(functionName, *args))
+
+    def __call(self, functionName, *args):
+        return call_and_retry_on_network_error(self.__callOnce, 10, functionName, *args)
+
+    def __requestNextJob(self):
+        # Requests the next job without waiting for it. Returns the socket where it will arrive, or None.
+        try:
+            return self.__sendRequest("getNextJob")
+        except socket.error:
+            return None
+
+    def __recvNextJob(self, sock):
+        if sock is not None and sock is self.__socket:
+            try:
+                return self.__recvResponse(sock)
+            except socket.error:
+                pass
+        # The connection was lost after requesting the job. The server puts it back, so request it again.
+        return self.getNextJob()
 
     def getLogger(self):
         return self.__logger
 
     def getInstrumentsAndBars(self):
-        ret = call_and_retry_on_network_error(self.__server.getInstrumentsAndBars, 10)
-        ret = pickle.loads(ret)
-        return ret
+        return self.__call("getInstrumentsAndBars")
 
     def getBarsFrequency(self):
-        ret = call_and_retry_on_network_error(self.__server.getBarsFrequency, 10)
-        ret = int(ret)
-        return ret
+        return self.__call("getBarsFrequency")
 
     def getNextJob(self):
-        ret = call_and_retry_on_network_error(self.__server.getNextJob, 10)
-        ret = pickle.loads(ret)
-        return ret
+        return self.__call("getNextJob")
+
+    def pushJobResults(self, jobId, results, elapsed=None):
+        # The server doesn't respond to this one, and ignores the results if they were already pushed.
+        call_and_retry_on_network_error(self.__sendRequest, 10, "pushJobResults", jobId, results, self.__workerName, elapsed)
 
-    def pushJobResults(self, jobId, result, parameters):
-        jobId = pickle.dumps(jobId)
-        result = pickle.dumps(result)
-        parameters = pickle.dumps(parameters)
-        workerName = pickle.dumps(self.__workerName)
-        call_and_retry_on_network_error(self.__server.pushJobResults, 10, jobId, result, parameters, workerName)
+    def close(self):
+        self.__dropSocket()
 
-    def __processJob(self, job, barsFreq, instruments, bars):
-        bestResult = None
+    def __processJob(self, job, buildFeed):
+        startTime = time.time()
+        results = []
+        barsFraction = job.getBarsFraction()
         parameters = job.getNextParameters()
-        bestParams = parameters
         while parameters is not None:
             # Wrap the bars into a feed.
-            feed = barfeed.OptimizerBarFeed(barsFreq, instruments, bars)
+            feed = buildFeed(barsFraction)
             # Run the strategy.
             self.getLogger().info("Running strategy with parameters %s" % (str(parameters)))
             result = self.runStrategy(feed, *parameters)
             self.getLogger().info("Result %s" % result)
-            if bestResult is None or result > bestResult:
-                bestResult = result
-                bestParams = parameters
+            results.append((parameters, result))
             # Run with the next set of parameters.
             parameters = job.getNextParameters()
 
-        assert(bestParams is not None)
-        self.pushJobResults(job.getId(), bestResult, bestParams)
+        assert(len(results))
+        self.pushJobResults(job.getId(), results, time.time() - startTime)
 
     # Run the strategy and return the result.
     def runStrategy(self, feed, parameters):
         raise Exception("Not implemented")
 
     def run(self):
-        # Get the instruments and bars.
-        instruments, bars = self.getInstrumentsAndBars()
-        barsFreq = self.getBarsFrequency()
-
-        # Process jobs
-        job = self.getNextJob()
-        while job is not None:
-            self.__processJob(job, barsFreq, instruments, bars)
+        if self.__sharedBars is not None:
+            # The bars are already mapped, building a feed only sets a cursor.
+            sharedBars = self.__sharedBars
+            buildFeed = lambda barsFraction: sharedbf.Feed(sharedBars, end=get_bar_count(len(sharedBars), barsFraction))
+        else:
+            # Get the instruments and bars.
+            instruments, bars = self.getInstrumentsAndBars()
+            barsFreq = self.getBarsFrequency()
+
+            def buildFeed(barsFraction):
+                if barsFraction < 1:
+                    return barfeed.OptimizerBarFeed(barsFreq, instruments, bars[:get_bar_count(len(bars), barsFraction)])
+                return barfeed.OptimizerBarFeed(barsFreq, instruments, bars)
+
+        try:
+            # Process jobs. The next job is requested before processing the current one, so the server prepares it
+            # while the strategy runs, and it is waiting in the socket once the current one is done.
             job = self.getNextJob()
+            while job is not None:
+                if job.getParameterCount() == 0:
+                    # The server is waiting for results to decide what to backtest next.
+                    job = self.getNextJob()
+                    continue
+                sock = self.__requestNextJob()
+                self.__processJob(job, buildFeed)
+                job = self.__recvNextJob(sock)
+        finally:
+            self.close()
 
 
 def worker_process(strategyClass, address, port, workerName):
@@ -21,9 +21,15 @@
 import talib
 import numpy
 
+from pyalgotrade import dataseries
+
 
 # Returns the last values of a dataseries as a numpy.array, or None if not enough values could be retrieved from the dataseries.
 def value_ds_to_numpy(ds, count):
+    # Numeric dataseries already hold a float64 array, so there is no need to build a new one.
+    if isinstance(ds, dataseries.NumericDataSeries):
+        return ds.asarray(count)
+
     ret = None
     try:
         values = ds[count*-1:]
@@ -47,6 +47,19 @@ class EventWindow(object):
         if value is not None or not self.__skipNone:
             self.__values.append(value)
 
+    def shareValues(self, sharedValues):
+        """Holds the values in the window as a view over values that are shared with other windows, instead of copying
+        them. Returns True if the window is empty and the values can be shared.
+
+        :param sharedValues: The shared values. Must be longer than the window.
+        :type sharedValues: :class:`pyalgotrade.utils.collections.SharedNumPyDeque`.
+        """
+        ret = False
+        if len(self.__values) == 0 and self.__values.data().dtype == sharedValues.data().dtype:
+            self.__values = collections.NumPyDequeView(sharedValues, self.__windowSize)
+            ret = True
+        return ret
+
     def getValues(self):
         """Returns a numpy.array with the values in the window."""
         return self.__values.data()
@@ -0,0 +1,186 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
+"""
+
+from pyalgotrade import dataseries
+from pyalgotrade import observer
+from pyalgotrade.dataseries import bards
+from pyalgotrade.utils import collections
+
+
+class IndicatorDataSeries(dataseries.DataSeries):
+    """A DataSeries with the values of an indicator in an :class:`IndicatorGraph`.
+
+    .. note::
+        Values are appended by the graph. The datetimes are the same for all the indicators in the graph, so they
+        are held only once.
+    """
+
+    def __init__(self, dateTimes, maxLen):
+        if not maxLen > 0:
+            raise Exception("Invalid maximum length")
+
+        self.__newValueEvent = observer.Event()
+        self.__values = collections.ListDeque(maxLen)
+        self.__dateTimes = dateTimes
+
+    def __len__(self):
+        return len(self.__values)
+
+    def __getitem__(self, key):
+        return self.__values[key]
+
+    def setMaxLen(self, maxLen):
+        """Sets the maximum number of values to hold and resizes accordingly if necessary."""
+        self.__values.resize(maxLen)
+        if self.__dateTimes.getMaxLen() < maxLen:
+            self.__dateTimes.resize(maxLen)
+
+    def getMaxLen(self):
+        """Returns the maximum number of values to hold."""
+        return self.__values.getMaxLen()
+
+    def getNewValueEvent(self):
+        return self.__newValueEvent
+
+    def getValueAbsolute(self, pos):
+        ret = None
+        if pos >= 0 and pos < len(self.__values):
+            ret = self.__values[pos]
+        return ret
+
+    def getDateTimes(self):
+        count = len(self.__values)
+        if count == 0:
+            return []
+        return self.__dateTimes.data()[-count:]
+
+    def _appendValue(self, dateTime, value):
+        self.__values.append(value)
+        if self.__newValueEvent.hasSubscribers():
+            self.__newValueEvent.emit(self, dateTime, value)
+
+
+class IndicatorGraph(object):
+    """Calculates several indicators over one :class:`pyalgotrade.dataseries.DataSeries` from a single event handler.
+
+    Every :class:`pyalgotrade.technical.EventBasedFilter` subscribes to the DataSeries being filtered and keeps a copy
+    of the values in its window. An IndicatorGraph subscribes once, feeds every :class:`pyalgotrade.technical.EventWindow`
+    in the order they were added, and windows over the same input share a single buffer of values. All the indicators
+    share the datetimes too. The indicators can also be calculated over the values of other indicators in the graph.
+
+    :param dataSeries: The DataSeries instance being filtered.
+    :type dataSeries: :class:`pyalgotrade.dataseries.DataSeries`.
+    :param dtype: The data-type of the values in dataSeries. Defaults to object for
+        :class:`pyalgotrade.dataseries.bards.BarDataSeries` and float for anything else.
+    :type dtype: data-type.
+
+    .. note::
+        Windows only share values if they hold the values being filtered as they are. Windows that hold something else,
+        like :class:`pyalgotrade.technical.atr.ATREventWindow`, or that have a different data-type, keep their own copy.
+    """
+
+    def __init__(self, dataSeries, dtype=None):
+        if dtype is None:
+            dtype = object if isinstance(dataSeries, bards.BarDataSeries) else float
+
+        self.__dataSeries = dataSeries
+        # Inputs are dataSeries followed by the output of every window.
+        self.__inputs = [dataSeries]
+        self.__dtypes = [dtype]
+        self.__sharedValues = [None]
+        self.__values = [None]
+        self.__dateTimes = collections.ListDeque(1)
+        # (input index, event window, output index)
+        self.__nodes = []
+        self.__dataSeries.getNewValueEvent().subscribe(self.__onNewValue)
+
+    def __getInputIndex(self, inputDataSeries):
+        for i, dataSeries in enumerate(self.__inputs):
+            if dataSeries is inputDataSeries:
+                return i
+        raise Exception("The input is not part of the graph")
+
+    def __shareValues(self, inputIndex, eventWindow):
+        # Keep one more value than the largest window so that windows can still see their previous values while the
+        # shared values are one value ahead.
+        maxLen = eventWindow.getWindowSize() + 1
+        sharedValues = self.__sharedValues[inputIndex]
+        if sharedValues is None:
+            sharedValues = collections.SharedNumPyDeque(maxLen, self.__dtypes[inputIndex])
+            self.__sharedValues[inputIndex] = sharedValues
+        elif sharedValues.getMaxLen() < maxLen:
+            sharedValues.resize(maxLen)
+        eventWindow.shareValues(sharedValues)
+
+    def add(self, eventWindow, inputDataSeries=None, maxLen=dataseries.DEFAULT_MAX_LEN):
+        """Adds an indicator to the graph and returns the DataSeries with its values.
+
+        :param eventWindow: The EventWindow instance to use to calculate new values. Must not have received any values.
+        :type eventWindow: :class:`pyalgotrade.technical.EventWindow`.
+        :param inputDataSeries: The values to filter. Either the DataSeries being filtered or a DataSeries returned by
+            a previous call to add. Defaults to the DataSeries being filtered.
+        :type inputDataSeries: :class:`pyalgotrade.dataseries.DataSeries`.
+        :param maxLen: The maximum number of values to hold.
+            Once a bounded length is full, when new items are added, a corresponding number of items are discarded from the opposite end.
+        :type maxLen: int.
+        :rtype: :class:`IndicatorDataSeries`.
+        """
+        if inputDataSeries is None:
+            inputIndex = 0
+        else:
+            inputIndex = self.__getInputIndex(inputDataSeries)
+        self.__shareValues(inputIndex, eventWindow)
+
+        ret = IndicatorDataSeries(self.__dateTimes, maxLen)
+        if self.__dateTimes.getMaxLen() < maxLen:
+            self.__dateTimes.resize(maxLen)
+        outputIndex = len(self.__inputs)
+        self.__inputs.append(ret)
+        self.__dtypes.append(float)
+        self.__sharedValues.append(None)
+        self.__values.append(None)
+        # Inputs are added before the windows that use them, so the order in which windows are added is a valid
+        # evaluation order.
+        self.__nodes.append((inputIndex, eventWindow, outputIndex))
+        return ret
+
+    def getDataSeries(self):
+        return self.__dataSeries
+
+    def getEventWindows(self):
+        return [eventWindow for _, eventWindow, _ in self.__nodes]
+
+    def __onNewValue(self, dataSeries, dateTime, value):
+        values = self.__values
+        sharedValues = self.__sharedValues
+        inputs = self.__inputs
+
+        self.__dateTimes.append(dateTime)
+        values[0] = value
+        if value is not None and sharedValues[0] is not None:
+            sharedValues[0].append(value)
+
+        for inputIndex, eventWindow, outputIndex in self.__nodes:
+            eventWindow.onNewValue(dateTime, values[inputIndex])
+            newValue = eventWindow.getValue()
+            values[outputIndex] = newValue
+            if newValue is not None and sharedValues[outputIndex] is not None:
+                sharedValues[outputIndex].append(newValue)
+            inputs[outputIndex]._appendValue(dateTime, newValue)
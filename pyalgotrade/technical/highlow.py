@@ -20,21 +20,23 @@
 
 from pyalgotrade import technical
 from pyalgotrade import dataseries
+from pyalgotrade.utils import collections
 
 
 class HighLowEventWindow(technical.EventWindow):
     def __init__(self, windowSize, useMin):
         technical.EventWindow.__init__(self, windowSize)
-        self.__useMin = useMin
+        self.__extremum = collections.MonotonicDeque(windowSize, useMin)
+
+    def onNewValue(self, dateTime, value):
+        technical.EventWindow.onNewValue(self, dateTime, value)
+        if value is not None:
+            self.__extremum.append(value)
 
     def getValue(self):
         ret = None
         if self.windowFull():
-            values = self.getValues()
-            if self.__useMin:
-                ret = values.min()
-            else:
-                ret = values.max()
+            ret = self.__extremum.getValue()
         return ret
 
 
@@ -24,42 +24,82 @@ from pyalgotrade import technical
 from pyalgotrade import dataseries
 
 
-# Code Tom Starke for the Hurst Exponent.
+# Based on Tom Starke's code for the Hurst Exponent.
+# The standard deviations of the differences for all the lags are calculated in one pass. Row k of a strided view over
+# the values is p[minLags + k:], so subtracting p from it gives the differences for every lag at once. Rows are padded
+# to the same length, and the padding is masked out. The linear fit to the double-log graph uses a precomputed design.
+# All the buffers are allocated once, so a HurstCalculator should be reused for windows of the same size.
+class HurstCalculator(object):
+    def __init__(self, size, minLags, maxLags):
+        assert minLags >= 1, "minLags must be >= 1"
+        assert maxLags > minLags, "maxLags must be > minLags"
+        assert size > maxLags - 1, "size must be >= maxLags"
+
+        self.__size = size
+        self.__minLags = minLags
+        lags = np.arange(minLags, maxLags)
+        # Values followed by padding, so every row of the strided view has the same length.
+        self.__values = np.zeros(size + maxLags)
+        rowSize = size - minLags
+        itemSize = self.__values.strides[0]
+        self.__shifted = np.lib.stride_tricks.as_strided(
+            self.__values[minLags:], shape=(len(lags), rowSize), strides=(itemSize, itemSize)
+        )
+        self.__diffs = np.empty((len(lags), rowSize))
+        self.__mask = (np.arange(rowSize) < (size - lags)[:, np.newaxis]).astype(float)
+        self.__counts = (size - lags).astype(float)
+        logLags = np.log10(lags)
+        self.__centeredLogLags = logLags - logLags.mean()
+        self.__logLagsSS = np.dot(self.__centeredLogLags, self.__centeredLogLags)
+
+    def calculate(self, p):
+        assert len(p) == self.__size
+        values = self.__values
+        diffs = self.__diffs
+        mask = self.__mask
+
+        values[:self.__size] = p
+        np.subtract(self.__shifted, values[:self.__size - self.__minLags], out=diffs)
+        diffs *= mask
+        means = diffs.sum(axis=1) / self.__counts
+        diffs -= means[:, np.newaxis]
+        diffs *= mask
+        variances = np.einsum("ij,ij->i", diffs, diffs) / self.__counts
+        # tau is the square root of the standard deviation, so log10(tau) = log10(variance) / 4.
+        logTau = np.log10(variances) / 4
+        # Fit a line to the double-log graph (gives power) and the hurst exponent is twice the slope.
+        slope = np.dot(self.__centeredLogLags, logTau) / self.__logLagsSS
+        return slope * 2
+
+
 def hurst_exp(p, minLags, maxLags):
-    tau = []
-    lagvec = []
-
-    #  Step through the different lags
-    for lag in range(minLags, maxLags):
-        #  produce price difference with lag
-        pp = np.subtract(p[lag:], p[:-lag])
-        #  Write the different lags into a vector
-        lagvec.append(lag)
-        #  Calculate the variance of the differnce vector
-        tau.append(np.sqrt(np.std(pp)))
-    # linear fit to double-log graph (gives power)
-    m = np.polyfit(np.log10(lagvec), np.log10(tau), 1)
-    # calculate hurst
-    hurst = m[0]*2
-    return hurst
+    return HurstCalculator(len(p), minLags, maxLags).calculate(p)
 
 
 class HurstExponentEventWindow(technical.EventWindow):
-    def __init__(self, period, minLags, maxLags, logValues=True):
+    def __init__(self, period, minLags, maxLags, logValues=True, recomputePeriod=1):
+        assert recomputePeriod > 0, "recomputePeriod must be > 0"
         technical.EventWindow.__init__(self, period)
-        self.__minLags = minLags
-        self.__maxLags = maxLags
+        self.__calculator = HurstCalculator(period, minLags, maxLags)
         self.__logValues = logValues
+        self.__recomputePeriod = recomputePeriod
+        self.__pendingValues = 0
+        self.__value = None
 
     def onNewValue(self, dateTime, value):
         if value is not None and self.__logValues:
             value = np.log10(value)
         technical.EventWindow.onNewValue(self, dateTime, value)
+        if value is not None and self.windowFull():
+            self.__pendingValues += 1
 
     def getValue(self):
         ret = None
         if self.windowFull():
-            ret = hurst_exp(self.getValues(), self.__minLags, self.__maxLags)
+            if self.__value is None or self.__pendingValues >= self.__recomputePeriod:
+                self.__value = self.__calculator.calculate(self.getValues())
+                self.__pendingValues = 0
+            ret = self.__value
         return ret
 
 
@@ -78,9 +118,13 @@ class HurstExponent(technical.EventBasedFilter):
         Once a bounded length is full, when new items are added, a corresponding number of items are discarded
         from the opposite end.
     :type maxLen: int.
+    :param recomputePeriod: The number of values after which the hurst exponent is recalculated. The last value is
+        repeated in between. Defaults to 1, that recalculates it on every value.
+    :type recomputePeriod: int.
     """
 
-    def __init__(self, dataSeries, period, minLags=2, maxLags=20, logValues=True, maxLen=dataseries.DEFAULT_MAX_LEN):
+    def __init__(self, dataSeries, period, minLags=2, maxLags=20, logValues=True, maxLen=dataseries.DEFAULT_MAX_LEN,
+                 recomputePeriod=1):
         assert period > 0, "period must be > 0"
         assert minLags >= 2, "minLags must be >= 2"
         assert maxLags > minLags, "maxLags must be > minLags"
@@ -88,6 +132,6 @@ class HurstExponent(technical.EventBasedFilter):
         technical.EventBasedFilter.__init__(
             self,
             dataSeries,
-            HurstExponentEventWindow(period, minLags, maxLags, logValues),
+            HurstExponentEventWindow(period, minLags, maxLags, logValues, recomputePeriod),
             maxLen
         )
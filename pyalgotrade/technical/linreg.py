@@ -24,37 +24,135 @@ from pyalgotrade.utils import collections
 from pyalgotrade.utils import dt
 
 import numpy as np
-from scipy import stats
 
 
 # Using scipy.stats.linregress instead of numpy.linalg.lstsq because of this:
 # http://stackoverflow.com/questions/20736255/numpy-linalg-lstsq-with-big-values
 def lsreg(x, y):
+    # Importing scipy takes a while and it is only needed for the exact calculation.
+    from scipy import stats
+
     x = np.asarray(x)
     y = np.asarray(y)
     res = stats.linregress(x, y)
     return res[0], res[1]
 
 
+# Keeps the means of x and y, the sum of squared differences from the mean of x (Mxx) and the sum of the products of
+# the differences from the means (Cxy) up to date in O(1) as points are added and removed, like Welford's algorithm
+# does for the variance. The slope is Cxy / Mxx.
+# Working with differences from the means, instead of sums like sum(x * x), avoids the loss of precision with big x
+# values like timestamps.
+class RunningLeastSquares(object):
+    def __init__(self):
+        self.__count = 0
+        self.__meanX = 0.0
+        self.__meanY = 0.0
+        self.__mxx = 0.0
+        self.__cxy = 0.0
+
+    def __len__(self):
+        return self.__count
+
+    def add(self, x, y):
+        self.__count += 1
+        deltaX = x - self.__meanX
+        self.__meanX += deltaX / self.__count
+        self.__meanY += (y - self.__meanY) / self.__count
+        self.__mxx += deltaX * (x - self.__meanX)
+        self.__cxy += deltaX * (y - self.__meanY)
+
+    def remove(self, x, y):
+        """Removes a point. Returns False if most of the precision was lost and the regression should be resynced."""
+        assert(self.__count > 0)
+        self.__count -= 1
+        if self.__count == 0:
+            self.__meanX = self.__meanY = self.__mxx = self.__cxy = 0.0
+            return True
+
+        # The reverse of add: the means before the point was removed are the means after it was added.
+        meanX = self.__meanX
+        meanY = self.__meanY
+        mxx = self.__mxx
+        self.__meanX -= (x - meanX) / self.__count
+        self.__meanY -= (y - meanY) / self.__count
+        deltaX = x - self.__meanX
+        self.__mxx -= deltaX * (x - meanX)
+        self.__cxy -= deltaX * (y - meanY)
+        # Rounding errors are relative to the previous Mxx, so if it shrinks by orders of magnitude, like when the
+        # points left are a lot closer to each other than the one removed, there is not much precision left.
+        return self.__mxx > mxx * 1e-6
+
+    def resync(self, x, y):
+        # Keep them as python floats, arithmetic on numpy scalars is a lot slower.
+        self.__count = len(x)
+        self.__meanX = float(x.mean())
+        deltaX = x - self.__meanX
+        self.__mxx = float((deltaX ** 2).sum())
+        if y.min() == y.max():
+            # The mean of equal values may be off by a rounding error, and then the slope would not be 0.
+            self.__meanY = float(y[0])
+            self.__cxy = 0.0
+        else:
+            self.__meanY = float(y.mean())
+            self.__cxy = float((deltaX * (y - self.__meanY)).sum())
+
+    def getSlope(self):
+        return self.__cxy / self.__mxx
+
+    def getValueAt(self, x):
+        # Relative to the mean of x to keep the precision with big x values.
+        return self.__meanY + self.getSlope() * (x - self.__meanX)
+
+
+# Unless exact is True, the regression is kept up to date with RunningLeastSquares and recomputed from the values in
+# the window every resyncPeriod updates (every windowSize updates by default) to discard rounding errors.
 class LeastSquaresRegressionWindow(technical.EventWindow):
-    def __init__(self, windowSize):
+    def __init__(self, windowSize, exact=False, resyncPeriod=None):
         assert(windowSize > 1)
+        assert(resyncPeriod is None or resyncPeriod > 0)
         technical.EventWindow.__init__(self, windowSize)
         self.__timestamps = collections.NumPyDeque(windowSize)
+        self.__exact = exact
+        self.__resyncPeriod = resyncPeriod if resyncPeriod is not None else windowSize
+        self.__updates = 0
+        self.__regression = RunningLeastSquares()
 
     def onNewValue(self, dateTime, value):
+        if value is None:
+            return
+
+        oldTimestamp = oldValue = None
+        if self.windowFull():
+            oldTimestamp = float(self.__timestamps[0])
+            oldValue = float(self.getValues()[0])
+
         technical.EventWindow.onNewValue(self, dateTime, value)
-        if value is not None:
-            timestamp = dt.datetime_to_timestamp(dateTime)
-            if len(self.__timestamps):
-                assert(timestamp > self.__timestamps[-1])
-            self.__timestamps.append(timestamp)
+        timestamp = dt.datetime_to_timestamp(dateTime)
+        if len(self.__timestamps):
+            assert(timestamp > self.__timestamps[-1])
+        self.__timestamps.append(timestamp)
+        if self.__exact:
+            return
+
+        self.__updates += 1
+        precise = True
+        if oldTimestamp is not None:
+            precise = self.__regression.remove(oldTimestamp, oldValue)
+        if not precise or (self.__updates >= self.__resyncPeriod and self.windowFull()):
+            self.__regression.resync(self.__timestamps.data(), self.getValues())
+            self.__updates = 0
+        else:
+            self.__regression.add(timestamp, float(value))
 
     def __getValueAtImpl(self, timestamp):
         ret = None
         if self.windowFull():
-            a, b = lsreg(self.__timestamps.data(), self.getValues())
-            ret = a * timestamp + b
+            if self.__exact:
+                a, b = lsreg(self.__timestamps.data(), self.getValues())
+                ret = a * timestamp + b
+            else:
+                ret = self.__regression.getValueAt(timestamp)
         return ret
 
     def getTimeStamps(self):
@@ -80,9 +178,15 @@ class LeastSquaresRegression(technical.EventBasedFilter):
     :param maxLen: The maximum number of values to hold.
         Once a bounded length is full, when new items are added, a corresponding number of items are discarded from the opposite end.
     :type maxLen: int.
+    :param exact: True to calculate the regression over the whole window with scipy on every value, instead of keeping
+        it up to date as values are added and removed.
+    :type exact: boolean.
+    :param resyncPeriod: The number of values after which the running regression is recalculated from scratch to
+        discard rounding errors. Defaults to windowSize.
+    :type resyncPeriod: int.
     """
-    def __init__(self, dataSeries, windowSize, maxLen=dataseries.DEFAULT_MAX_LEN):
-        technical.EventBasedFilter.__init__(self, dataSeries, LeastSquaresRegressionWindow(windowSize), maxLen)
+    def __init__(self, dataSeries, windowSize, maxLen=dataseries.DEFAULT_MAX_LEN, exact=False, resyncPeriod=None):
+        technical.EventBasedFilter.__init__(self, dataSeries, LeastSquaresRegressionWindow(windowSize, exact, resyncPeriod), maxLen)
 
     def getValueAt(self, dateTime):
         """Calculates the value at a given time based on the regression line.
@@ -94,16 +198,70 @@ class LeastSquaresRegression(technical.EventBasedFilter):
         return self.getEventWindow().getValueAt(dateTime)
 
 
+# Once the window is full the x values are always 0..n-1, so sum(y) and sum(x * y) are enough to get the slope:
+#
+# slope = (sum(x * y) - mean(x) * sum(y)) / sum((x - mean(x)) ** 2)
+#
+# When the oldest value is dropped every x decreases by one, so sum(x * y) decreases by sum(y) - oldest, and the new
+# value is added with x = n - 1. That is O(1) per value and exact for integer values. Rounding errors with other values
+# are discarded by recomputing the sums from the window every resyncPeriod updates (every windowSize by default).
+# Those rounding errors never cancel out on a flat window, where the slope has to be exactly 0 for Trend to return None,
+# so the number of trailing values that are equal is kept as well.
 class SlopeEventWindow(technical.EventWindow):
-    def __init__(self, windowSize):
+    def __init__(self, windowSize, exact=False, resyncPeriod=None):
+        assert(resyncPeriod is None or resyncPeriod > 0)
         technical.EventWindow.__init__(self, windowSize)
         self.__x = np.asarray(range(windowSize))
+        self.__exact = exact
+        self.__resyncPeriod = resyncPeriod if resyncPeriod is not None else windowSize
+        self.__updates = 0
+        self.__meanX = (windowSize - 1) / 2.0
+        self.__mxx = float(((self.__x - self.__meanX) ** 2).sum())
+        self.__sumY = 0.0
+        self.__sumXY = 0.0
+        self.__lastValue = None
+        self.__equalCount = 0
+
+    def onNewValue(self, dateTime, value):
+        if value is None:
+            return
+
+        oldValue = None
+        if self.windowFull():
+            oldValue = float(self.getValues()[0])
+
+        technical.EventWindow.onNewValue(self, dateTime, value)
+        if self.__exact:
+            return
+
+        if value == self.__lastValue:
+            self.__equalCount += 1
+        else:
+            self.__lastValue = value
+            self.__equalCount = 1
+        if not self.windowFull():
+            return
+
+        self.__updates += 1
+        if oldValue is None or self.__updates >= self.__resyncPeriod:
+            values = self.getValues()
+            self.__sumY = float(values.sum())
+            self.__sumXY = float((self.__x * values).sum())
+            self.__updates = 0
+        else:
+            value = float(value)
+            self.__sumXY += (self.getWindowSize() - 1) * value - (self.__sumY - oldValue)
+            self.__sumY += value - oldValue
 
     def getValue(self):
         ret = None
         if self.windowFull():
-            y = self.getValues()
-            ret = lsreg(self.__x, y)[0]
+            if self.__exact:
+                ret = lsreg(self.__x, self.getValues())[0]
+            elif self.__equalCount >= self.getWindowSize():
+                ret = 0.0
+            else:
+                ret = (self.__sumXY - self.__meanX * self.__sumY) / self.__mxx
         return ret
 
 
@@ -117,21 +275,27 @@ class Slope(technical.EventBasedFilter):
     :param maxLen: The maximum number of values to hold.
         Once a bounded length is full, when new items are added, a corresponding number of items are discarded from the opposite end.
     :type maxLen: int.
+    :param exact: True to calculate the slope over the whole window with scipy on every value, instead of keeping it up
+        to date as values are added and removed.
+    :type exact: boolean.
+    :param resyncPeriod: The number of values after which the running regression is recalculated from scratch to
+        discard rounding errors. Defaults to period.
+    :type resyncPeriod: int.
 
     .. note::
         This filter ignores the time elapsed between the different values.
     """
 
-    def __init__(self, dataSeries, period, maxLen=dataseries.DEFAULT_MAX_LEN):
-        technical.EventBasedFilter.__init__(self, dataSeries, SlopeEventWindow(period), maxLen)
+    def __init__(self, dataSeries, period, maxLen=dataseries.DEFAULT_MAX_LEN, exact=False, resyncPeriod=None):
+        technical.EventBasedFilter.__init__(self, dataSeries, SlopeEventWindow(period, exact, resyncPeriod), maxLen)
 
 
 class TrendEventWindow(SlopeEventWindow):
-    def __init__(self, windowSize, positiveThreshold, negativeThreshold):
+    def __init__(self, windowSize, positiveThreshold, negativeThreshold, exact=False, resyncPeriod=None):
         if negativeThreshold > positiveThreshold:
             raise Exception("Invalid thresholds")
 
-        SlopeEventWindow.__init__(self, windowSize)
+        SlopeEventWindow.__init__(self, windowSize, exact, resyncPeriod)
         self.__positiveThreshold = positiveThreshold
         self.__negativeThreshold = negativeThreshold
 
@@ -148,5 +312,5 @@ class TrendEventWindow(SlopeEventWindow):
 
 
 class Trend(technical.EventBasedFilter):
-    def __init__(self, dataSeries, trendDays, positiveThreshold=0, negativeThreshold=0, maxLen=dataseries.DEFAULT_MAX_LEN):
-        technical.EventBasedFilter.__init__(self, dataSeries, TrendEventWindow(trendDays, positiveThreshold, negativeThreshold), maxLen)
+    def __init__(self, dataSeries, trendDays, positiveThreshold=0, negativeThreshold=0, maxLen=dataseries.DEFAULT_MAX_LEN, exact=False, resyncPeriod=None):
+        technical.EventBasedFilter.__init__(self, dataSeries, TrendEventWindow(trendDays, positiveThreshold, negativeThreshold, exact, resyncPeriod), maxLen)
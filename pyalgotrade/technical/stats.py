@@ -18,20 +18,116 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import math
+
+import numpy as np
+
 from pyalgotrade import technical
 from pyalgotrade import dataseries
 
 
-class StdDevEventWindow(technical.EventWindow):
-    def __init__(self, period, ddof):
+# Keeps the mean and the sum of squared differences from the mean (M2) of the values in the window up to date in O(1).
+# Welford's algorithm is used while the window fills up, and once it is full it is extended to replace the oldest
+# value with the new one:
+#
+# mean1 = mean0 + (new - old) / n
+# M2_1 = M2_0 + (new - old) * (new - mean1 + old - mean0)
+#
+# Rounding errors accumulate with every update, so the mean and M2 are recomputed from the values in the window every
+# resyncPeriod updates (every period updates by default). That costs O(period) but only once every resyncPeriod updates.
+class MomentsEventWindow(technical.EventWindow):
+    def __init__(self, period, ddof=0, resyncPeriod=None):
         assert(period > 0)
+        assert(resyncPeriod is None or resyncPeriod > 0)
         technical.EventWindow.__init__(self, period)
         self.__ddof = ddof
+        self.__resyncPeriod = resyncPeriod if resyncPeriod is not None else period
+        self.__updates = 0
+        self.__mean = 0.0
+        self.__m2 = 0.0
 
+    def onNewValue(self, dateTime, value):
+        if value is None:
+            return
+
+        oldValue = None
+        if self.windowFull():
+            oldValue = float(self.getValues()[0])
+
+        technical.EventWindow.onNewValue(self, dateTime, value)
+        value = float(value)
+
+        self.__updates += 1
+        if self.__updates >= self.__resyncPeriod and self.windowFull():
+            self.__resync()
+        elif oldValue is None:
+            count = len(self.getValues())
+            delta = value - self.__mean
+            self.__mean += delta / count
+            self.__m2 += delta * (value - self.__mean)
+        else:
+            mean = self.__mean
+            self.__mean = mean + (value - oldValue) / self.getWindowSize()
+            self.__m2 += (value - oldValue) * (value - self.__mean + oldValue - mean)
+            # The values are rounded, but M2 can't really be negative.
+            if self.__m2 < 0:
+                self.__m2 = 0.0
+
+    def __resync(self):
+        values = self.getValues()
+        # Keep them as python floats, arithmetic on numpy scalars is a lot slower.
+        self.__mean = float(values.mean())
+        self.__m2 = float(((values - self.__mean) ** 2).sum())
+        self.__updates = 0
+
+    def getMean(self):
+        return self.__mean
+
+    def getVariance(self):
+        count = self.getWindowSize() - self.__ddof
+        if count <= 0:
+            # Like numpy.var if there are not more values than delta degrees of freedom.
+            return np.float64(self.__m2) / count
+        return self.__m2 / count
+
+    def getStdDev(self):
+        return math.sqrt(self.getVariance())
+
+
+class VarianceEventWindow(MomentsEventWindow):
     def getValue(self):
         ret = None
         if self.windowFull():
-            ret = self.getValues().std(ddof=self.__ddof)
+            ret = self.getVariance()
+        return ret
+
+
+class Variance(technical.EventBasedFilter):
+    """Variance filter.
+
+    :param dataSeries: The DataSeries instance being filtered.
+    :type dataSeries: :class:`pyalgotrade.dataseries.DataSeries`.
+    :param period: The number of values to use to calculate the variance.
+    :type period: int.
+    :param ddof: Delta degrees of freedom.
+    :type ddof: int.
+    :param maxLen: The maximum number of values to hold.
+        Once a bounded length is full, when new items are added, a corresponding number of items are discarded from the opposite end.
+    :type maxLen: int.
+    :param resyncPeriod: The number of values after which the running moments are recalculated from scratch to discard
+        rounding errors. Defaults to period.
+    :type resyncPeriod: int.
+    """
+
+    def __init__(self, dataSeries, period, ddof=0, maxLen=dataseries.DEFAULT_MAX_LEN, resyncPeriod=None):
+        technical.EventBasedFilter.__init__(self, dataSeries, VarianceEventWindow(period, ddof, resyncPeriod), maxLen)
+
+
+class StdDevEventWindow(MomentsEventWindow):
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            ret = self.getStdDev()
         return ret
 
 
@@ -47,26 +143,25 @@ class StdDev(technical.EventBasedFilter):
     :param maxLen: The maximum number of values to hold.
         Once a bounded length is full, when new items are added, a corresponding number of items are discarded from the opposite end.
     :type maxLen: int.
+    :param resyncPeriod: The number of values after which the running moments are recalculated from scratch to discard
+        rounding errors. Defaults to period.
+    :type resyncPeriod: int.
     """
 
-    def __init__(self, dataSeries, period, ddof=0, maxLen=dataseries.DEFAULT_MAX_LEN):
-        technical.EventBasedFilter.__init__(self, dataSeries, StdDevEventWindow(period, ddof), maxLen)
+    def __init__(self, dataSeries, period, ddof=0, maxLen=dataseries.DEFAULT_MAX_LEN, resyncPeriod=None):
+        technical.EventBasedFilter.__init__(self, dataSeries, StdDevEventWindow(period, ddof, resyncPeriod), maxLen)
 
 
-class ZScoreEventWindow(technical.EventWindow):
-    def __init__(self, period, ddof):
+class ZScoreEventWindow(MomentsEventWindow):
+    def __init__(self, period, ddof, resyncPeriod=None):
         assert(period > 1)
-        technical.EventWindow.__init__(self, period)
-        self.__ddof = ddof
+        MomentsEventWindow.__init__(self, period, ddof, resyncPeriod)
 
     def getValue(self):
         ret = None
         if self.windowFull():
-            values = self.getValues()
-            lastValue = values[-1]
-            mean = values.mean()
-            std = values.std(ddof=self.__ddof)
-            ret = (lastValue - mean) / float(std)
+            lastValue = self.getValues()[-1]
+            ret = (lastValue - self.getMean()) / self.getStdDev()
         return ret
 
 
@@ -82,7 +177,10 @@ class ZScore(technical.EventBasedFilter):
     :param maxLen: The maximum number of values to hold.
         Once a bounded length is full, when new items are added, a corresponding number of items are discarded from the opposite end.
     :type maxLen: int.
+    :param resyncPeriod: The number of values after which the running moments are recalculated from scratch to discard
+        rounding errors. Defaults to period.
+    :type resyncPeriod: int.
     """
 
-    def __init__(self, dataSeries, period, ddof=0, maxLen=dataseries.DEFAULT_MAX_LEN):
-        technical.EventBasedFilter.__init__(self, dataSeries, ZScoreEventWindow(period, ddof), maxLen)
+    def __init__(self, dataSeries, period, ddof=0, maxLen=dataseries.DEFAULT_MAX_LEN, resyncPeriod=None):
+        technical.EventBasedFilter.__init__(self, dataSeries, ZScoreEventWindow(period, ddof, resyncPeriod), maxLen)
@@ -22,6 +22,7 @@ from pyalgotrade import technical
 from pyalgotrade import dataseries
 from pyalgotrade.dataseries import bards
 from pyalgotrade.technical import ma
+from pyalgotrade.utils import collections
 
 
 class BarWrapper(object):
@@ -38,27 +39,25 @@ class BarWrapper(object):
         return bar_.getClose(self.__useAdjusted)
 
 
-def get_low_high_values(barWrapper, bars):
-    currBar = bars[0]
-    lowestLow = barWrapper.getLow(currBar)
-    highestHigh = barWrapper.getHigh(currBar)
-    for i in range(len(bars)):
-        currBar = bars[i]
-        lowestLow = min(lowestLow, barWrapper.getLow(currBar))
-        highestHigh = max(highestHigh, barWrapper.getHigh(currBar))
-    return (lowestLow, highestHigh)
-
-
 class SOEventWindow(technical.EventWindow):
     def __init__(self, period, useAdjustedValues):
         assert(period > 1)
         technical.EventWindow.__init__(self, period, dtype=object)
         self.__barWrapper = BarWrapper(useAdjustedValues)
+        self.__lowestLow = collections.MonotonicDeque(period, True)
+        self.__highestHigh = collections.MonotonicDeque(period, False)
+
+    def onNewValue(self, dateTime, value):
+        technical.EventWindow.onNewValue(self, dateTime, value)
+        if value is not None:
+            self.__lowestLow.append(self.__barWrapper.getLow(value))
+            self.__highestHigh.append(self.__barWrapper.getHigh(value))
 
     def getValue(self):
         ret = None
         if self.windowFull():
-            lowestLow, highestHigh = get_low_high_values(self.__barWrapper, self.getValues())
+            lowestLow = self.__lowestLow.getValue()
+            highestHigh = self.__highestHigh.getValue()
             currentClose = self.__barWrapper.getClose(self.getValues()[-1])
             ret = (currentClose - lowestLow) / float(highestHigh - lowestLow) * 100
         return ret
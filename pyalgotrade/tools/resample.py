@@ -70,11 +70,14 @@ def resample_impl(barFeed, frequency, csvFile):
     resampledDS = resampled.ResampledBarDataSeries(insrumentDS, frequency)
     resampledDS.getNewValueEvent().subscribe(on_bar)
 
-    # Process all bars.
-    disp = dispatcher.Dispatcher()
-    disp.addSubject(barFeed)
-    disp.run()
-    resampledDS.pushLast()
+    try:
+        # Process all bars.
+        disp = dispatcher.Dispatcher()
+        disp.addSubject(barFeed)
+        disp.run()
+        resampledDS.pushLast()
+    finally:
+        csvWriter.close()
 
 
 def resample_to_csv(barFeed, frequency, csvFile):
@@ -57,63 +57,261 @@ def intersect(values1, values2, skipNone=False):
 
 
 # Like a collections.deque but using a numpy.array.
+# Values are kept in a circular buffer of twice the maximum length where every value is written twice, at pos and at
+# pos + maxLen. Appending is O(1) and the last maxLen values are always available as a contiguous slice, so data()
+# returns a view without shifting or copying.
 class NumPyDeque(object):
     def __init__(self, maxLen, dtype=float):
         assert maxLen > 0, "Invalid maximum length"
 
-        self.__values = np.empty(maxLen, dtype=dtype)
+        self.__values = np.empty(maxLen * 2, dtype=dtype)
         self.__maxLen = maxLen
         self.__nextPos = 0
+        self.__len = 0
 
     def getMaxLen(self):
         return self.__maxLen
 
     def append(self, value):
-        if self.__nextPos < self.__maxLen:
-            self.__values[self.__nextPos] = value
-            self.__nextPos += 1
-        else:
-            # Shift items to the left and put the last value.
-            # I'm not using np.roll to avoid creating a new array.
-            self.__values[0:-1] = self.__values[1:]
-            self.__values[self.__nextPos - 1] = value
+        nextPos = self.__nextPos
+        self.__values[nextPos] = value
+        self.__values[nextPos + self.__maxLen] = value
+        nextPos += 1
+        self.__nextPos = 0 if nextPos == self.__maxLen else nextPos
+        if self.__len < self.__maxLen:
+            self.__len += 1
 
     def data(self):
-        # If all values are not initialized, return a portion of the array.
-        if self.__nextPos < self.__maxLen:
-            ret = self.__values[0:self.__nextPos]
-        else:
-            ret = self.__values
-        return ret
+        start = self.__nextPos - self.__len
+        if start < 0:
+            start += self.__maxLen
+        return self.__values[start:start + self.__len]
 
     def resize(self, maxLen):
         assert maxLen > 0, "Invalid maximum length"
 
         # Create empty, copy last values and swap.
-        values = np.empty(maxLen, dtype=self.__values.dtype)
-        lastValues = self.__values[0:self.__nextPos]
-        values[0:min(maxLen, len(lastValues))] = lastValues[-1*min(maxLen, len(lastValues)):]
+        lastValues = self.data()[-1*min(maxLen, self.__len):]
+        values = np.empty(maxLen * 2, dtype=self.__values.dtype)
+        values[0:len(lastValues)] = lastValues
+        values[maxLen:maxLen + len(lastValues)] = lastValues
         self.__values = values
 
         self.__maxLen = maxLen
-        if self.__nextPos >= self.__maxLen:
-            self.__nextPos = self.__maxLen
+        self.__len = len(lastValues)
+        self.__nextPos = self.__len % maxLen
 
     def __len__(self):
-        return self.__nextPos
+        return self.__len
 
     def __getitem__(self, key):
         return self.data()[key]
 
 
+# Like NumPyDeque, but it also counts the values appended to it so that NumPyDequeView instances can share it.
+class SharedNumPyDeque(NumPyDeque):
+    def __init__(self, maxLen, dtype=float):
+        NumPyDeque.__init__(self, maxLen, dtype)
+        self.__appended = 0
+        self.__lastValue = None
+
+    def getAppended(self):
+        """Returns the number of values appended so far."""
+        return self.__appended
+
+    def getLastValue(self):
+        return self.__lastValue
+
+    def append(self, value):
+        NumPyDeque.append(self, value)
+        self.__appended += 1
+        self.__lastValue = value
+
+    def getValues(self, end, count):
+        """Returns count values up to the one at position end (excluding it), where positions are the number of
+        values that had been appended."""
+        skip = self.__appended - end
+        assert count + skip <= len(self), "The values are no longer available"
+        end = len(self) - skip
+        return self.data()[end - count:end]
+
+
+# Behaves like a NumPyDeque with a smaller maximum length over the values in a SharedNumPyDeque, without copying them.
+# The values appended to the view are expected to be the ones that were just appended to the shared deque, so appending
+# only moves the end of the view forward, and the shared deque must be at least one value longer than the view.
+# If a different value is appended, or the view falls behind, it copies its values and continues on its own.
+class NumPyDequeView(object):
+    def __init__(self, sharedDeque, maxLen):
+        assert maxLen > 0, "Invalid maximum length"
+        assert maxLen < sharedDeque.getMaxLen(), "The shared deque is too short"
+
+        self.__shared = sharedDeque
+        self.__maxLen = maxLen
+        self.__end = sharedDeque.getAppended()
+        self.__len = 0
+        self.__values = None
+
+    def getMaxLen(self):
+        return self.__maxLen
+
+    def isShared(self):
+        return self.__values is None
+
+    def append(self, value):
+        if self.__values is None:
+            shared = self.__shared
+            if shared.getAppended() == self.__end + 1:
+                lastValue = shared.getLastValue()
+                if value is lastValue or value == lastValue:
+                    self.__end += 1
+                    if self.__len < self.__maxLen:
+                        self.__len += 1
+                    return
+            self.__detach()
+        self.__values.append(value)
+
+    def __detach(self):
+        values = self.data()
+        self.__values = NumPyDeque(self.__maxLen, values.dtype)
+        for value in values:
+            self.__values.append(value)
+
+    def data(self):
+        if self.__values is None:
+            return self.__shared.getValues(self.__end, self.__len)
+        return self.__values.data()
+
+    def __len__(self):
+        if self.__values is None:
+            return self.__len
+        return len(self.__values)
+
+    def __getitem__(self, key):
+        return self.data()[key]
+
+
+# Like NumPyDeque but every item is a row with a fixed number of columns.
+# Values are kept column by column (struct of arrays) so column() returns a contiguous view that can be passed to
+# NumPy or TA-Lib as is.
+class NumPyColumnDeque(object):
+    def __init__(self, maxLen, columns, dtype=float):
+        assert maxLen > 0, "Invalid maximum length"
+
+        self.__values = np.empty((columns, maxLen * 2), dtype=dtype)
+        self.__maxLen = maxLen
+        self.__nextPos = 0
+        self.__len = 0
+
+    def getMaxLen(self):
+        return self.__maxLen
+
+    def append(self, row):
+        nextPos = self.__nextPos
+        self.__values[:, nextPos] = row
+        self.__values[:, nextPos + self.__maxLen] = row
+        nextPos += 1
+        self.__nextPos = 0 if nextPos == self.__maxLen else nextPos
+        if self.__len < self.__maxLen:
+            self.__len += 1
+
+    def __start(self):
+        start = self.__nextPos - self.__len
+        if start < 0:
+            start += self.__maxLen
+        return start
+
+    def column(self, column):
+        start = self.__start()
+        return self.__values[column, start:start + self.__len]
+
+    def data(self):
+        start = self.__start()
+        return self.__values[:, start:start + self.__len]
+
+    def resize(self, maxLen):
+        assert maxLen > 0, "Invalid maximum length"
+
+        # Create empty, copy last rows and swap.
+        size = min(maxLen, self.__len)
+        lastValues = self.data()[:, self.__len - size:]
+        values = np.empty((self.__values.shape[0], maxLen * 2), dtype=self.__values.dtype)
+        values[:, 0:size] = lastValues
+        values[:, maxLen:maxLen + size] = lastValues
+        self.__values = values
+
+        self.__maxLen = maxLen
+        self.__len = size
+        self.__nextPos = size % maxLen
+
+    def __len__(self):
+        return self.__len
+
+
+# Keeps the maximum, or the minimum, of the last maxLen values appended in amortized O(1) per append.
+# Only the values that can still become the maximum are kept, in decreasing order and along with their position: an
+# appended value discards the smaller ones before it, and the first one is discarded once it falls out of the window.
+# Discarded values at the front are skipped using an offset, like in ListDeque.
+class MonotonicDeque(object):
+    def __init__(self, maxLen, useMin=False):
+        assert maxLen > 0, "Invalid maximum length"
+
+        self.__maxLen = maxLen
+        self.__useMin = useMin
+        self.__values = []
+        self.__positions = []
+        self.__start = 0
+        self.__count = 0
+
+    def getMaxLen(self):
+        return self.__maxLen
+
+    def append(self, value):
+        values = self.__values
+        positions = self.__positions
+        start = self.__start
+        if self.__useMin:
+            while len(values) > start and values[-1] >= value:
+                values.pop()
+                positions.pop()
+        else:
+            while len(values) > start and values[-1] <= value:
+                values.pop()
+                positions.pop()
+        values.append(value)
+        positions.append(self.__count)
+        self.__count += 1
+
+        # Positions are consecutive so at most one value falls out of the window on each append.
+        if positions[start] < self.__count - self.__maxLen:
+            start += 1
+            if start >= self.__maxLen:
+                del values[0:start]
+                del positions[0:start]
+                start = 0
+        self.__start = start
+
+    def getValue(self):
+        """Returns the maximum (or minimum) value in the window, or None if no values were appended."""
+        ret = None
+        if len(self.__values) > self.__start:
+            ret = self.__values[self.__start]
+        return ret
+
+    def __len__(self):
+        return min(self.__count, self.__maxLen)
+
+
 # I'm not using collections.deque because:
 # 1: Random access is slower.
 # 2: Slicing is not supported.
+# Values that fall off the front are not removed right away. They are skipped using an offset and discarded in bulk
+# once there are as many of them as maxLen, so append is amortized O(1). data() discards them before returning the list.
 class ListDeque(object):
     def __init__(self, maxLen):
         assert maxLen > 0, "Invalid maximum length"
 
         self.__values = []
+        self.__start = 0
         self.__maxLen = maxLen
 
     def getMaxLen(self):
@@ -122,20 +320,35 @@ class ListDeque(object):
     def append(self, value):
         self.__values.append(value)
         # Check bounds
-        if len(self.__values) > self.__maxLen:
-            self.__values.pop(0)
+        if len(self.__values) - self.__start > self.__maxLen:
+            self.__start += 1
+            if self.__start >= self.__maxLen:
+                self.__compact()
+
+    def __compact(self):
+        if self.__start:
+            del self.__values[0:self.__start]
+            self.__start = 0
 
     def data(self):
+        self.__compact()
         return self.__values
 
     def resize(self, maxLen):
         assert maxLen > 0, "Invalid maximum length"
 
+        self.__compact()
         self.__maxLen = maxLen
         self.__values = self.__values[-1*maxLen:]
 
     def __len__(self):
-        return len(self.__values)
+        return len(self.__values) - self.__start
 
     def __getitem__(self, key):
-        return self.__values[key]
+        if isinstance(key, slice):
+            return self.data()[key]
+        if key < 0:
+            if key < self.__start - len(self.__values):
+                raise IndexError("list index out of range")
+            return self.__values[key]
+        return self.__values[self.__start + key]
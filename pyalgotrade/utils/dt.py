@@ -66,6 +66,25 @@ def timestamp_to_datetime(timeStamp, localized=True):
     return ret
 
 
+def datetime_to_microseconds(dateTime):
+    """Converts a datetime.datetime to the number of microseconds since the epoch.
+    Naive datetimes are converted as they are, localized ones are converted to UTC first."""
+    offset = dateTime.utcoffset()
+    if offset is not None:
+        dateTime = dateTime.replace(tzinfo=None) - offset
+    diff = dateTime - epoch_naive
+    return (diff.days * 86400 + diff.seconds) * 1000000 + diff.microseconds
+
+
+def microseconds_to_datetime(microseconds, timeZone=None):
+    """Converts the number of microseconds since the epoch back to a datetime.datetime.
+    If timeZone is None a naive datetime is returned, otherwise it is adjusted to timeZone."""
+    ret = epoch_naive + datetime.timedelta(microseconds=int(microseconds))
+    if timeZone is not None:
+        ret = pytz.utc.localize(ret).astimezone(timeZone)
+    return ret
+
+
 def get_first_monday(year):
     ret = datetime.date(year, 1, 1)
     if ret.weekday() != 0:
@@ -82,4 +101,5 @@ def get_last_monday(year):
     return ret
 
 
-epoch_utc = as_utc(datetime.datetime(1970, 1, 1))
+epoch_naive = datetime.datetime(1970, 1, 1)
+epoch_utc = as_utc(epoch_naive)
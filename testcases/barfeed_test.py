@@ -19,11 +19,16 @@
 """
 
 import datetime
+import os
+import pickle
 
 import common
 
 from pyalgotrade import barfeed
 from pyalgotrade.barfeed import common as bfcommon
+from pyalgotrade.barfeed import membf
+from pyalgotrade.barfeed import sharedbf
+from pyalgotrade.barfeed import yahoofeed
 from pyalgotrade import bar
 from pyalgotrade import dispatcher
 
@@ -81,6 +86,120 @@ class OptimizerBarFeedTestCase(common.TestCase):
         self.assertEquals(barFeed.barsHaveAdjClose(), False)
 
 
+class MemBarFeed(membf.BarFeed):
+    def barsHaveAdjClose(self):
+        return True
+
+
+class MemBarFeedTestCase(common.TestCase):
+    def __buildBars(self, days):
+        return [bar.BasicBar(datetime.datetime(2001, 1, day), 1, 1, 1, 1, 1, 1, bar.Frequency.DAY) for day in days]
+
+    def testMerge(self):
+        barFeed = MemBarFeed(bar.Frequency.DAY)
+        barFeed.addBarsFromSequence("orcl", self.__buildBars([1, 3, 5, 6]))
+        barFeed.addBarsFromSequence("ibm", self.__buildBars([2, 3, 6]))
+        barFeed.addBarsFromSequence("aapl", self.__buildBars([7]))
+        # Bars added later are sorted and merged too.
+        barFeed.addBarsFromSequence("ibm", self.__buildBars([4]))
+
+        for i in range(2):
+            barFeed.reset()
+            self.assertFalse(barFeed.eof())
+            self.assertEqual(barFeed.peekDateTime(), datetime.datetime(2001, 1, 1))
+            steps = []
+            for dateTime, bars in barFeed:
+                steps.append((dateTime.day, sorted(bars.getInstruments())))
+            self.assertEqual(steps, [
+                (1, ["orcl"]),
+                (2, ["ibm"]),
+                (3, ["ibm", "orcl"]),
+                (4, ["ibm"]),
+                (5, ["orcl"]),
+                (6, ["ibm", "orcl"]),
+                (7, ["aapl"]),
+            ])
+            self.assertTrue(barFeed.eof())
+            self.assertEqual(barFeed.peekDateTime(), None)
+            self.assertEqual(barFeed.getNextBars(), None)
+
+    def testDuplicateBars(self):
+        barFeed = MemBarFeed(bar.Frequency.DAY)
+        barFeed.addBarsFromSequence("orcl", self.__buildBars([1, 2, 2]))
+        barFeed.addBarsFromSequence("ibm", self.__buildBars([2]))
+        with self.assertRaisesRegexp(Exception, "Duplicate bars found for.*"):
+            for dateTime, bars in barFeed:
+                pass
+
+
+class SharedBarFeedTestCase(common.TestCase):
+    def __loadFeed(self):
+        ret = yahoofeed.Feed()
+        # Different holidays, so some datetimes have bars for one instrument only.
+        ret.addBarsFromCSV("spy", common.get_data_file_path("spy-2010-yahoofinance.csv"))
+        ret.addBarsFromCSV("nikkei", common.get_data_file_path("nikkei-2010-yahoofinance.csv"))
+        return ret
+
+    def __assertSameBars(self, barFeed, expectedFeed):
+        expected = [(dateTime, bars) for dateTime, bars in expectedFeed]
+        actual = [(dateTime, bars) for dateTime, bars in barFeed]
+        self.assertEqual(len(actual), len(expected))
+        for (dateTime, bars), (expectedDateTime, expectedBars) in zip(actual, expected):
+            self.assertEqual(dateTime, expectedDateTime)
+            self.assertEqual(sorted(bars.getInstruments()), sorted(expectedBars.getInstruments()))
+            for instrument in bars.getInstruments():
+                currentBar = bars[instrument]
+                expectedBar = expectedBars[instrument]
+                self.assertEqual(currentBar.getDateTime(), expectedBar.getDateTime())
+                self.assertEqual(currentBar.getOpen(), expectedBar.getOpen())
+                self.assertEqual(currentBar.getHigh(), expectedBar.getHigh())
+                self.assertEqual(currentBar.getLow(), expectedBar.getLow())
+                self.assertEqual(currentBar.getClose(), expectedBar.getClose())
+                self.assertEqual(currentBar.getVolume(), expectedBar.getVolume())
+                self.assertEqual(currentBar.getAdjClose(), expectedBar.getAdjClose())
+                self.assertEqual(currentBar.getFrequency(), expectedBar.getFrequency())
+
+    def testSameBars(self):
+        sharedBars = sharedbf.SharedBars.create(self.__loadFeed())
+        try:
+            self.assertEqual(sorted(sharedBars.getInstruments()), ["nikkei", "spy"])
+            self.assertEqual(sharedBars.getValues().shape, (6, 2, len(sharedBars)))
+            barFeed = sharedbf.Feed(sharedBars)
+            self.__assertSameBars(barFeed, self.__loadFeed())
+            self.assertTrue(barFeed.eof())
+
+            # A reset feed, and an unpickled one, start all over again.
+            barFeed.reset()
+            self.__assertSameBars(barFeed, self.__loadFeed())
+            self.__assertSameBars(sharedbf.Feed(pickle.loads(pickle.dumps(sharedBars))), self.__loadFeed())
+        finally:
+            sharedBars.close()
+        self.assertFalse(os.path.exists(sharedBars.getPath()))
+
+    def testSameBarsInSmallChunks(self):
+        class SmallChunks(sharedbf.SharedBars):
+            CHUNK_SIZE = 7
+
+        sharedBars = SmallChunks.create(self.__loadFeed())
+        try:
+            self.assertTrue(len(sharedBars) % SmallChunks.CHUNK_SIZE != 0)
+            self.__assertSameBars(sharedbf.Feed(sharedBars), self.__loadFeed())
+        finally:
+            sharedBars.close()
+
+    def testBaseBarFeed(self):
+        barFeed = MemBarFeed(bar.Frequency.DAY)
+        barFeed.addBarsFromSequence("orcl", [
+            bar.BasicBar(datetime.datetime(2001, 1, day), 1, 1, 1, 1, 1, None, bar.Frequency.DAY) for day in [1, 2]
+        ])
+        sharedBars = sharedbf.SharedBars.create(barFeed)
+        try:
+            self.assertEqual(sharedBars.barsHaveAdjClose(), True)
+            check_base_barfeed(self, sharedbf.Feed(sharedBars), True)
+        finally:
+            sharedBars.close()
+
+
 class CommonTestCase(common.TestCase):
     def testSanitize(self):
         self.assertEqual(bfcommon.sanitize_ohlc(10, 12, 9, 10), (10, 12, 9, 10))
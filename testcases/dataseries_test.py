@@ -20,12 +20,16 @@
 
 import datetime
 
+import numpy as np
+import pytz
+
 import common
 
 from pyalgotrade import dataseries
 from pyalgotrade.dataseries import bards
 from pyalgotrade.dataseries import aligned
 from pyalgotrade import bar
+from pyalgotrade.utils import dt
 
 
 class TestSequenceDataSeries(common.TestCase):
@@ -141,6 +145,94 @@ class TestSequenceDataSeries(common.TestCase):
         self.assertEqual(ds[-1], 99)
 
 
+class TestNumericSequenceDataSeries(common.TestCase):
+    def testEmpty(self):
+        ds = dataseries.NumericSequenceDataSeries()
+        self.assertEqual(len(ds), 0)
+        self.assertEqual(len(ds.asarray()), 0)
+        self.assertEqual(len(ds.asarray(10)), 0)
+        with self.assertRaises(IndexError):
+            ds[-1]
+        with self.assertRaises(IndexError):
+            ds[0]
+        with self.assertRaises(TypeError):
+            ds["a"]
+
+    def testSeqLikeOps(self):
+        seq = range(10)
+        ds = dataseries.NumericSequenceDataSeries()
+        for value in seq:
+            ds.append(value)
+
+        self.assertEqual(len(ds), len(seq))
+        for i in xrange(-len(seq), len(seq)):
+            self.assertEqual(ds[i], seq[i])
+            self.assertEqual(type(ds[i]), float)
+        for step in xrange(1, 10):
+            for i in xrange(-100, 100):
+                self.assertEqual(ds[i::step], seq[i::step])
+        self.assertEqual(ds.getValueAbsolute(3), 3)
+        self.assertEqual(ds.getValueAbsolute(10), None)
+
+    def testAsArray(self):
+        ds = dataseries.NumericSequenceDataSeries(maxLen=5)
+        for i in xrange(12):
+            ds.append(i)
+            values = ds.asarray(3)
+            self.assertEqual(values.dtype, np.float64)
+            self.assertEqual(values.tolist(), range(max(i - 2, 0), i + 1))
+        self.assertEqual(ds.asarray().tolist(), range(7, 12))
+        self.assertEqual(ds.asarray(0).tolist(), [])
+        self.assertEqual(ds.asarray(100).tolist(), range(7, 12))
+        self.assertTrue(ds.asarray().flags["C_CONTIGUOUS"])
+
+    def testDateTimes(self):
+        ds = dataseries.NumericSequenceDataSeries(maxLen=5)
+        firstDt = datetime.datetime(2000, 1, 1)
+        for i in range(10):
+            ds.appendWithDateTime(firstDt + datetime.timedelta(seconds=i), i)
+            # Adding the same datetime twice should fail
+            with self.assertRaises(Exception):
+                ds.appendWithDateTime(firstDt + datetime.timedelta(seconds=i), i)
+        self.assertEqual(ds.getDateTimes(), [firstDt + datetime.timedelta(seconds=i) for i in range(5, 10)])
+        self.assertEqual(ds.getTimestamps().dtype, np.int64)
+
+        ds.append(100)
+        self.assertEqual(ds.getDateTimes()[-1], None)
+        self.assertEqual(ds.getTimestamps()[-1], dataseries.NO_TIMESTAMP)
+
+    def testLocalizedDateTimes(self):
+        ds = dataseries.NumericSequenceDataSeries()
+        timeZone = pytz.timezone("US/Eastern")
+        dateTimes = [dt.localize(datetime.datetime(2000, 3, 1) + datetime.timedelta(days=i * 10), timeZone) for i in range(10)]
+        for i, dateTime in enumerate(dateTimes):
+            ds.appendWithDateTime(dateTime, i)
+        self.assertEqual(ds.getDateTimes(), dateTimes)
+
+    def testResize(self):
+        ds = dataseries.NumericSequenceDataSeries(100)
+        for i in xrange(100):
+            ds.append(i)
+
+        ds.setMaxLen(2)
+        self.assertEqual(len(ds), 2)
+        self.assertEqual(len(ds.getDateTimes()), 2)
+        self.assertEqual(ds[:], [98, 99])
+
+        ds.setMaxLen(1000)
+        for i in xrange(100, 110):
+            ds.append(i)
+        self.assertEqual(len(ds), 12)
+        self.assertEqual(ds.asarray(3).tolist(), [107, 108, 109])
+
+    def testNewValueEvent(self):
+        values = []
+        ds = dataseries.NumericSequenceDataSeries()
+        ds.getNewValueEvent().subscribe(lambda ds_, dateTime, value: values.append((dateTime, value)))
+        ds.appendWithDateTime(datetime.datetime(2000, 1, 1), 1.5)
+        self.assertEqual(values, [(datetime.datetime(2000, 1, 1), 1.5)])
+
+
 class TestBarDataSeries(common.TestCase):
     def testEmpty(self):
         ds = bards.BarDataSeries()
@@ -187,6 +279,8 @@ class TestBarDataSeries(common.TestCase):
         self.__testGetValue(ds.getVolumeDataSeries(), 10, 10)
         self.__testGetValue(ds.getAdjCloseDataSeries(), 10, 3)
         self.__testGetValue(ds.getPriceDataSeries(), 10, 3)
+        self.assertEqual(ds.getCloseDataSeries().asarray(2).tolist(), [3, 3])
+        self.assertEqual(ds.getVolumeDataSeries().asarray(2).tolist(), [10, 10])
 
     def testSeqLikeOps(self):
         seq = []
@@ -212,6 +306,47 @@ class TestBarDataSeries(common.TestCase):
             self.assertEqual(ds[i].getDateTime(), ds.getDateTimes()[i])
             self.assertEqual(ds.getDateTimes()[i], firstDt + datetime.timedelta(seconds=i))
 
+    def testColumnEvents(self):
+        ds = bards.BarDataSeries()
+        closeValues = []
+        ds.getCloseDataSeries().getNewValueEvent().subscribe(lambda ds_, dateTime, value: closeValues.append((dateTime, value)))
+        self.assertTrue(ds.getCloseDataSeries().getNewValueEvent().hasSubscribers())
+        self.assertFalse(ds.getOpenDataSeries().getNewValueEvent().hasSubscribers())
+
+        firstDt = datetime.datetime(2000, 1, 1)
+        for i in range(3):
+            ds.append(bar.BasicBar(firstDt + datetime.timedelta(seconds=i), 2, 10, 1, 3 + i, 10, None, bar.Frequency.SECOND))
+        self.assertEqual(closeValues, [(firstDt + datetime.timedelta(seconds=i), 3 + i) for i in range(3)])
+        self.assertEqual(ds.getCloseDataSeries().getDateTimes(), ds.getDateTimes())
+        # Missing adjusted close values are returned as None.
+        self.assertEqual(ds.getAdjCloseDataSeries()[-1], None)
+        self.assertEqual(ds.getAdjCloseDataSeries()[:], [None, None, None])
+
+    def testSetMaxLen(self):
+        ds = bards.BarDataSeries(maxLen=3)
+        firstDt = datetime.datetime(2000, 1, 1)
+        for i in range(10):
+            ds.append(bar.BasicBar(firstDt + datetime.timedelta(seconds=i), i, i + 1, i, i, 10, i, bar.Frequency.SECOND))
+        self.assertEqual(ds.getCloseDataSeries()[:], [7, 8, 9])
+        self.assertEqual(ds.getHighDataSeries().asarray().tolist(), [8, 9, 10])
+        self.assertTrue(ds.getHighDataSeries().asarray().flags["C_CONTIGUOUS"])
+
+        ds.setMaxLen(2)
+        self.assertEqual(len(ds), 2)
+        self.assertEqual(len(ds.getOpenDataSeries()), 2)
+        self.assertEqual(ds.getOpenDataSeries()[:], [8, 9])
+        self.assertEqual(ds.getOpenDataSeries().getMaxLen(), 2)
+
+    def testColumnOutlivesBarDataSeries(self):
+        ds = bards.BarDataSeries()
+        firstDt = datetime.datetime(2000, 1, 1)
+        for i in range(3):
+            ds.append(bar.BasicBar(firstDt + datetime.timedelta(seconds=i), 2, 10, 1, 3 + i, 10, 3 + i, bar.Frequency.SECOND))
+        closeDS = ds.getCloseDataSeries()
+        del ds
+        self.assertEqual(closeDS[:], [3, 4, 5])
+        self.assertEqual(closeDS.getDateTimes(), [firstDt + datetime.timedelta(seconds=i) for i in range(3)])
+
 
 class TestDateAlignedDataSeries(common.TestCase):
     def testNotAligned(self):
@@ -93,6 +93,16 @@ class RealtimeFeed(observer.Subject):
         return self.__priority
 
 
+class TimelineFeed(NonRealtimeFeed):
+    def __init__(self, datetimes, priority=None):
+        NonRealtimeFeed.__init__(self, datetimes, priority)
+        # Same list, items are popped by NonRealtimeFeed.dispatch.
+        self.__datetimes = datetimes
+
+    def getDispatchDateTimes(self):
+        return list(self.__datetimes)
+
+
 class DispatcherTestCase(common.TestCase):
     def test1NrtFeed(self):
         values = []
@@ -220,6 +230,62 @@ class DispatcherTestCase(common.TestCase):
         # Check that although feed2 is realtime, feed1 was dispatched before.
         self.assertTrue(values[0] < values[1])
 
+    def __runFeeds(self, useTimeline, feedClass):
+        values = []
+        now = datetime.datetime(2000, 1, 1)
+        seconds = [[0, 1, 1, 3, 5], [1, 2, 3, 3, 3], [0, 4]]
+        priorities = [None, 1, 0]
+        disp = dispatcher.Dispatcher(useTimeline)
+        for i, (secs, priority) in enumerate(zip(seconds, priorities)):
+            feed = feedClass([now + datetime.timedelta(seconds=sec) for sec in secs], priority)
+            feed.getEvent().subscribe(lambda x, i=i: values.append((x, i, disp.getCurrentDateTime())))
+            disp.addSubject(feed)
+        disp.run()
+        self.assertEqual(disp.getEventsDispatched(), 12)
+        return values
+
+    def testTimeline(self):
+        expected = self.__runFeeds(False, NonRealtimeFeed)
+        self.assertEqual(len(expected), 12)
+        self.assertEqual(self.__runFeeds(True, TimelineFeed), expected)
+        self.assertEqual(self.__runFeeds(False, TimelineFeed), expected)
+        for dateTime, i, currDateTime in expected:
+            self.assertEqual(dateTime, currDateTime)
+
+    def testTimelineStop(self):
+        values = []
+        now = datetime.datetime(2000, 1, 1)
+        feed = TimelineFeed([now + datetime.timedelta(seconds=i) for i in xrange(10)])
+        disp = dispatcher.Dispatcher()
+
+        def onValue(dateTime):
+            values.append(dateTime)
+            if len(values) == 3:
+                disp.stop()
+        feed.getEvent().subscribe(onValue)
+        disp.addSubject(feed)
+        disp.run()
+        self.assertEqual(len(values), 3)
+        self.assertEqual(disp.getEventsDispatched(), 3)
+
+    def testTimelineWithRealtimeFeed(self):
+        # A realtime subject can't provide a timeline, so all subjects are polled.
+        values = []
+        now = datetime.datetime(2000, 1, 1)
+        rtFeed = RealtimeFeed([now + datetime.timedelta(seconds=i) for i in xrange(3)])
+        nrtFeed = TimelineFeed([now + datetime.timedelta(seconds=i + 10) for i in xrange(3)])
+        rtFeed.getEvent().subscribe(lambda x: values.append(x))
+        nrtFeed.getEvent().subscribe(lambda x: values.append(x))
+
+        disp = dispatcher.Dispatcher()
+        disp.addSubject(rtFeed)
+        disp.addSubject(nrtFeed)
+        disp.run()
+        self.assertEqual(len(values), 6)
+        for i in xrange(3):
+            self.assertEqual(values[i*2], now + datetime.timedelta(seconds=i))
+            self.assertEqual(values[i*2+1], now + datetime.timedelta(seconds=i + 10))
+
 
 class EventTestCase(common.TestCase):
     def testEmitOrder(self):
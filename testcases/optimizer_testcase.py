@@ -18,11 +18,20 @@
 .. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
 """
 
+import os
 import sys
+import socket
+import threading
 
 import common
 
 from pyalgotrade.optimizer import local
+from pyalgotrade.optimizer import protocol
+from pyalgotrade.optimizer import search
+from pyalgotrade.optimizer import server
+from pyalgotrade.optimizer import store
+from pyalgotrade.optimizer import worker
+from pyalgotrade.barfeed import sharedbf
 from pyalgotrade.barfeed import yahoofeed
 
 sys.path.append("samples")
@@ -34,6 +43,21 @@ def parameters_generator(instrument, smaFirst, smaLast):
         yield(instrument, sma)
 
 
+class SMACrossOverWorker(worker.Worker):
+    def __init__(self, *args, **kwargs):
+        worker.Worker.__init__(self, *args, **kwargs)
+        self.__strategyRuns = 0
+
+    def getStrategyRuns(self):
+        return self.__strategyRuns
+
+    def runStrategy(self, barFeed, *args):
+        self.__strategyRuns += 1
+        strat = sma_crossover.SMACrossOver(barFeed, *args)
+        strat.run()
+        return strat.getResult()
+
+
 class OptimizerTestCase(common.TestCase):
     def testLocal(self):
         barFeed = yahoofeed.Feed()
@@ -42,3 +66,381 @@ class OptimizerTestCase(common.TestCase):
         res = local.run(sma_crossover.SMACrossOver, barFeed, parameters_generator(instrument, 5, 100))
         self.assertEquals(round(res.getResult(), 2), 1295462.6)
         self.assertEquals(res.getParameters()[1], 20)
+
+    def testLocalSharedBars(self):
+        barFeed = yahoofeed.Feed()
+        instrument = "orcl"
+        barFeed.addBarsFromCSV(instrument, common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+        res = local.run(sma_crossover.SMACrossOver, barFeed, parameters_generator(instrument, 5, 100), shareBars=True)
+        self.assertEquals(round(res.getResult(), 2), 1295462.6)
+        self.assertEquals(res.getParameters()[1], 20)
+
+    def testProtocol(self):
+        a, b = socket.socketpair()
+        try:
+            protocol.send_message(a, ("getNextJob", ()))
+            message = protocol.EncodedMessage(range(1000))
+            protocol.send_message(a, message)
+            protocol.send_message(a, message)
+            self.assertEquals(protocol.recv_message(b), ("getNextJob", ()))
+            self.assertEquals(protocol.recv_message(b), range(1000))
+            self.assertEquals(protocol.recv_message(b), range(1000))
+            a.close()
+            with self.assertRaises(protocol.ConnectionClosed):
+                protocol.recv_message(b)
+        finally:
+            a.close()
+            b.close()
+
+    def __runWithWorker(self, beforeWorker=None):
+        barFeed = yahoofeed.Feed()
+        instrument = "orcl"
+        barFeed.addBarsFromCSV(instrument, common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+        srv = server.Server("localhost", local.find_port(), False)
+        srv.getLogger().disabled = True
+        results = []
+        srv.getNewResultsEvent().subscribe(lambda jobResults, barsFraction, workerName: results.extend(jobResults))
+        serverThread = local.ServerThread(srv, barFeed, parameters_generator(instrument, 5, 50))
+        serverThread.start()
+        try:
+            if beforeWorker is not None:
+                beforeWorker(srv.server_address[1])
+            w = SMACrossOverWorker("localhost", srv.server_address[1], "worker")
+            w.getLogger().disabled = True
+            w.run()
+            self.assertFalse(srv.jobsPending())
+        finally:
+            srv.stop()
+            serverThread.join()
+        self.assertEquals(sorted(parameters[1] for parameters, result in results), range(5, 51))
+        self.assertEquals(round(serverThread.getResults().getResult(), 2), 1295462.6)
+
+    def testJobPutBackWhenConnectionLost(self):
+        def takeJobAndDisconnect(port):
+            sock = socket.create_connection(("localhost", port))
+            try:
+                protocol.send_message(sock, ("getNextJob", ()))
+                self.assertEquals(protocol.recv_message(sock).getParameterCount(), 1)
+            finally:
+                sock.close()
+
+        self.__runWithWorker(takeJobAndDisconnect)
+
+    def testWorkerReconnects(self):
+        sendMessage = protocol.send_message
+        failures = [0]
+
+        def failingSendMessage(sock, message):
+            # Fail the first time the worker pushes results.
+            if isinstance(message, tuple) and message[0] == "pushJobResults" and not failures[0]:
+                failures[0] += 1
+                raise socket.error("Network error")
+            sendMessage(sock, message)
+
+        protocol.send_message = failingSendMessage
+        try:
+            self.__runWithWorker()
+        finally:
+            protocol.send_message = sendMessage
+        self.assertEquals(failures[0], 1)
+
+    def testRemoteError(self):
+        srv = server.Server("localhost", local.find_port(), False)
+        srv.getLogger().disabled = True
+
+        def fail():
+            raise Exception("Search failed")
+
+        srv.registerFunction(fail, "getNextJob")
+        serverThread = threading.Thread(target=srv.serve_forever)
+        serverThread.start()
+        try:
+            w = SMACrossOverWorker("localhost", srv.server_address[1], "worker")
+            w.getLogger().disabled = True
+            try:
+                with self.assertRaisesRegexp(protocol.RemoteError, "Error processing getNextJob: Search failed"):
+                    w.getNextJob()
+                # The connection is still usable.
+                self.assertEquals(w.getBarsFrequency(), None)
+            finally:
+                w.close()
+
+            sock = socket.create_connection(("localhost", srv.server_address[1]))
+            try:
+                protocol.send_message(sock, ("getNextJobs", ()))
+                error = protocol.recv_message(sock)
+                self.assertTrue(isinstance(error, protocol.RemoteError))
+                self.assertEquals(str(error), "Error processing getNextJobs: Unknown function getNextJobs")
+            finally:
+                sock.close()
+        finally:
+            srv.shutdown()
+            serverThread.join()
+            srv.server_close()
+
+    def testAdaptiveBatchSize(self):
+        srv = server.Server("localhost", local.find_port(), False)
+        try:
+            srv.serve_forever = lambda: None
+            srv.serve(None, [(i,) for i in range(10000)])
+            # Start with a single set of parameters until the strategy runtime is known.
+            job = srv.getNextJob()
+            self.assertEquals(job.getParameterCount(), 1)
+            # 0.1 seconds per set of parameters.
+            srv.pushJobResults(job.getId(), [((1,), 1)], "worker", 0.1)
+            self.assertEquals(srv.getBatchSize(), 10)
+            job = srv.getNextJob()
+            self.assertEquals(job.getParameterCount(), 10)
+            # Very fast strategies are limited by defaultBatchSize.
+            for i in range(20):
+                job = srv.getNextJob()
+                srv.pushJobResults(job.getId(), [((1,), 1)] * job.getParameterCount(), "worker", 0)
+            self.assertEquals(srv.getBatchSize(), server.Server.defaultBatchSize)
+        finally:
+            srv.server_close()
+
+    def testStoreLookupBatchSize(self):
+        with common.TmpDir() as tmpPath:
+            resultStore = store.ResultStore(os.path.join(tmpPath, "results.sqlite"), sma_crossover.SMACrossOver)
+            srv = server.Server("localhost", local.find_port(), False, resultStore)
+            try:
+                resultStore.addResults("bars", [((i,), i) for i in range(1000)])
+                storedBatches = []
+                srv.getNewResultsEvent().subscribe(lambda results, barsFraction, workerName: storedBatches.append((len(results), workerName)))
+                srv.serve_forever = lambda: None
+                srv.serve(None, [(i,) for i in range(2000)], "bars")
+                # The runtime of the strategy is unknown, so only one set of parameters is backtested, but stored
+                # results are looked up in full batches.
+                job = srv.getNextJob()
+                self.assertEquals(job.getParameterCount(), 1)
+                self.assertEquals(storedBatches, [(1, "store")] + [(server.Server.defaultBatchSize, "store")] * 4 + [(199, "store")])
+            finally:
+                srv.server_close()
+                resultStore.close()
+
+    def testLocalSuccessiveHalving(self):
+        barFeed = yahoofeed.Feed()
+        instrument = "orcl"
+        barFeed.addBarsFromCSV(instrument, common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+        strategyParameters = search.SuccessiveHalving([[instrument], range(5, 101)], 96, minBarsFraction=0.5, seed=1)
+        res = local.run(sma_crossover.SMACrossOver, barFeed, strategyParameters)
+        self.assertEquals(round(res.getResult(), 2), 1295462.6)
+        self.assertEquals(res.getParameters()[1], 20)
+
+    def testLocalSurrogateSearch(self):
+        barFeed = yahoofeed.Feed()
+        instrument = "orcl"
+        barFeed.addBarsFromCSV(instrument, common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+        strategyParameters = search.SurrogateSearch([[instrument], range(5, 101)], 40, seed=1)
+        res = local.run(sma_crossover.SMACrossOver, barFeed, strategyParameters, shareBars=True)
+        self.assertEquals(round(res.getResult(), 2), 1295462.6)
+        self.assertEquals(res.getParameters()[1], 20)
+
+
+    def testLocalResultStore(self):
+        instrument = "orcl"
+        with common.TmpDir() as tmpPath:
+            resultStore = store.ResultStore(os.path.join(tmpPath, "results.sqlite"), sma_crossover.SMACrossOver)
+            try:
+                barFeed = yahoofeed.Feed()
+                barFeed.addBarsFromCSV(instrument, common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+                res = local.run(sma_crossover.SMACrossOver, barFeed, parameters_generator(instrument, 5, 50), resultStore=resultStore)
+                self.assertEquals(round(res.getResult(), 2), 1295462.6)
+                self.assertEquals(resultStore.getCount(), 46)
+
+                # Extend the grid. Only the new parameters are backtested, and the best result comes from the store.
+                barFeed = yahoofeed.Feed()
+                barFeed.addBarsFromCSV(instrument, common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+                srv = server.Server("localhost", local.find_port(), False, resultStore)
+                srv.getLogger().disabled = True
+                serverThread = local.ServerThread(srv, barFeed, parameters_generator(instrument, 5, 100))
+                serverThread.start()
+                try:
+                    w = SMACrossOverWorker("localhost", srv.server_address[1], "worker")
+                    w.getLogger().disabled = True
+                    w.run()
+                finally:
+                    srv.stop()
+                    serverThread.join()
+                self.assertEquals(round(serverThread.getResults().getResult(), 2), 1295462.6)
+                self.assertEquals(serverThread.getResults().getParameters()[1], 20)
+                self.assertEquals(resultStore.getCount(), 96)
+                self.assertEquals(w.getStrategyRuns(), 50)
+
+                # The same bars, shared, have the same fingerprint.
+                barFeed = yahoofeed.Feed()
+                barFeed.addBarsFromCSV(instrument, common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+                res = local.run(sma_crossover.SMACrossOver, barFeed, parameters_generator(instrument, 5, 100), shareBars=True, resultStore=resultStore)
+                self.assertEquals(round(res.getResult(), 2), 1295462.6)
+                self.assertEquals(resultStore.getCount(), 96)
+            finally:
+                resultStore.close()
+
+
+    def testLocalResultLog(self):
+        barFeed = yahoofeed.Feed()
+        instrument = "orcl"
+        barFeed.addBarsFromCSV(instrument, common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+        with common.TmpDir() as tmpPath:
+            path = os.path.join(tmpPath, "results.csv")
+            resultLog = store.ResultLog(path, ["instrument", "period"])
+            try:
+                res = local.run(sma_crossover.SMACrossOver, barFeed, parameters_generator(instrument, 5, 100), resultLog=resultLog)
+            finally:
+                resultLog.close()
+            loaded = store.load_result_log(path)
+
+        self.assertEquals(len(loaded), 96)
+        self.assertEquals(sorted(parameters[1] for parameters, barsFraction, result, workerName in loaded), range(5, 101))
+        # Several periods have the same result, so compare the results only.
+        results = sorted([result for parameters, barsFraction, result, workerName in loaded], reverse=True)
+        self.assertEquals([result for parameters, result in res.getTopResults()], results[:server.Server.topResultsCount])
+        logged = dict((parameters, result) for parameters, barsFraction, result, workerName in loaded)
+        for parameters, result in res.getTopResults():
+            self.assertEquals(logged[parameters], result)
+        self.assertEquals(res.getTopResults()[0], (("orcl", 20), res.getResult()))
+        self.assertEquals(round(res.getResult(), 2), 1295462.6)
+
+
+class ResultStoreTestCase(common.TestCase):
+    def testTopResults(self):
+        topResults = server.TopResults(3)
+        for i, result in enumerate([5, 1, 7, 7, None, 3, 9, 7]):
+            topResults.add((i,), result)
+        self.assertEquals(topResults.getResults(), [((6,), 9), ((2,), 7), ((3,), 7)])
+        self.assertEquals(len(topResults), 3)
+
+    def testResultLog(self):
+        with common.TmpDir() as tmpPath:
+            path = os.path.join(tmpPath, "results.csv")
+            resultLog = store.ResultLog(path)
+            resultLog.addResults([(("a", 1, 0.1), 1.0 / 3), (("b", 2, 0.2), None)], 1.0, "worker")
+            resultLog.close()
+            # Appends to the existing file.
+            resultLog = store.ResultLog(path)
+            resultLog.addResults([(("a", 1, 0.1), 5)], 0.5, "other worker")
+            # Results found in the result store are skipped unless asked for.
+            resultLog.addResults([(("a", 1, 0.1), 1.0 / 3)], 1.0, store.STORE_WORKER_NAME)
+            resultLog.close()
+            resultLog = store.ResultLog(path, logStoredResults=True)
+            resultLog.addResults([(("c", 3, 0.3), 7)], 1.0, store.STORE_WORKER_NAME)
+            resultLog.close()
+            self.assertEquals(store.load_result_log(path), [
+                (("a", 1, 0.1), 1.0, 1.0 / 3, "worker"),
+                (("b", 2, 0.2), 1.0, None, "worker"),
+                (("a", 1, 0.1), 0.5, 5, "other worker"),
+                (("c", 3, 0.3), 1.0, 7, "store"),
+            ])
+            with open(path) as f:
+                self.assertEquals(f.readline().strip(), "parameter_0,parameter_1,parameter_2,bars_fraction,result,worker")
+
+    def testResults(self):
+        with common.TmpDir() as tmpPath:
+            path = os.path.join(tmpPath, "results.sqlite")
+            resultStore = store.ResultStore(path, "strategy")
+            resultStore.addResults("data", [(("a", 1), 10), (("a", 2), None)])
+            resultStore.addResults("data", [(("a", 1), 5)], 0.5)
+            self.assertEquals(resultStore.getResults("data", [("a", 1), ("a", 2), ("a", 3)]), [(("a", 1), 10), (("a", 2), None)])
+            self.assertEquals(resultStore.getResults("data", [("a", 1), ("a", 2)], 0.5), [(("a", 1), 5)])
+            self.assertEquals(resultStore.getResults("other data", [("a", 1)]), [])
+            self.assertEquals(resultStore.getCount(), 3)
+            self.assertEquals(resultStore.getCount("other data"), 0)
+            resultStore.close()
+
+            # Results are kept per strategy.
+            resultStore = store.ResultStore(path, "strategy")
+            self.assertEquals(resultStore.getResults("data", [("a", 1)]), [(("a", 1), 10)])
+            resultStore.close()
+            resultStore = store.ResultStore(path, "other strategy")
+            self.assertEquals(resultStore.getResults("data", [("a", 1)]), [])
+            resultStore.close()
+
+    def testFingerprint(self):
+        barFeed = yahoofeed.Feed()
+        barFeed.addBarsFromCSV("orcl", common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+        loadedBars = [bars for dateTime, bars in barFeed]
+        fingerprint = store.fingerprint_bars(["orcl"], loadedBars)
+        self.assertEquals(store.fingerprint_bars(["orcl"], loadedBars), fingerprint)
+        self.assertNotEquals(store.fingerprint_bars(["orcl"], loadedBars[:-1]), fingerprint)
+        self.assertNotEquals(store.fingerprint_bars(["ibm"], loadedBars), fingerprint)
+
+        barFeed = yahoofeed.Feed()
+        barFeed.addBarsFromCSV("orcl", common.get_data_file_path("orcl-2000-yahoofinance.csv"))
+        sharedBars = sharedbf.SharedBars.create(barFeed)
+        try:
+            self.assertEquals(store.fingerprint_bars(["orcl"], (bars for dateTime, bars in sharedbf.Feed(sharedBars))), fingerprint)
+        finally:
+            sharedBars.close()
+
+
+class SearchTestCase(common.TestCase):
+    def __run(self, searchStrategy, function, batchSize=5):
+        # Backtest everything, in order, and return the number of sets of parameters per fraction of the bars and
+        # the best result using all the bars.
+        counts = {}
+        bestResult = None
+        while not searchStrategy.isFinished():
+            parameters, barsFraction = searchStrategy.getNextParameters(batchSize)
+            if len(parameters):
+                counts[barsFraction] = counts.get(barsFraction, 0) + len(parameters)
+                results = [(p, function(*p)) for p in parameters]
+                if barsFraction == 1:
+                    bestResult = max([bestResult] + [result for p, result in results])
+                searchStrategy.addResults(results, barsFraction)
+        return counts, bestResult
+
+    def testParameterSpace(self):
+        space = search.ParameterSpace([["a", "b"], range(3), [True]])
+        self.assertEquals(space.getSize(), 6)
+        self.assertEquals([space.getParameters(i) for i in range(space.getSize())], [
+            ("a", 0, True), ("a", 1, True), ("a", 2, True), ("b", 0, True), ("b", 1, True), ("b", 2, True)
+        ])
+        self.assertEquals(space.getCoordinates(5), [1, 1, 0])
+        self.assertEquals(sorted(space.sample(10, search.random.Random(0))), range(6))
+        self.assertEquals(sorted(space.sample(10, search.random.Random(0), set([1, 2]))), [0, 3, 4, 5])
+        # Big spaces.
+        space = search.ParameterSpace([range(1000)] * 4)
+        indexes = space.sample(1000, search.random.Random(0))
+        self.assertEquals(len(set(indexes)), 1000)
+
+    def testGridSearch(self):
+        searchStrategy = search.GridSearch([(i,) for i in range(12)])
+        self.assertEquals(self.__run(searchStrategy, lambda i: i), ({1.0: 12}, 11))
+
+    def testRandomSearch(self):
+        searchStrategy = search.RandomSearch([range(10), range(10)], 30, seed=0)
+        backtested = []
+        while not searchStrategy.isFinished():
+            backtested.extend(searchStrategy.getNextParameters(7)[0])
+        self.assertEquals(len(backtested), 30)
+        self.assertEquals(len(set(backtested)), 30)
+
+    def testSuccessiveHalving(self):
+        searchStrategy = search.SuccessiveHalving([range(100)], 27, eta=3, minBarsFraction=0, seed=0)
+        counts, bestResult = self.__run(searchStrategy, lambda i: -abs(i - 42))
+        self.assertEquals(counts, {1/27.0: 27, 1/9.0: 9, 1/3.0: 3, 1.0: 1})
+
+        searchStrategy = search.SuccessiveHalving([range(100)], 10, eta=3, minBarsFraction=0.5, seed=0)
+        counts, bestResult = self.__run(searchStrategy, lambda i: -abs(i - 42))
+        self.assertEquals(counts, {0.5: 13, 1.0: 1})
+
+    def testSuccessiveHalvingWaitsForResults(self):
+        searchStrategy = search.SuccessiveHalving([range(100)], 9, eta=3, seed=0)
+        parameters, barsFraction = searchStrategy.getNextParameters(100)
+        self.assertEquals(len(parameters), 9)
+        self.assertEquals(searchStrategy.getNextParameters(100), ([], barsFraction))
+        self.assertFalse(searchStrategy.isFinished())
+        searchStrategy.addResults([(p, p[0]) for p in parameters[:8]], barsFraction)
+        self.assertEquals(searchStrategy.getNextParameters(100), ([], barsFraction))
+        searchStrategy.addResults([(p, p[0]) for p in parameters[8:]], barsFraction)
+        self.assertEquals(searchStrategy.getNextParameters(100)[0], sorted(parameters, reverse=True)[:3])
+
+    def testSurrogateSearch(self):
+        function = lambda x, y: -((x - 70) ** 2 + (y - 20) ** 2)
+        space = [range(100), range(100)]
+        counts, surrogateBest = self.__run(search.SurrogateSearch(space, 60, initialCount=10, batchSize=5, seed=0), function)
+        self.assertEquals(counts, {1.0: 60})
+        counts, randomBest = self.__run(search.RandomSearch(space, 60, seed=0), function)
+        self.assertEquals(counts, {1.0: 60})
+        self.assertTrue(surrogateBest > randomBest)
+        self.assertTrue(surrogateBest >= -10)
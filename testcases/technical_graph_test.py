@@ -0,0 +1,131 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
+"""
+
+import datetime
+
+import numpy as np
+
+import common
+
+from pyalgotrade import bar
+from pyalgotrade import dataseries
+from pyalgotrade import technical
+from pyalgotrade.dataseries import bards
+from pyalgotrade.technical import graph
+from pyalgotrade.technical import highlow
+from pyalgotrade.technical import hurst
+from pyalgotrade.technical import linreg
+from pyalgotrade.technical import ma
+from pyalgotrade.technical import roc
+from pyalgotrade.technical import rsi
+from pyalgotrade.technical import stats
+from pyalgotrade.technical import atr
+from pyalgotrade.technical import stoch
+
+
+class IndicatorGraphTestCase(common.TestCase):
+    def __assertSeriesEqual(self, ds1, ds2):
+        self.assertEqual(len(ds1), len(ds2))
+        for i in range(len(ds1)):
+            if ds1[i] is None or ds2[i] is None:
+                self.assertEqual(ds1[i], ds2[i])
+            else:
+                self.assertAlmostEqual(ds1[i], ds2[i], places=7)
+
+    def testMatchesFilters(self):
+        windows = [
+            lambda: ma.SMAEventWindow(10),
+            lambda: ma.EMAEventWindow(10),
+            lambda: stats.StdDevEventWindow(20),
+            lambda: highlow.HighLowEventWindow(15, True),
+            lambda: roc.ROCEventWindow(5),
+            lambda: rsi.RSIEventWindow(14),
+            lambda: linreg.SlopeEventWindow(30),
+            # Holds log values so it keeps its own copy.
+            lambda: hurst.HurstExponentEventWindow(50, 2, 20),
+        ]
+        source = dataseries.SequenceDataSeries()
+        indicators = graph.IndicatorGraph(source)
+        filters = []
+        for buildWindow in windows:
+            filters.append((indicators.add(buildWindow()), technical.EventBasedFilter(source, buildWindow())))
+
+        values = (1000 + np.cumsum(np.random.randn(300))).tolist()
+        values[100] = None
+        for value in values:
+            source.append(value)
+
+        for graphDS, filterDS in filters:
+            self.__assertSeriesEqual(graphDS, filterDS)
+
+    def testDependencies(self):
+        source = dataseries.SequenceDataSeries()
+        indicators = graph.IndicatorGraph(source)
+        stdDev = indicators.add(stats.StdDevEventWindow(10))
+        smaStdDev = indicators.add(ma.SMAEventWindow(5), stdDev)
+        maxStdDev = indicators.add(highlow.HighLowEventWindow(5, False), stdDev)
+
+        expectedStdDev = stats.StdDev(source, 10)
+        expectedSMA = ma.SMA(expectedStdDev, 5)
+        expectedMax = highlow.High(expectedStdDev, 5)
+
+        for value in (100 + np.cumsum(np.random.randn(100))).tolist():
+            source.append(value)
+
+        self.__assertSeriesEqual(stdDev, expectedStdDev)
+        self.__assertSeriesEqual(smaStdDev, expectedSMA)
+        self.__assertSeriesEqual(maxStdDev, expectedMax)
+        self.assertEqual(smaStdDev[:10], [None] * 10)
+
+    def testEvents(self):
+        source = dataseries.SequenceDataSeries()
+        indicators = graph.IndicatorGraph(source)
+        sma = indicators.add(ma.SMAEventWindow(2))
+        crossed = ma.SMA(sma, 2)
+
+        dateTime = datetime.datetime(2015, 1, 1)
+        for value in [1, 2, 3, 4]:
+            dateTime += datetime.timedelta(days=1)
+            source.appendWithDateTime(dateTime, value)
+
+        self.assertEqual(sma[:], [None, 1.5, 2.5, 3.5])
+        self.assertEqual(crossed[:], [None, None, 2, 3])
+        self.assertEqual(sma.getDateTimes(), source.getDateTimes())
+
+    def testBars(self):
+        barDS = bards.BarDataSeries()
+        indicators = graph.IndicatorGraph(barDS)
+        so = indicators.add(stoch.SOEventWindow(5, False))
+        atrDS = indicators.add(atr.ATREventWindow(5, False))
+        expectedSO = technical.EventBasedFilter(barDS, stoch.SOEventWindow(5, False))
+        expectedATR = atr.ATR(barDS, 5)
+
+        dateTime = datetime.datetime(2015, 1, 1)
+        for close in (100 + np.cumsum(np.random.randn(50))).tolist():
+            dateTime += datetime.timedelta(days=1)
+            barDS.append(bar.BasicBar(dateTime, close, close + 1, close - 1, close, 10, None, bar.Frequency.DAY))
+
+        self.__assertSeriesEqual(so, expectedSO)
+        self.__assertSeriesEqual(atrDS, expectedATR)
+
+    def testInvalidInput(self):
+        indicators = graph.IndicatorGraph(dataseries.SequenceDataSeries())
+        with self.assertRaisesRegexp(Exception, "The input is not part of the graph"):
+            indicators.add(ma.SMAEventWindow(2), dataseries.SequenceDataSeries())
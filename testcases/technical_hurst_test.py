@@ -26,9 +26,9 @@ from pyalgotrade.technical import hurst
 from pyalgotrade import dataseries
 
 
-def build_hurst(values, period, minLags, maxLags):
+def build_hurst(values, period, minLags, maxLags, recomputePeriod=1):
     ds = dataseries.SequenceDataSeries()
-    ret = hurst.HurstExponent(ds, period, minLags, maxLags)
+    ret = hurst.HurstExponent(ds, period, minLags, maxLags, recomputePeriod=recomputePeriod)
     for value in values:
         ds.append(value)
     return ret
@@ -70,3 +70,29 @@ class TestCase(common.TestCase):
         hds = build_hurst(values, num_values - 10, 2, 20)
         self.assertEquals(round(hds[-1], 1), 0)
         self.assertEquals(round(hds[-2], 1), 0)
+
+    def testCalculatorMatchesLoop(self):
+        values = np.log10(np.cumsum(np.random.randn(1000)) + 1000)
+        for minLags, maxLags in [(2, 20), (5, 100)]:
+            tau = []
+            lags = range(minLags, maxLags)
+            for lag in lags:
+                tau.append(np.sqrt(np.std(np.subtract(values[lag:], values[:-lag]))))
+            expected = np.polyfit(np.log10(lags), np.log10(tau), 1)[0] * 2
+
+            calculator = hurst.HurstCalculator(len(values), minLags, maxLags)
+            self.assertAlmostEqual(calculator.calculate(values), expected, places=10)
+            # Buffers are reused.
+            self.assertAlmostEqual(calculator.calculate(values[::-1]), hurst.hurst_exp(values[::-1], minLags, maxLags), places=10)
+
+    def testRecomputePeriod(self):
+        values = np.cumsum(np.random.randn(300)) + 1000
+        every = build_hurst(values, 100, 2, 20)
+        hds = build_hurst(values, 100, 2, 20, recomputePeriod=7)
+        self.assertEqual(len(hds), len(every))
+        for i in range(99):
+            self.assertEqual(hds[i], None)
+        for i in range(99, len(values)):
+            # Recomputed on the first value and every 7 values after that.
+            recomputedAt = i - (i - 99) % 7
+            self.assertEqual(hds[i], every[recomputedAt])
@@ -79,3 +79,32 @@ class LeastSquaresRegressionTestCase(common.TestCase):
         nextDateTime = nextDateTime + datetime.timedelta(milliseconds=50)
         seqDS.appendWithDateTime(nextDateTime, 5)
         self.assertEqual(round(lsReg[-1], 2), 5)
+
+    def testFlatRegression(self):
+        seqDS = dataseries.SequenceDataSeries()
+        regression = linreg.LeastSquaresRegression(seqDS, 10)
+        nextDateTime = datetime.datetime(2012, 1, 1)
+        for i in range(25):
+            nextDateTime = nextDateTime + datetime.timedelta(minutes=1 + (i * 7) % 5)
+            seqDS.appendWithDateTime(nextDateTime, 10.37)
+        self.assertEqual(regression[-1], 10.37)
+        self.assertEqual(regression.getValueAt(nextDateTime + datetime.timedelta(days=100)), 10.37)
+
+    def testRunningRegression(self):
+        seqDS = dataseries.SequenceDataSeries()
+        running = linreg.LeastSquaresRegression(seqDS, 10)
+        noResync = linreg.LeastSquaresRegression(seqDS, 10, resyncPeriod=1000000)
+        exact = linreg.LeastSquaresRegression(seqDS, 10, exact=True)
+
+        nextDateTime = datetime.datetime(2012, 1, 1)
+        for i in range(500):
+            # Irregular steps and values.
+            nextDateTime = nextDateTime + datetime.timedelta(minutes=1 + (i * 7) % 5)
+            seqDS.appendWithDateTime(nextDateTime, 100 + ((i * 13) % 17) / 3.0)
+            if exact[-1] is None:
+                self.assertEqual(running[-1], None)
+            else:
+                self.assertAlmostEqual(running[-1], exact[-1], places=5)
+                self.assertAlmostEqual(noResync[-1], exact[-1], places=5)
+        futureDateTime = nextDateTime + datetime.timedelta(hours=1)
+        self.assertAlmostEqual(running.getValueAt(futureDateTime), exact.getValueAt(futureDateTime), places=5)
@@ -70,3 +70,42 @@ class TestCase(common.TestCase):
             if i >= 4:
                 self.assertEqual(round(zscore[-1], 4), round(expected[i], 4))
             i += 1
+
+    def __testAgainstNumPy(self, period, ddof, resyncPeriod, tolerance):
+        numpy.random.seed(1)
+        # Large offset and small changes, like prices, to make rounding errors show up.
+        values = 1000 + numpy.random.randn(2000).cumsum() * 0.01
+        seqDS = dataseries.SequenceDataSeries()
+        variance = stats.Variance(seqDS, period, ddof, resyncPeriod=resyncPeriod)
+        stdDev = stats.StdDev(seqDS, period, ddof, resyncPeriod=resyncPeriod)
+        zscore = stats.ZScore(seqDS, period, ddof, resyncPeriod=resyncPeriod)
+        for i, value in enumerate(values):
+            seqDS.append(value)
+            if i < period - 1:
+                self.assertEqual(variance[-1], None)
+                self.assertEqual(stdDev[-1], None)
+                continue
+            window = values[i - period + 1:i + 1]
+            self.assertTrue(abs(variance[-1] - window.var(ddof=ddof)) <= tolerance * window.var(ddof=ddof))
+            self.assertTrue(abs(stdDev[-1] - window.std(ddof=ddof)) <= tolerance * window.std(ddof=ddof))
+            expectedZScore = (window[-1] - window.mean()) / window.std(ddof=ddof)
+            self.assertTrue(abs(zscore[-1] - expectedZScore) <= tolerance * max(1, abs(expectedZScore)))
+
+    def testRunningMoments(self):
+        self.__testAgainstNumPy(20, 0, None, 1e-7)
+        self.__testAgainstNumPy(20, 1, None, 1e-7)
+        self.__testAgainstNumPy(3, 0, None, 1e-7)
+        self.__testAgainstNumPy(50, 1, 7, 1e-7)
+        # Without resyncing, rounding errors accumulate.
+        self.__testAgainstNumPy(20, 0, 100000, 1e-6)
+
+    def testVarianceSkipNone(self):
+        seqDS = dataseries.SequenceDataSeries()
+        variance = stats.Variance(seqDS, 3)
+        for value in [1, None, 2, 4, None, 8]:
+            seqDS.append(value)
+        self.assertEqual(variance[2], None)
+        self.assertEqual(variance[3], numpy.array([1, 2, 4]).var())
+        self.assertEqual(variance[4], numpy.array([1, 2, 4]).var())
+        self.assertEqual(variance[5], numpy.array([2, 4, 8]).var())
+
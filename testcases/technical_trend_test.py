@@ -45,6 +45,20 @@ class SlopeTest(common.TestCase):
         self.assertEqual(slope[0], 0.0)
         self.assertEqual(slope[1], -1.0)
 
+    def testRunningSlope(self):
+        values = [100 + ((i * 13) % 17) / 3.0 for i in range(500)]
+        for period in (2, 3, 20):
+            seqDS = dataseries.SequenceDataSeries()
+            running = linreg.Slope(seqDS, period)
+            exact = linreg.Slope(seqDS, period, exact=True)
+            for value in values:
+                seqDS.append(value)
+            for i in range(len(exact)):
+                if exact[i] is None:
+                    self.assertEqual(running[i], None)
+                else:
+                    self.assertAlmostEqual(running[i], exact[i], places=9)
+
 
 class TrendTest(common.TestCase):
     def __buildTrend(self, values, trendDays, positiveThreshold, negativeThreshold, trendMaxLen=dataseries.DEFAULT_MAX_LEN):
@@ -84,6 +98,19 @@ class TrendTest(common.TestCase):
         self.assertEqual(trend[1], False)
         self.assertEqual(len(trend), 2)
 
+    def testFlatTrend(self):
+        values = [10.37] * 25 + [10.38]
+        for resyncPeriod in (None, 1, 1000000):
+            seqDS = dataseries.SequenceDataSeries()
+            trend = linreg.Trend(seqDS, 10, resyncPeriod=resyncPeriod)
+            slope = linreg.Slope(seqDS, 10, resyncPeriod=resyncPeriod)
+            for value in values:
+                seqDS.append(value)
+            for i in range(9, 25):
+                self.assertEqual(trend[i], None)
+                self.assertEqual(slope[i], 0.0)
+            self.assertEqual(trend[-1], True)
+
     def testInvalidThreshold(self):
         seqDS = dataseries.SequenceDataSeries()
         with self.assertRaisesRegexp(Exception, "Invalid thresholds"):
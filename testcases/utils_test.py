@@ -20,6 +20,8 @@
 
 import datetime
 
+import pytz
+
 import common
 
 from pyalgotrade import utils
@@ -207,6 +209,33 @@ class CollectionTestCaseBase(common.TestCase):
         self.assertEqual(d[-1], 2)
         self.assertEqual(d[-2], 1)
 
+    def _testWrapAroundImpl(self):
+        d = self.buildCollection(7)
+        for i in range(50):
+            d.append(i)
+            expected = range(max(0, i - 6), i + 1)
+            self.assertEqual(len(d), len(expected))
+            self.assertEqual(list(d.data()), expected)
+            self.assertEqual(list(d[1:-1]), expected[1:-1])
+            self.assertEqual(d[-1], i)
+            self.assertEqual(d[0], expected[0])
+            self.assertEqual(d[len(expected) - 1], i)
+            with self.assertRaises(IndexError):
+                d[len(expected)]
+            with self.assertRaises(IndexError):
+                d[-len(expected) - 1]
+
+        # Resize after wrapping around.
+        d.resize(3)
+        self.assertEqual(list(d.data()), [47, 48, 49])
+        d.append(50)
+        self.assertEqual(list(d.data()), [48, 49, 50])
+        d.resize(5)
+        d.append(51)
+        d.append(52)
+        d.append(53)
+        self.assertEqual(list(d.data()), [49, 50, 51, 52, 53])
+
     def _testResizeImpl(self):
         d = self.buildCollection(10)
 
@@ -286,6 +315,9 @@ class NumPyDequeTestCase(CollectionTestCaseBase):
     def testBasicOps(self):
         CollectionTestCaseBase._testBasicOpsImpl(self)
 
+    def testWrapAround(self):
+        CollectionTestCaseBase._testWrapAroundImpl(self)
+
     def testResize(self):
         CollectionTestCaseBase._testResizeImpl(self)
 
@@ -307,6 +339,9 @@ class ListDequeTestCase(CollectionTestCaseBase):
     def testBasicOps(self):
         CollectionTestCaseBase._testBasicOpsImpl(self)
 
+    def testWrapAround(self):
+        CollectionTestCaseBase._testWrapAroundImpl(self)
+
     def testResize(self):
         CollectionTestCaseBase._testResizeImpl(self)
 
@@ -314,6 +349,96 @@ class ListDequeTestCase(CollectionTestCaseBase):
         CollectionTestCaseBase._testResizeEmptyImpl(self)
 
 
+class NumPyColumnDequeTestCase(common.TestCase):
+    def testWrapAround(self):
+        d = collections.NumPyColumnDeque(7, 2)
+        self.assertEqual(d.getMaxLen(), 7)
+        for i in range(50):
+            d.append((i, -i))
+            expected = range(max(0, i - 6), i + 1)
+            self.assertEqual(len(d), len(expected))
+            self.assertEqual(d.column(0).tolist(), expected)
+            self.assertEqual(d.column(1).tolist(), [-value for value in expected])
+            self.assertEqual(d.data().shape, (2, len(expected)))
+            self.assertTrue(d.column(1).flags["C_CONTIGUOUS"])
+
+    def testResize(self):
+        d = collections.NumPyColumnDeque(10, 2)
+        d.resize(5)
+        self.assertEqual(len(d), 0)
+        for i in range(20):
+            d.append((i, i * 2))
+
+        d.resize(3)
+        self.assertEqual(d.column(0).tolist(), [17, 18, 19])
+        self.assertEqual(d.column(1).tolist(), [34, 36, 38])
+
+        d.resize(10)
+        d.append((20, 40))
+        self.assertEqual(d.column(0).tolist(), [17, 18, 19, 20])
+        self.assertEqual(d.column(1).tolist(), [34, 36, 38, 40])
+
+
+class NumPyDequeViewTestCase(common.TestCase):
+    def testSharedValues(self):
+        shared = collections.SharedNumPyDeque(6)
+        view1 = collections.NumPyDequeView(shared, 3)
+        view2 = collections.NumPyDequeView(shared, 5)
+        for i in range(20):
+            shared.append(i)
+            # Views still show the previous values until the value is appended to them.
+            self.assertEqual(view1.data().tolist(), range(max(0, i - 3), i))
+            view1.append(i)
+            view2.append(i)
+            self.assertEqual(view1.data().tolist(), range(max(0, i - 2), i + 1))
+            self.assertEqual(view2.data().tolist(), range(max(0, i - 4), i + 1))
+            self.assertEqual(len(view1), min(i + 1, 3))
+        self.assertTrue(view1.isShared())
+        self.assertTrue(view2.isShared())
+
+    def testDetach(self):
+        shared = collections.SharedNumPyDeque(4)
+        view = collections.NumPyDequeView(shared, 3)
+        for i in range(5):
+            shared.append(i)
+            view.append(i)
+        shared.append(5)
+        view.append(50)
+        self.assertFalse(view.isShared())
+        self.assertEqual(view.data().tolist(), [3, 4, 50])
+        shared.append(6)
+        view.append(60)
+        self.assertEqual(view[-1], 60)
+        self.assertEqual(view.data().tolist(), [4, 50, 60])
+
+
+class MonotonicDequeTestCase(common.TestCase):
+    def __testAgainstScan(self, maxLen, values):
+        maxDeque = collections.MonotonicDeque(maxLen)
+        minDeque = collections.MonotonicDeque(maxLen, True)
+        self.assertEqual(maxDeque.getValue(), None)
+        for i, value in enumerate(values):
+            maxDeque.append(value)
+            minDeque.append(value)
+            window = values[max(0, i - maxLen + 1):i + 1]
+            self.assertEqual(len(maxDeque), len(window))
+            self.assertEqual(maxDeque.getValue(), max(window))
+            self.assertEqual(minDeque.getValue(), min(window))
+
+    def testMonotonicValues(self):
+        values = range(50)
+        self.__testAgainstScan(7, values)
+        self.__testAgainstScan(7, values[::-1])
+
+    def testRepeatedValues(self):
+        self.__testAgainstScan(3, [1, 1, 2, 2, 2, 1, 1, 3, 3, 0, 0, 0, 0])
+
+    def testRandomValues(self):
+        values = [(i * 7919) % 101 for i in range(500)]
+        for maxLen in (1, 2, 10, 100):
+            self.__testAgainstScan(maxLen, values)
+
+
 class DateTimeTestCase(common.TestCase):
     def testTimeStampConversions(self):
         dateTime = datetime.datetime(2000, 1, 1)
@@ -329,6 +454,16 @@ class DateTimeTestCase(common.TestCase):
         dateTime = dt.as_utc(datetime.datetime(2000, 1, 1, 1, 1, 1, microsecond=10))
         self.assertEqual(dt.timestamp_to_datetime(dt.datetime_to_timestamp(dateTime), True), dateTime)
 
+    def testMicrosecondConversions(self):
+        dateTime = datetime.datetime(2000, 1, 1, 1, 1, 1, microsecond=10)
+        self.assertEqual(dt.microseconds_to_datetime(dt.datetime_to_microseconds(dateTime)), dateTime)
+        self.assertEqual(dt.datetime_to_microseconds(datetime.datetime(1970, 1, 1, 0, 0, 1)), 1000000)
+
+        timeZone = pytz.timezone("US/Eastern")
+        dateTime = dt.localize(datetime.datetime(2000, 7, 1, 1, 1, 1, microsecond=10), timeZone)
+        self.assertEqual(dt.datetime_to_microseconds(dateTime), dt.datetime_to_microseconds(dt.as_utc(dateTime)))
+        self.assertEqual(dt.microseconds_to_datetime(dt.datetime_to_microseconds(dateTime), timeZone), dateTime)
+
     def testGetFirstMonday(self):
         self.assertEquals(dt.get_first_monday(2010), datetime.date(2010, 1, 4))
         self.assertEquals(dt.get_first_monday(2011), datetime.date(2011, 1, 3))
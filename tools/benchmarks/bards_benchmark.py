@@ -0,0 +1,90 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Bars appended per second to pyalgotrade.dataseries.bards.BarDataSeries, compared with the previous implementation that
+# appended every value to its own SequenceDataSeries.
+# Usage: python bards_benchmark.py
+
+import sys
+sys.path.append("../..")
+
+import datetime
+import time
+
+from pyalgotrade import bar
+from pyalgotrade import dataseries
+from pyalgotrade.dataseries import bards
+
+
+class SequenceBarDataSeries(dataseries.SequenceDataSeries):
+    def __init__(self, maxLen=dataseries.DEFAULT_MAX_LEN):
+        dataseries.SequenceDataSeries.__init__(self, maxLen)
+        self.__openDS = dataseries.SequenceDataSeries(maxLen)
+        self.__closeDS = dataseries.SequenceDataSeries(maxLen)
+        self.__highDS = dataseries.SequenceDataSeries(maxLen)
+        self.__lowDS = dataseries.SequenceDataSeries(maxLen)
+        self.__volumeDS = dataseries.SequenceDataSeries(maxLen)
+        self.__adjCloseDS = dataseries.SequenceDataSeries(maxLen)
+
+    def append(self, bar):
+        self.appendWithDateTime(bar.getDateTime(), bar)
+
+    def appendWithDateTime(self, dateTime, bar):
+        dataseries.SequenceDataSeries.appendWithDateTime(self, dateTime, bar)
+        self.__openDS.appendWithDateTime(dateTime, bar.getOpen())
+        self.__closeDS.appendWithDateTime(dateTime, bar.getClose())
+        self.__highDS.appendWithDateTime(dateTime, bar.getHigh())
+        self.__lowDS.appendWithDateTime(dateTime, bar.getLow())
+        self.__volumeDS.appendWithDateTime(dateTime, bar.getVolume())
+        self.__adjCloseDS.appendWithDateTime(dateTime, bar.getAdjClose())
+
+    def getCloseDataSeries(self):
+        return self.__closeDS
+
+
+def buildBars(count):
+    begin = datetime.datetime(2000, 1, 1)
+    return [
+        bar.BasicBar(begin + datetime.timedelta(minutes=i), 10, 12, 9, 11, 100, 11, bar.Frequency.MINUTE)
+        for i in xrange(count)
+    ]
+
+
+def appendsPerSecond(ds, bars, subscribe):
+    if subscribe:
+        ds.getCloseDataSeries().getNewValueEvent().subscribe(lambda ds, dateTime, value: None)
+    begin = time.time()
+    for bar_ in bars:
+        ds.append(bar_)
+    return len(bars) / (time.time() - begin)
+
+
+def main():
+    bars = buildBars(100000)
+    implementations = [
+        ("BarDataSeries", bards.BarDataSeries),
+        ("SequenceDataSeries x6", SequenceBarDataSeries),
+    ]
+    print "%-22s %16s %28s" % ("", "appends/sec", "appends/sec (close handler)")
+    for name, factory in implementations:
+        print "%-22s %16.0f %28.0f" % (name, appendsPerSecond(factory(), bars, False), appendsPerSecond(factory(), bars, True))
+
+
+if __name__ == "__main__":
+    main()
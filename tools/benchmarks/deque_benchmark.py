@@ -0,0 +1,99 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. moduleauthor:: Gabriel Martin Becedillas Ruiz <gabriel.becedillas@gmail.com>
+"""
+
+# Appends per second for the deques in pyalgotrade.utils.collections, compared with the previous implementations that
+# shifted every value on each append once full.
+# Usage: python deque_benchmark.py
+
+import sys
+sys.path.append("../..")
+
+import time
+
+import numpy as np
+
+from pyalgotrade.utils import collections
+
+
+class ShiftNumPyDeque(object):
+    def __init__(self, maxLen):
+        self.__values = np.empty(maxLen)
+        self.__maxLen = maxLen
+        self.__nextPos = 0
+
+    def append(self, value):
+        if self.__nextPos < self.__maxLen:
+            self.__values[self.__nextPos] = value
+            self.__nextPos += 1
+        else:
+            self.__values[0:-1] = self.__values[1:]
+            self.__values[self.__nextPos - 1] = value
+
+    def data(self):
+        return self.__values[0:self.__nextPos]
+
+
+class PopListDeque(object):
+    def __init__(self, maxLen):
+        self.__values = []
+        self.__maxLen = maxLen
+
+    def append(self, value):
+        self.__values.append(value)
+        if len(self.__values) > self.__maxLen:
+            self.__values.pop(0)
+
+    def data(self):
+        return self.__values
+
+
+def appendsPerSecond(deque, maxLen, callData):
+    # Fill it first so that every measured append has to discard a value.
+    for i in xrange(maxLen):
+        deque.append(float(i))
+    count = 200000
+    begin = time.time()
+    if callData:
+        for i in xrange(count):
+            deque.append(float(i))
+            deque.data()
+    else:
+        for i in xrange(count):
+            deque.append(float(i))
+    return count / (time.time() - begin)
+
+
+def main():
+    implementations = [
+        ("NumPyDeque", lambda maxLen: collections.NumPyDeque(maxLen)),
+        ("NumPyDeque (shift)", ShiftNumPyDeque),
+        ("ListDeque", lambda maxLen: collections.ListDeque(maxLen)),
+        ("ListDeque (pop(0))", PopListDeque),
+    ]
+    print "%-20s %8s %16s %22s" % ("", "maxLen", "appends/sec", "append+data()/sec")
+    for maxLen in (1024, 100000):
+        for name, factory in implementations:
+            print "%-20s %8d %16.0f %22.0f" % (
+                name, maxLen, appendsPerSecond(factory(maxLen), maxLen, False), appendsPerSecond(factory(maxLen), maxLen, True)
+            )
+
+
+if __name__ == "__main__":
+    main()
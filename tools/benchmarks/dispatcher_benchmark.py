@@ -0,0 +1,129 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Events per second dispatched by pyalgotrade.dispatcher.Dispatcher following the precomputed timeline and polling every
+# subject, for:
+# - A backtest with a bar feed and a broker, where most of the time is spent handling the bars.
+# - Many lightweight subjects, where the time is spent in the dispatcher itself.
+# Usage: python dispatcher_benchmark.py [instruments] [bars] [subjects]
+
+import sys
+sys.path.append("../..")
+
+import datetime
+
+from pyalgotrade import bar
+from pyalgotrade import dispatcher
+from pyalgotrade import observer
+from pyalgotrade.barfeed import membf
+from pyalgotrade.broker import backtesting
+
+
+class BarFeed(membf.BarFeed):
+    def barsHaveAdjClose(self):
+        return True
+
+
+class Subject(observer.Subject):
+    def __init__(self, dateTimes):
+        self.__dateTimes = dateTimes
+        self.__nextPos = 0
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def join(self):
+        pass
+
+    def eof(self):
+        return self.__nextPos >= len(self.__dateTimes)
+
+    def dispatch(self):
+        self.__nextPos += 1
+        return True
+
+    def peekDateTime(self):
+        ret = None
+        if self.__nextPos < len(self.__dateTimes):
+            ret = self.__dateTimes[self.__nextPos]
+        return ret
+
+    def getDispatchDateTimes(self):
+        return self.__dateTimes[self.__nextPos:]
+
+
+def buildBarFeed(instruments, count):
+    barFeed = BarFeed(bar.Frequency.MINUTE)
+    begin = datetime.datetime(2000, 1, 1)
+    for i in xrange(instruments):
+        # Every instrument trades on a different minute so most of the events carry a single bar.
+        bars = [
+            bar.BasicBar(begin + datetime.timedelta(minutes=j * instruments + i), 10, 12, 9, 11, 100, 11, bar.Frequency.MINUTE)
+            for j in xrange(count)
+        ]
+        barFeed.addBarsFromSequence("instrument-%d" % i, bars)
+    return barFeed
+
+
+def buildSubjects(subjects, count):
+    begin = datetime.datetime(2000, 1, 1)
+    return [
+        [begin + datetime.timedelta(minutes=j * subjects + i) for j in xrange(count)]
+        for i in xrange(subjects)
+    ]
+
+
+def run(disp):
+    disp.run()
+    return disp.getEventsDispatched(), disp.getEventsPerSecond()
+
+
+def backtestEventsPerSecond(barFeed, useTimeline):
+    barFeed.reset()
+    disp = dispatcher.Dispatcher(useTimeline)
+    disp.addSubject(backtesting.Broker(1000000, barFeed))
+    disp.addSubject(barFeed)
+    return run(disp)
+
+
+def subjectsEventsPerSecond(dateTimes, useTimeline):
+    disp = dispatcher.Dispatcher(useTimeline)
+    for subjectDateTimes in dateTimes:
+        disp.addSubject(Subject(subjectDateTimes))
+    return run(disp)
+
+
+def main():
+    instruments = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    subjects = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    barFeed = buildBarFeed(instruments, count)
+    dateTimes = buildSubjects(subjects, count)
+    for name, useTimeline in (("timeline", True), ("polling", False)):
+        events, rate = backtestEventsPerSecond(barFeed, useTimeline)
+        print "backtest, %-10s %8d events: %10.0f events/sec" % (name, events, rate)
+        events, rate = subjectsEventsPerSecond(dateTimes, useTimeline)
+        print "subjects, %-10s %8d events: %10.0f events/sec" % (name, events, rate)
+
+
+if __name__ == "__main__":
+    main()
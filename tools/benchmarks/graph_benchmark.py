@@ -0,0 +1,86 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Values per second for ten indicators over the same DataSeries, calculated by a
+# pyalgotrade.technical.graph.IndicatorGraph compared with one EventBasedFilter per indicator.
+# Usage: python graph_benchmark.py
+
+import sys
+sys.path.append("../..")
+
+import time
+
+import numpy as np
+
+from pyalgotrade import dataseries
+from pyalgotrade import technical
+from pyalgotrade.technical import graph
+from pyalgotrade.technical import highlow
+from pyalgotrade.technical import ma
+from pyalgotrade.technical import roc
+from pyalgotrade.technical import rsi
+from pyalgotrade.technical import stats
+
+
+def buildWindows():
+    return [
+        ma.SMAEventWindow(10),
+        ma.SMAEventWindow(50),
+        ma.EMAEventWindow(20),
+        stats.StdDevEventWindow(20),
+        stats.ZScoreEventWindow(50, 0),
+        highlow.HighLowEventWindow(20, False),
+        highlow.HighLowEventWindow(20, True),
+        roc.ROCEventWindow(10),
+        rsi.RSIEventWindow(14),
+        ma.EMAEventWindow(50),
+    ]
+
+
+def filtersValuesPerSecond(values):
+    ds = dataseries.SequenceDataSeries()
+    for eventWindow in buildWindows():
+        technical.EventBasedFilter(ds, eventWindow)
+    begin = time.time()
+    for value in values:
+        ds.append(value)
+    return len(values) / (time.time() - begin)
+
+
+def graphValuesPerSecond(values):
+    ds = dataseries.SequenceDataSeries()
+    indicators = graph.IndicatorGraph(ds)
+    for eventWindow in buildWindows():
+        indicators.add(eventWindow)
+    begin = time.time()
+    for value in values:
+        ds.append(value)
+    return len(values) / (time.time() - begin)
+
+
+def main():
+    np.random.seed(0)
+    values = (1000 + np.random.randn(50000).cumsum()).tolist()
+    print "%-16s %10s" % ("", "values/sec")
+    print "%-16s %10.0f" % ("IndicatorGraph", graphValuesPerSecond(values))
+    print "%-16s %10.0f" % ("EventBasedFilter", filtersValuesPerSecond(values))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Values per second processed by the rolling maximum/minimum windows in pyalgotrade.technical.highlow and
+# pyalgotrade.technical.stoch, that keep a monotonic deque, compared with the previous event windows that scanned the
+# whole window on every value.
+# Usage: python highlow_benchmark.py
+
+import sys
+sys.path.append("../..")
+
+import datetime
+import time
+
+import numpy as np
+
+from pyalgotrade import bar
+from pyalgotrade import technical
+from pyalgotrade.technical import highlow
+from pyalgotrade.technical import stoch
+
+
+class ScanHighLowEventWindow(technical.EventWindow):
+    def __init__(self, windowSize, useMin):
+        technical.EventWindow.__init__(self, windowSize)
+        self.__useMin = useMin
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            values = self.getValues()
+            if self.__useMin:
+                ret = values.min()
+            else:
+                ret = values.max()
+        return ret
+
+
+class ScanSOEventWindow(technical.EventWindow):
+    def __init__(self, period, useAdjustedValues):
+        technical.EventWindow.__init__(self, period, dtype=object)
+        self.__barWrapper = stoch.BarWrapper(useAdjustedValues)
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            bars = self.getValues()
+            lowestLow = min(self.__barWrapper.getLow(bar_) for bar_ in bars)
+            highestHigh = max(self.__barWrapper.getHigh(bar_) for bar_ in bars)
+            currentClose = self.__barWrapper.getClose(bars[-1])
+            closeDelta = currentClose - lowestLow
+            if closeDelta:
+                ret = closeDelta / float(highestHigh - lowestLow) * 100
+            else:
+                ret = 0.0
+        return ret
+
+
+def windowValuesPerSecond(values, window):
+    begin = time.time()
+    for value in values:
+        window.onNewValue(None, value)
+        window.getValue()
+    return len(values) / (time.time() - begin)
+
+
+def buildBars(closes):
+    ret = []
+    dateTime = datetime.datetime(2000, 1, 1)
+    for close in closes:
+        ret.append(bar.BasicBar(dateTime, close, close + 1, close - 1, close, 1000, None, bar.Frequency.DAY))
+        dateTime += datetime.timedelta(days=1)
+    return ret
+
+
+def main():
+    np.random.seed(0)
+    values = (100 + np.random.randn(20000).cumsum()).tolist()
+    bars = buildBars(values)
+    implementations = [
+        ("High", values, lambda period: highlow.HighLowEventWindow(period, False)),
+        ("High (scan)", values, lambda period: ScanHighLowEventWindow(period, False)),
+        ("Stochastic", bars, lambda period: stoch.SOEventWindow(period, False)),
+        ("Stochastic (scan)", bars, lambda period: ScanSOEventWindow(period, False)),
+    ]
+    print "%-20s %8s %18s" % ("", "period", "window values/sec")
+    for period in (14, 200, 2000):
+        for name, inputs, buildWindow in implementations:
+            rate = windowValuesPerSecond(inputs, buildWindow(period))
+            print "%-20s %8d %18.0f" % (name, period, rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Values per second processed by pyalgotrade.technical.hurst.HurstExponent, that calculates all the lags in one
+# vectorized pass, compared with the previous event window that looped over the lags and called numpy.polyfit.
+# Usage: python hurst_benchmark.py
+
+import sys
+sys.path.append("../..")
+
+import time
+
+import numpy as np
+
+from pyalgotrade import dataseries
+from pyalgotrade import technical
+from pyalgotrade.technical import hurst
+
+
+def loop_hurst_exp(p, minLags, maxLags):
+    tau = []
+    lagvec = []
+    for lag in range(minLags, maxLags):
+        pp = np.subtract(p[lag:], p[:-lag])
+        lagvec.append(lag)
+        tau.append(np.sqrt(np.std(pp)))
+    m = np.polyfit(np.log10(lagvec), np.log10(tau), 1)
+    return m[0]*2
+
+
+class LoopHurstExponentEventWindow(technical.EventWindow):
+    def __init__(self, period, minLags, maxLags):
+        technical.EventWindow.__init__(self, period)
+        self.__minLags = minLags
+        self.__maxLags = maxLags
+
+    def onNewValue(self, dateTime, value):
+        if value is not None:
+            value = np.log10(value)
+        technical.EventWindow.onNewValue(self, dateTime, value)
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            ret = loop_hurst_exp(self.getValues(), self.__minLags, self.__maxLags)
+        return ret
+
+
+def valuesPerSecond(values, buildFilter):
+    ds = dataseries.SequenceDataSeries()
+    buildFilter(ds)
+    begin = time.time()
+    for value in values:
+        ds.append(value)
+    return len(values) / (time.time() - begin)
+
+
+def main():
+    np.random.seed(0)
+    values = (1000 + np.random.randn(5000).cumsum()).tolist()
+    implementations = [
+        ("HurstExponent", lambda ds, period: hurst.HurstExponent(ds, period)),
+        ("HurstExponent (k=10)", lambda ds, period: hurst.HurstExponent(ds, period, recomputePeriod=10)),
+        ("HurstExponent (loop)", lambda ds, period: technical.EventBasedFilter(ds, LoopHurstExponentEventWindow(period, 2, 20))),
+    ]
+    print "%-22s %8s %18s" % ("", "period", "filter values/sec")
+    for period in (100, 1000):
+        for name, buildFilter in implementations:
+            rate = valuesPerSecond(values, lambda ds: buildFilter(ds, period))
+            print "%-22s %8d %18.0f" % (name, period, rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Values per second processed by the pyalgotrade.technical.linreg filters, that keep the regression up to date as
+# values are added and removed, compared with exact=True, that calls scipy.stats.linregress over the whole window on
+# every value like the previous implementation did.
+# Usage: python linreg_benchmark.py
+
+import sys
+sys.path.append("../..")
+
+import datetime
+import time
+
+import numpy as np
+
+from pyalgotrade import dataseries
+from pyalgotrade.technical import linreg
+
+
+def valuesPerSecond(values, buildFilter):
+    ds = dataseries.SequenceDataSeries()
+    buildFilter(ds)
+    dateTime = datetime.datetime(2000, 1, 1)
+    begin = time.time()
+    for value in values:
+        dateTime += datetime.timedelta(minutes=1)
+        ds.appendWithDateTime(dateTime, value)
+    return len(values) / (time.time() - begin)
+
+
+def main():
+    np.random.seed(0)
+    values = (100 + np.random.randn(20000).cumsum()).tolist()
+    implementations = [
+        ("Slope", lambda ds, period: linreg.Slope(ds, period)),
+        ("Slope (exact)", lambda ds, period: linreg.Slope(ds, period, exact=True)),
+        ("LSRegression", lambda ds, period: linreg.LeastSquaresRegression(ds, period)),
+        ("LSRegression (exact)", lambda ds, period: linreg.LeastSquaresRegression(ds, period, exact=True)),
+    ]
+    print "%-22s %8s %18s" % ("", "period", "filter values/sec")
+    for period in (20, 200, 2000):
+        for name, buildFilter in implementations:
+            rate = valuesPerSecond(values, lambda ds: buildFilter(ds, period))
+            print "%-22s %8d %18.0f" % (name, period, rate)
+
+
+if __name__ == "__main__":
+    main()
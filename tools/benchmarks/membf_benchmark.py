@@ -0,0 +1,73 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Bars per second returned by pyalgotrade.barfeed.membf.BarFeed for a large universe of instruments, where most
+# instruments have a bar at every timestamp.
+# Usage: python membf_benchmark.py [instruments] [days]
+
+import sys
+sys.path.append("../..")
+
+import datetime
+import random
+import time
+
+from pyalgotrade import bar
+from pyalgotrade.barfeed import membf
+
+
+class BarFeed(membf.BarFeed):
+    def barsHaveAdjClose(self):
+        return True
+
+
+def buildBarFeed(instruments, days):
+    random.seed(0)
+    barFeed = BarFeed(bar.Frequency.DAY)
+    begin = datetime.datetime(2000, 1, 1)
+    bar_ = None
+    for i in xrange(instruments):
+        bars = []
+        for day in xrange(days):
+            # Leave some gaps so that not every instrument has a bar on every day.
+            if random.random() < 0.95:
+                bars.append(bar.BasicBar(begin + datetime.timedelta(days=day), 10, 12, 9, 11, 100, 11, bar.Frequency.DAY))
+        barFeed.addBarsFromSequence("instrument-%d" % i, bars)
+    return barFeed
+
+
+def barsPerSecond(barFeed):
+    barFeed.reset()
+    count = 0
+    begin = time.time()
+    while not barFeed.eof():
+        count += len(barFeed.getNextBars().getInstruments())
+    return count, count / (time.time() - begin)
+
+
+def main():
+    instruments = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    barFeed = buildBarFeed(instruments, days)
+    count, rate = barsPerSecond(barFeed)
+    print "%d instruments, %d bars: %.0f bars/sec" % (instruments, count, rate)
+
+
+if __name__ == "__main__":
+    main()
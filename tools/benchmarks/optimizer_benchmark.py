@@ -0,0 +1,189 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Strategy executions per second in pyalgotrade.optimizer for very short strategies, where the cost of moving bars,
+# parameters and results between the server and the workers dominates, using the binary protocol compared with the
+# XML-RPC server and worker that optimizer used before.
+# Usage: python optimizer_benchmark.py
+
+import sys
+sys.path.append("../..")
+
+import SimpleXMLRPCServer
+import datetime
+import logging
+import multiprocessing
+import pickle
+import threading
+import time
+import xmlrpclib
+
+from pyalgotrade import bar
+from pyalgotrade import barfeed
+from pyalgotrade.barfeed import membf
+from pyalgotrade.optimizer import local
+from pyalgotrade.optimizer import server
+from pyalgotrade.optimizer import worker
+
+
+class Feed(membf.BarFeed):
+    def barsHaveAdjClose(self):
+        return False
+
+
+def buildFeed(days):
+    ret = Feed(bar.Frequency.DAY)
+    bars = []
+    dateTime = datetime.datetime(2000, 1, 1)
+    for i in range(days):
+        bars.append(bar.BasicBar(dateTime, 10, 11, 9, 10, 1000, None, bar.Frequency.DAY))
+        dateTime += datetime.timedelta(days=1)
+    ret.addBarsFromSequence("orcl", bars)
+    return ret
+
+
+def runStrategy(barFeed, duration, parameter):
+    # Wrapping the bars into a feed is part of every execution, the strategy itself only takes duration seconds.
+    if duration:
+        time.sleep(duration)
+    return parameter
+
+
+# The XML-RPC server and worker, with every argument pickled and a fixed batch size.
+class XmlRpcServer(SimpleXMLRPCServer.SimpleXMLRPCServer):
+    batchSize = 200
+
+    def __init__(self, port, barFeed, parameters):
+        SimpleXMLRPCServer.SimpleXMLRPCServer.__init__(self, ("localhost", port), logRequests=False, allow_none=True)
+        loadedBars = [bars for dateTime, bars in barFeed]
+        self.__instrumentsAndBars = pickle.dumps((barFeed.getRegisteredInstruments(), loadedBars))
+        self.__barsFreq = barFeed.getFrequency()
+        self.__parametersIterator = iter(parameters)
+        self.__lock = threading.Lock()
+        self.__results = []
+        self.register_function(self.getInstrumentsAndBars, "getInstrumentsAndBars")
+        self.register_function(self.getBarsFrequency, "getBarsFrequency")
+        self.register_function(self.getNextJob, "getNextJob")
+        self.register_function(self.pushJobResults, "pushJobResults")
+
+    def getInstrumentsAndBars(self):
+        return self.__instrumentsAndBars
+
+    def getBarsFrequency(self):
+        return str(self.__barsFreq)
+
+    def getNextJob(self):
+        with self.__lock:
+            params = []
+            for i in xrange(XmlRpcServer.batchSize):
+                try:
+                    params.append(self.__parametersIterator.next())
+                except StopIteration:
+                    break
+        ret = None
+        if len(params):
+            ret = server.Job(params)
+        return pickle.dumps(ret)
+
+    def pushJobResults(self, jobId, result, parameters, workerName):
+        with self.__lock:
+            self.__results.append((pickle.loads(result), pickle.loads(parameters)))
+
+
+def xmlrpc_worker_process(port, duration):
+    proxy = xmlrpclib.ServerProxy("http://localhost:%d" % port, allow_none=True)
+    instruments, bars = pickle.loads(proxy.getInstrumentsAndBars())
+    barsFreq = int(proxy.getBarsFrequency())
+    job = pickle.loads(proxy.getNextJob())
+    while job is not None:
+        bestResult = None
+        bestParams = None
+        parameters = job.getNextParameters()
+        while parameters is not None:
+            result = runStrategy(barfeed.OptimizerBarFeed(barsFreq, instruments, bars), duration, *parameters)
+            if bestResult is None or result > bestResult:
+                bestResult = result
+                bestParams = parameters
+            parameters = job.getNextParameters()
+        proxy.pushJobResults(pickle.dumps(job.getId()), pickle.dumps(bestResult), pickle.dumps(bestParams), pickle.dumps("worker"))
+        job = pickle.loads(proxy.getNextJob())
+
+
+def worker_process(port, duration):
+    class Worker(worker.Worker):
+        def runStrategy(self, barFeed, *parameters):
+            return runStrategy(barFeed, duration, *parameters)
+
+    w = Worker("localhost", port, "worker")
+    w.getLogger().setLevel(logging.ERROR)
+    w.run()
+
+
+def runWorkers(target, port, duration, workerCount):
+    workers = [multiprocessing.Process(target=target, args=(port, duration)) for i in range(workerCount)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+
+
+def benchmarkXmlRpc(days, parameterCount, duration, workerCount):
+    port = local.find_port()
+    srv = XmlRpcServer(port, buildFeed(days), [(i,) for i in range(parameterCount)])
+    serverThread = threading.Thread(target=srv.serve_forever)
+    serverThread.start()
+    begin = time.time()
+    try:
+        runWorkers(xmlrpc_worker_process, port, duration, workerCount)
+    finally:
+        srv.shutdown()
+        serverThread.join()
+        srv.server_close()
+    return parameterCount / (time.time() - begin)
+
+
+def benchmarkBinary(days, parameterCount, duration, workerCount):
+    port = local.find_port()
+    srv = server.Server("localhost", port, False)
+    srv.getLogger().disabled = True
+    serverThread = local.ServerThread(srv, buildFeed(days), [(i,) for i in range(parameterCount)])
+    serverThread.start()
+    begin = time.time()
+    try:
+        runWorkers(worker_process, port, duration, workerCount)
+    finally:
+        srv.stop()
+        serverThread.join()
+    assert(serverThread.getResults().getResult() == parameterCount - 1)
+    return parameterCount / (time.time() - begin)
+
+
+def main():
+    days = 2500
+    workerCount = 4
+
+    print "%-22s %14s %14s" % ("executions/sec", "xml-rpc", "binary")
+    for duration, parameterCount in [(0, 20000), (0.001, 4000), (0.01, 1000)]:
+        xmlRpc = benchmarkXmlRpc(days, parameterCount, duration, workerCount)
+        binary = benchmarkBinary(days, parameterCount, duration, workerCount)
+        print "%-22s %14.0f %14.0f" % ("strategy takes %gs" % duration, xmlRpc, binary)
+
+
+if __name__ == "__main__":
+    main()
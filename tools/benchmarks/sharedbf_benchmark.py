@@ -0,0 +1,102 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Cost of getting the bars into an optimizer worker and of running through them once per job, using
+# pyalgotrade.barfeed.sharedbf compared with the pickled bars that optimizer.server sends to every worker.
+# Usage: python sharedbf_benchmark.py
+
+import sys
+sys.path.append("../..")
+
+import datetime
+import pickle
+import time
+
+import numpy as np
+
+from pyalgotrade import bar
+from pyalgotrade import barfeed
+from pyalgotrade.barfeed import membf
+from pyalgotrade.barfeed import sharedbf
+
+
+class Feed(membf.BarFeed):
+    def barsHaveAdjClose(self):
+        return True
+
+
+def buildFeed(instruments, days):
+    ret = Feed(bar.Frequency.DAY)
+    for i in range(instruments):
+        closes = 100 + np.random.randn(days).cumsum()
+        bars = []
+        dateTime = datetime.datetime(2000, 1, 1)
+        for close in closes.tolist():
+            bars.append(bar.BasicBar(dateTime, close, close + 1, close - 1, close, 1000, close, bar.Frequency.DAY))
+            dateTime += datetime.timedelta(days=1)
+        ret.addBarsFromSequence("instrument-%d" % i, bars)
+    return ret
+
+
+def runThrough(barFeed):
+    count = 0
+    for dateTime, bars in barFeed:
+        count += len(bars.getInstruments())
+    return count
+
+
+def main():
+    np.random.seed(0)
+    instruments = 20
+    days = 2500
+    jobs = 5
+
+    print "%-14s %14s %16s" % ("", "worker setup", "job bars/sec")
+
+    # What optimizer.server and optimizer.worker do.
+    loadedBars = [bars for dateTime, bars in buildFeed(instruments, days)]
+    begin = time.time()
+    data = pickle.dumps((buildFeed(instruments, 1).getRegisteredInstruments(), loadedBars))
+    instrumentList, workerBars = pickle.loads(data)
+    setup = time.time() - begin
+    begin = time.time()
+    count = 0
+    for i in range(jobs):
+        count += runThrough(barfeed.OptimizerBarFeed(bar.Frequency.DAY, instrumentList, workerBars))
+    print "%-14s %13.3fs %16.0f" % ("pickled bars", setup, count / (time.time() - begin))
+
+    sharedBars = sharedbf.SharedBars.create(buildFeed(instruments, days))
+    try:
+        begin = time.time()
+        workerSharedBars = pickle.loads(pickle.dumps(sharedBars))
+        setup = time.time() - begin
+        begin = time.time()
+        count = 0
+        for i in range(jobs):
+            count += runThrough(sharedbf.Feed(workerSharedBars))
+        print "%-14s %13.3fs %16.0f" % ("shared bars", setup, count / (time.time() - begin))
+        print "pickled bars: %d bytes per worker, shared bars: %d bytes mapped once" % (
+            len(data), sharedBars.getValues().nbytes + sharedBars.getTimestamps().nbytes
+        )
+    finally:
+        sharedBars.close()
+
+
+if __name__ == "__main__":
+    main()
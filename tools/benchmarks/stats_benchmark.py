@@ -0,0 +1,98 @@
+# PyAlgoTrade
+#
+# Copyright 2011-2015 Gabriel Martin Becedillas Ruiz
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+"""
+
+# Values per second processed by the pyalgotrade.technical.stats filters, that keep running moments, compared with the
+# previous event windows that called numpy.std over the whole window on every value. The filter column includes the
+# dataseries and event overhead, the window column only feeds the event window.
+# Usage: python stats_benchmark.py
+
+import sys
+sys.path.append("../..")
+
+import time
+
+import numpy as np
+
+from pyalgotrade import dataseries
+from pyalgotrade import technical
+from pyalgotrade.technical import stats
+
+
+class NumPyStdDevEventWindow(technical.EventWindow):
+    def __init__(self, period, ddof):
+        technical.EventWindow.__init__(self, period)
+        self.__ddof = ddof
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            ret = self.getValues().std(ddof=self.__ddof)
+        return ret
+
+
+class NumPyZScoreEventWindow(technical.EventWindow):
+    def __init__(self, period, ddof):
+        technical.EventWindow.__init__(self, period)
+        self.__ddof = ddof
+
+    def getValue(self):
+        ret = None
+        if self.windowFull():
+            values = self.getValues()
+            ret = (values[-1] - values.mean()) / float(values.std(ddof=self.__ddof))
+        return ret
+
+
+def valuesPerSecond(values, buildWindow):
+    ds = dataseries.SequenceDataSeries()
+    technical.EventBasedFilter(ds, buildWindow())
+    begin = time.time()
+    for value in values:
+        ds.append(value)
+    return len(values) / (time.time() - begin)
+
+
+def windowValuesPerSecond(values, buildWindow):
+    window = buildWindow()
+    begin = time.time()
+    for value in values:
+        window.onNewValue(None, value)
+        window.getValue()
+    return len(values) / (time.time() - begin)
+
+
+def main():
+    np.random.seed(0)
+    values = (100 + np.random.randn(50000).cumsum()).tolist()
+    implementations = [
+        ("StdDev", lambda period: stats.StdDevEventWindow(period, 0)),
+        ("StdDev (numpy.std)", lambda period: NumPyStdDevEventWindow(period, 0)),
+        ("ZScore", lambda period: stats.ZScoreEventWindow(period, 0)),
+        ("ZScore (numpy.std)", lambda period: NumPyZScoreEventWindow(period, 0)),
+    ]
+    print "%-20s %8s %18s %18s" % ("", "period", "filter values/sec", "window values/sec")
+    for period in (20, 200, 2000):
+        for name, buildWindow in implementations:
+            rate = valuesPerSecond(values, lambda: buildWindow(period))
+            windowRate = windowValuesPerSecond(values, lambda: buildWindow(period))
+            print "%-20s %8d %18.0f %18.0f" % (name, period, rate, windowRate)
+
+
+if __name__ == "__main__":
+    main()